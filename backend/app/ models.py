@@ -1,70 +0,0 @@
-from datetime import datetime
-from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
-
-db = SQLAlchemy()
-
-class User(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(256), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    transactions = db.relationship('Transaction', backref='user', lazy=True)
-    budget_goals = db.relationship('BudgetGoal', backref='user', lazy=True)
-
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
-
-    def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
-
-class Transaction(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    amount = db.Column(db.Float, nullable=False)
-    description = db.Column(db.String(200))
-    category = db.Column(db.String(50))
-    transaction_type = db.Column(db.String(20))  # 'income' or 'expense'
-    date = db.Column(db.DateTime, default=datetime.utcnow)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    is_recurring = db.Column(db.Boolean, default=False)
-    recurring_interval = db.Column(db.String(20))  # 'monthly', 'weekly', etc.
-
-    @staticmethod
-    def get_monthly_summary(user_id, month, year):
-        """Get monthly transaction summary for a user"""
-        start_date = datetime(year, month, 1)
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1)
-        else:
-            end_date = datetime(year, month + 1, 1)
-            
-        return Transaction.query.filter(
-            Transaction.user_id == user_id,
-            Transaction.date >= start_date,
-            Transaction.date < end_date
-        ).all()
-
-class BudgetGoal(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    category = db.Column(db.String(50))
-    amount = db.Column(db.Float, nullable=False)
-    period = db.Column(db.String(20))  # 'monthly', 'yearly'
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    start_date = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    def check_alert(self, current_spending):
-        """Check if spending is approaching or exceeding budget goal"""
-        if current_spending >= self.amount:
-            return "exceeded"
-        elif current_spending >= (self.amount * 0.8):
-            return "warning"
-        return "ok"
-
-class ExportLog(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    export_type = db.Column(db.String(20))  # 'csv', 'pdf', etc.
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
-    file_path = db.Column(db.String(200))
-    status = db.Column(db.String(20))  # 'completed', 'failed'
\ No newline at end of file
@@ -2,37 +2,54 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
+from .config import config
+from .blueprints import init_blueprints
+from .database import configure_database, install_engine_events
 from .models import db
+from .migrations import init_schema_check
+from .cache import init_cache
+from .metrics import init_metrics
+from .passwords import init_password_hasher
+from .shards import init_sharding
+from .write_queue import init_write_queue
 
 def create_app(config_name='default'):
     app = Flask(__name__)
     CORS(app)
     
     # Configuration
-    if config_name == 'default':
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///expense_tracker.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['JWT_SECRET_KEY'] = 'your-secret-key'  # Change in production
+    app.config.from_object(config[config_name])
+    configure_database(app)
     
     # Initialize extensions
     db.init_app(app)
+    install_engine_events(app, db)
     jwt = JWTManager(app)
+    init_sharding(app, jwt)
+    init_cache(app)
+    init_metrics(app)
+    init_write_queue(app)
+    init_password_hasher(app)
     
-    # Register blueprints
-    from .routes.auth import auth_bp
-    from .routes.transactions import transaction_bp
-    from .routes.budget_goals import budget_bp
-    from .routes.exports import export_bp
-    from .routes.analytics import analytics_bp
+    # Blueprints are imported and registered on the first request
+    init_blueprints(app)
     
-    app.register_blueprint(auth_bp, url_prefix='/api/auth')
-    app.register_blueprint(transaction_bp, url_prefix='/api/transactions')
-    app.register_blueprint(budget_bp, url_prefix='/api/budget-goals')
-    app.register_blueprint(export_bp, url_prefix='/api/exports')
-    app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
+    # CLI commands
+    from .commands import (
+        analytics_cli, archive_cli, budgets_cli, changes_cli, recurring_cli, rollups_cli, schema_cli,
+        search_cli, shards_cli
+    )
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(budgets_cli)
+    app.cli.add_command(changes_cli)
+    app.cli.add_command(recurring_cli)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(shards_cli)
     
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # One version read; migrations run from `flask schema upgrade`
+    init_schema_check(app)
     
     return app
\ No newline at end of file
@@ -0,0 +1,87 @@
+from sqlalchemy import func, select
+from .archive import transaction_source
+from .models import db
+from .sql import month_key
+
+
+def _window(query, source, user_id, start_date=None, end_date=None):
+    """Restrict an aggregate query to one user and an optional [start, end] window"""
+    query = query.where(source.user_id == user_id)
+    if start_date is not None:
+        query = query.where(source.date >= start_date)
+    if end_date is not None:
+        query = query.where(source.date <= end_date)
+    return query
+
+
+def totals_by_type(user_id, start_date=None, end_date=None):
+    """{transaction_type: (total, count)} for the window"""
+    source = transaction_source(start_date)
+    query = _window(
+        select(source.transaction_type, func.sum(source.amount), func.count()),
+        source, user_id, start_date, end_date
+    ).group_by(source.transaction_type)
+    return {row[0]: (row[1], row[2]) for row in db.session.execute(query)}
+
+
+def summarize(user_id, start_date=None, end_date=None):
+    """Income, expense and count totals for the window in one grouped query"""
+    totals = totals_by_type(user_id, start_date, end_date)
+    return {
+        'total_income': totals.get('income', (0, 0))[0],
+        'total_expenses': totals.get('expense', (0, 0))[0],
+        'transaction_count': sum(count for _, count in totals.values())
+    }
+
+
+def category_counts(user_id, start_date=None, end_date=None):
+    """{category: (count, total)} for the window in one grouped query"""
+    source = transaction_source(start_date)
+    query = _window(
+        select(source.category, func.count(), func.sum(source.amount)),
+        source, user_id, start_date, end_date
+    ).group_by(source.category)
+    return {row[0]: (row[1], row[2]) for row in db.session.execute(query)}
+
+
+def statistics_from_counts(counts):
+    """Statistics figures from category_counts output"""
+    count = sum(hits for hits, _ in counts.values())
+    total = sum(amount or 0 for _, amount in counts.values())
+    most_common = None
+    if count:
+        # Most hits wins; ties go to the first category name, NULL first
+        most_common = min(counts, key=lambda category: (
+            -counts[category][0], category is not None, category or ''
+        ))
+    return {
+        'total_transactions': count,
+        'average_amount': total / count if count else 0,
+        'most_common_category': most_common
+    }
+
+
+def statistics(user_id, start_date=None, end_date=None):
+    """Count, average amount and most common category for the window"""
+    return statistics_from_counts(category_counts(user_id, start_date, end_date))
+
+
+def category_totals(user_id, start_date=None, end_date=None):
+    """{category: total} for the window"""
+    source = transaction_source(start_date)
+    query = _window(
+        select(source.category, func.sum(source.amount)),
+        source, user_id, start_date, end_date
+    ).group_by(source.category)
+    return dict(db.session.execute(query).all())
+
+
+def monthly_totals(user_id, start_date=None, end_date=None):
+    """{'YYYY-MM': total} for the window, bucketed in SQL"""
+    source = transaction_source(start_date)
+    month = month_key(source.date)
+    query = _window(
+        select(month, func.sum(source.amount)),
+        source, user_id, start_date, end_date
+    ).group_by(month)
+    return dict(db.session.execute(query).all())
@@ -0,0 +1,400 @@
+"""Per-user spending analytics, computed from columnar history and stored for cheap reads.
+
+A user's recent transactions are loaded in one query into compact parallel
+arrays (``array`` module): ids, day ordinals, month indexes, amounts,
+category codes and type codes. From those, ``compute_analytics`` derives:
+
+- a trailing 7-day average of daily spend, plus the 30-day average
+- month-over-month income, expense and expense change
+- per-category p50/p90 expense amounts over the last year
+- a month-end projection and a linear-trend forecast for next month
+- anomalous recent expenses, by robust z-score within their category
+
+With NumPy installed, the arrays are viewed as ndarrays without copying
+and every figure is vectorized. Without it, a pure-Python engine computes
+the same numbers. NumPy is optional; bench_analytics compares the two.
+
+Results are stored in ``UserAnalytics`` as a JSON document stamped with
+the day and the user's ``data_version``. A read is then one primary-key
+lookup. ``precompute_all`` refreshes every user nightly, spreading chunks
+of users over a process pool.
+"""
+import calendar
+import json
+import statistics
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from importlib.util import find_spec
+from itertools import groupby
+from operator import itemgetter
+from sqlalchemy import create_engine, select
+from .archive import transaction_source
+from .models import db, User, UserAnalytics, VALID_CATEGORIES
+from .rollups import _insert_for_dialect
+from .shards import on_current_shard
+
+# Optional, and slow to import, so it is only loaded by the first NumPy-engine call
+HAVE_NUMPY = find_spec('numpy') is not None
+
+CATEGORY_CODES = {category: code for code, category in enumerate(VALID_CATEGORIES)}
+UNKNOWN_CATEGORY = len(VALID_CATEGORIES)
+INCOME, EXPENSE = 1, 2
+TYPE_CODES = {'income': INCOME, 'expense': EXPENSE}
+
+ROLLING_WINDOW = 7
+SERIES_DAYS = 90
+AVERAGE_DAYS = 30
+MONTHS = 12
+TREND_MONTHS = 6
+PERCENTILE_DAYS = 365
+ANOMALY_DAYS = 90
+ANOMALY_SCORE = 3.5
+MAX_ANOMALIES = 20
+
+# Covers the longest look-back above (12 months, or a year of percentiles)
+HISTORY_DAYS = 400
+
+
+class History:
+    """One user's transactions as parallel typed arrays, oldest first"""
+    __slots__ = ('ids', 'days', 'months', 'amounts', 'categories', 'types')
+
+    def __init__(self, rows=()):
+        """``rows`` are (id, date, amount, category, transaction_type) tuples"""
+        ids, dates, amounts, categories, types = zip(*rows) if rows else ((),) * 5
+        self.ids = array('q', ids)
+        self.days = array('q', [when.toordinal() for when in dates])
+        self.months = array('q', [when.year * 12 + when.month - 1 for when in dates])
+        self.amounts = array('d', amounts)
+        self.categories = array('b', [CATEGORY_CODES.get(name, UNKNOWN_CATEGORY) for name in categories])
+        self.types = array('b', [TYPE_CODES.get(name, 0) for name in types])
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def load_histories(connection, user_ids, as_of):
+    """{user_id: History} for the HISTORY_DAYS before ``as_of``, in one query"""
+    user_ids = [int(user_id) for user_id in user_ids]
+    since = datetime.combine(as_of - timedelta(days=HISTORY_DAYS), datetime.min.time())
+    source = transaction_source(since, connection)
+    rows = connection.execute(
+        select(source.user_id, source.id, source.date, source.amount,
+               source.category, source.transaction_type)
+        .where(source.user_id.in_(user_ids), source.date >= since)
+        .order_by(source.user_id, source.date, source.id)
+    ).all()
+    by_user = {user_id: [row[1:] for row in group] for user_id, group in groupby(rows, itemgetter(0))}
+    return {user_id: History(by_user.get(user_id, ())) for user_id in user_ids}
+
+
+def _percentile(sorted_values, pct):
+    # Linear interpolation between closest ranks, as numpy.percentile does by default
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _trend(values):
+    """Least-squares line through (0..n-1, values), evaluated at n"""
+    count = len(values)
+    mean_x = (count - 1) / 2
+    mean_y = sum(values) / count
+    spread = sum((x - mean_x) ** 2 for x in range(count))
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values)) / spread
+    return mean_y + slope * (count - mean_x)
+
+
+def _python_figures(history, as_of):
+    today = as_of.toordinal()
+    this_month = as_of.year * 12 + as_of.month - 1
+    span = SERIES_DAYS + ROLLING_WINDOW - 1
+
+    daily = [0.0] * span
+    income = [0.0] * MONTHS
+    expense = [0.0] * MONTHS
+    by_category = {}
+    recent = []
+    for index in range(len(history)):
+        kind = history.types[index]
+        amount = history.amounts[index]
+        age = today - history.days[index]
+        month_age = this_month - history.months[index]
+        if 0 <= month_age < MONTHS:
+            if kind == INCOME:
+                income[MONTHS - 1 - month_age] += amount
+            elif kind == EXPENSE:
+                expense[MONTHS - 1 - month_age] += amount
+        if kind != EXPENSE or age < 0:
+            continue
+        if age < span:
+            daily[span - 1 - age] += amount
+        category = history.categories[index]
+        if age < PERCENTILE_DAYS and category != UNKNOWN_CATEGORY:
+            by_category.setdefault(category, []).append(amount)
+        if age < ANOMALY_DAYS and category != UNKNOWN_CATEGORY:
+            recent.append(index)
+
+    rolling = [
+        sum(daily[start:start + ROLLING_WINDOW]) / ROLLING_WINDOW
+        for start in range(SERIES_DAYS)
+    ]
+
+    percentiles = {}
+    spread = {}
+    for category, amounts in by_category.items():
+        amounts.sort()
+        median = _percentile(amounts, 50)
+        percentiles[category] = (len(amounts), median, _percentile(amounts, 90))
+        spread[category] = (median, statistics.median(abs(amount - median) for amount in amounts))
+
+    anomalies = []
+    for index in recent:
+        median, mad = spread.get(history.categories[index], (0.0, 0.0))
+        if mad > 0:
+            score = 0.6745 * (history.amounts[index] - median) / mad
+            if score > ANOMALY_SCORE:
+                anomalies.append((score, index))
+
+    return {
+        'rolling': rolling,
+        'average_30d': sum(daily[-AVERAGE_DAYS:]) / AVERAGE_DAYS,
+        'income': income,
+        'expense': expense,
+        'percentiles': percentiles,
+        'anomalies': anomalies
+    }
+
+
+def _numpy_figures(history, as_of):
+    import numpy as np
+
+    # Zero-copy views of the array-module buffers
+    days = np.frombuffer(history.days, dtype=np.int64)
+    months = np.frombuffer(history.months, dtype=np.int64)
+    amounts = np.frombuffer(history.amounts, dtype=np.float64)
+    categories = np.frombuffer(history.categories, dtype=np.int8)
+    types = np.frombuffer(history.types, dtype=np.int8)
+
+    age = as_of.toordinal() - days
+    month_age = (as_of.year * 12 + as_of.month - 1) - months
+    expense = types == EXPENSE
+    past_expense = expense & (age >= 0)
+    span = SERIES_DAYS + ROLLING_WINDOW - 1
+
+    def bucket_sum(selected, positions, length):
+        # bincount over ages counts newest first; reversed, the result is oldest first
+        return np.bincount(positions[selected], weights=amounts[selected], minlength=length)[:length][::-1]
+
+    daily = bucket_sum(past_expense & (age < span), age, span)
+    rolling = np.convolve(daily, np.ones(ROLLING_WINDOW), 'valid') / ROLLING_WINDOW
+    in_months = (month_age >= 0) & (month_age < MONTHS)
+    income = bucket_sum(in_months & (types == INCOME), month_age, MONTHS)
+    expenses = bucket_sum(in_months & expense, month_age, MONTHS)
+
+    known = categories != UNKNOWN_CATEGORY
+    year = past_expense & known & (age < PERCENTILE_DAYS)
+    medians = np.zeros(UNKNOWN_CATEGORY + 1)
+    mads = np.zeros(UNKNOWN_CATEGORY + 1)
+    percentiles = {}
+    for category in np.unique(categories[year]):
+        values = amounts[year & (categories == category)]
+        median, p90 = np.percentile(values, [50, 90])
+        medians[category] = median
+        mads[category] = np.median(np.abs(values - median))
+        percentiles[int(category)] = (len(values), float(median), float(p90))
+
+    recent = np.flatnonzero(past_expense & known & (age < ANOMALY_DAYS))
+    mad = mads[categories[recent]]
+    scores = np.zeros(len(recent))
+    np.divide(0.6745 * (amounts[recent] - medians[categories[recent]]), mad, out=scores, where=mad > 0)
+    flagged = scores > ANOMALY_SCORE
+
+    return {
+        'rolling': rolling.tolist(),
+        'average_30d': float(daily[-AVERAGE_DAYS:].sum()) / AVERAGE_DAYS,
+        'income': income.tolist(),
+        'expense': expenses.tolist(),
+        'percentiles': percentiles,
+        'anomalies': list(zip(scores[flagged].tolist(), recent[flagged].tolist()))
+    }
+
+
+ENGINES = {'python': _python_figures}
+if HAVE_NUMPY:
+    ENGINES['numpy'] = _numpy_figures
+DEFAULT_ENGINE = 'numpy' if HAVE_NUMPY else 'python'
+
+
+def _month_label(index):
+    return f'{index // 12:04d}-{index % 12 + 1:02d}'
+
+
+def compute_analytics(history, as_of, engine=DEFAULT_ENGINE):
+    """The analytics document for one History as of a date"""
+    figures = ENGINES[engine](history, as_of)
+    this_month = as_of.year * 12 + as_of.month - 1
+
+    monthly = []
+    previous = None
+    for offset, (income, expense) in enumerate(zip(figures['income'], figures['expense'])):
+        change = None if previous is None else expense - previous
+        monthly.append({
+            'month': _month_label(this_month - MONTHS + 1 + offset),
+            'income': round(income, 2),
+            'expense': round(expense, 2),
+            'expense_change': None if change is None else round(change, 2),
+            'expense_change_pct': round(change / previous * 100, 1) if previous else None
+        })
+        previous = expense
+
+    month_to_date = figures['expense'][-1]
+    days_in_month = calendar.monthrange(as_of.year, as_of.month)[1]
+    anomalies = sorted(figures['anomalies'], reverse=True)[:MAX_ANOMALIES]
+    first_day = as_of - timedelta(days=SERIES_DAYS - 1)
+
+    return {
+        'as_of': as_of.isoformat(),
+        'rolling_average': {
+            'window_days': ROLLING_WINDOW,
+            'daily_spend': [
+                [(first_day + timedelta(days=offset)).isoformat(), round(value, 2)]
+                for offset, value in enumerate(figures['rolling'])
+            ],
+            'average_daily_spend_30d': round(figures['average_30d'], 2)
+        },
+        'monthly': monthly,
+        'category_percentiles': {
+            VALID_CATEGORIES[category]: {'count': count, 'p50': round(p50, 2), 'p90': round(p90, 2)}
+            for category, (count, p50, p90) in sorted(figures['percentiles'].items())
+        },
+        'forecast': {
+            'month_to_date': round(month_to_date, 2),
+            'projected_month': round(month_to_date / as_of.day * days_in_month, 2),
+            'next_month': round(max(0.0, _trend(figures['expense'][-TREND_MONTHS - 1:-1])), 2)
+        },
+        'anomalies': [
+            {
+                'id': history.ids[index],
+                'date': date.fromordinal(history.days[index]).isoformat(),
+                'category': VALID_CATEGORIES[history.categories[index]],
+                'amount': round(history.amounts[index], 2),
+                'score': round(score, 2)
+            }
+            for score, index in anomalies
+        ]
+    }
+
+
+def _data_versions(connection, user_ids):
+    return dict(connection.execute(
+        select(User.id, User.data_version).where(User.id.in_(list(user_ids)))
+    ).all())
+
+
+def compute_chunk(connection, user_ids, as_of, engine=DEFAULT_ENGINE):
+    """[(user_id, data_version, payload)] for a chunk of users"""
+    # Versions are read first, so a write landing mid-chunk leaves the result stale, not wrong
+    versions = _data_versions(connection, user_ids)
+    histories = load_histories(connection, user_ids, as_of)
+    return [
+        (user_id, versions.get(user_id, 0),
+         json.dumps(compute_analytics(history, as_of, engine), separators=(',', ':'), sort_keys=True))
+        for user_id, history in histories.items()
+    ]
+
+
+def store_results(results, as_of):
+    """Upsert computed payloads inside the current session transaction"""
+    if not results:
+        return
+    table = UserAnalytics.__table__
+    stmt = _insert_for_dialect()(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id'],
+        set_={
+            'as_of': stmt.excluded.as_of,
+            'data_version': stmt.excluded.data_version,
+            'computed_at': stmt.excluded.computed_at,
+            'payload': stmt.excluded.payload
+        }
+    )
+    now = datetime.utcnow()
+    db.session.execute(stmt, [
+        {'user_id': user_id, 'as_of': as_of, 'data_version': version,
+         'computed_at': now, 'payload': payload}
+        for user_id, version, payload in results
+    ])
+
+
+def stored_analytics(user_id, as_of=None):
+    """The stored payload if it is still current for today and the user's data, else None"""
+    as_of = as_of or date.today()
+    row = db.session.execute(
+        select(UserAnalytics.payload, UserAnalytics.as_of, UserAnalytics.data_version, User.data_version)
+        .join(User, User.id == UserAnalytics.user_id)
+        .where(UserAnalytics.user_id == user_id)
+    ).one_or_none()
+    if row is None or row[1] != as_of or row[2] != row[3]:
+        return None
+    return row[0]
+
+
+def refresh_user(user_id, as_of=None):
+    """Recompute and store one user's analytics; returns the payload, uncommitted"""
+    as_of = as_of or date.today()
+    results = compute_chunk(db.session.connection(), [int(user_id)], as_of)
+    store_results(results, as_of)
+    return results[0][2]
+
+
+_worker_engine = None
+
+
+def _init_worker(uri):
+    global _worker_engine
+    _worker_engine = create_engine(uri)
+
+
+def _compute_in_worker(user_ids, as_of):
+    with _worker_engine.connect() as connection:
+        return compute_chunk(connection, user_ids, as_of)
+
+
+def precompute_all(as_of=None, workers=None, chunk_size=500):
+    """Recompute every user's analytics, ``workers`` processes at a time; returns users processed
+
+    Workers open their own engine on the same database and only read; the
+    results are written back here, one transaction per chunk. Covers the
+    users on the session's shard.
+    """
+    as_of = as_of or date.today()
+    user_ids = db.session.execute(
+        select(User.id).where(on_current_shard()).order_by(User.id)
+    ).scalars().all()
+    chunks = [user_ids[start:start + chunk_size] for start in range(0, len(user_ids), chunk_size)]
+    engine = db.session.get_bind()
+
+    # An in-memory SQLite database exists only in this process
+    in_memory = engine.dialect.name == 'sqlite' and engine.url.database in (None, '', ':memory:')
+    if workers == 1 or in_memory or len(chunks) < 2:
+        results = (compute_chunk(db.session.connection(), chunk, as_of) for chunk in chunks)
+        return _store_all(results, as_of)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(engine.url.render_as_string(hide_password=False),)
+    ) as pool:
+        return _store_all(pool.map(_compute_in_worker, chunks, [as_of] * len(chunks)), as_of)
+
+
+def _store_all(chunk_results, as_of):
+    processed = 0
+    for results in chunk_results:
+        store_results(results, as_of)
+        db.session.commit()
+        processed += len(results)
+    return processed
@@ -0,0 +1,149 @@
+"""Hot/cold split of the transaction table by year.
+
+``flask archive run`` moves transactions dated before 1 January of the
+year ``ARCHIVE_KEEP_YEARS`` back into ``transaction_archive``. The hot
+``transaction`` table, its indexes and the search index then only grow
+with recent history.
+
+Reads choose their source with ``transaction_source(start_date)``. A window
+starting on or after the archive boundary reads the hot table alone.
+Anything earlier, or unbounded, reads ``AllTransactions``: an alias of
+``Transaction`` over hot UNION ALL archive. SQLite and PostgreSQL push the
+user/date predicates into both branches, so each branch uses its own
+(user_id, date, id) index. Views that always need the whole history, such
+as rollup rebuilds, exports and the change feed, use ``AllTransactions``
+directly.
+
+The job is online:
+- The boundary moves forward before any rows move.
+- Rows then move in small batches. Each batch is its own short
+  transaction that copies and then deletes.
+- So every row is in exactly one table at each commit, and any query that
+  could need it already reads both. Writers wait at most one batch.
+
+Updating or deleting an archived transaction first moves it back into the
+hot table with ``restore``. The full-text index covers both tables (see
+app/search.py).
+"""
+from datetime import datetime
+from flask import g, has_request_context
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import aliased
+from .cache import bump_data_version
+from .models import db, ArchiveState, Transaction, TransactionArchive
+
+STATE_ID = 1
+_UNSET = object()
+
+COLUMN_NAMES = [column.name for column in Transaction.__table__.columns]
+
+
+def _columns(table):
+    return [table.c[name] for name in COLUMN_NAMES]
+
+
+AllTransactions = aliased(
+    Transaction,
+    union_all(
+        select(*_columns(Transaction.__table__)),
+        select(*_columns(TransactionArchive.__table__))
+    ).subquery('all_transactions'),
+    name='all_transactions'
+)
+
+
+def archive_boundary(connection=None):
+    """Transactions dated before this may be archived; None when nothing ever was"""
+    if connection is not None:
+        return connection.execute(
+            select(ArchiveState.archived_before).where(ArchiveState.id == STATE_ID)
+        ).scalar()
+    if has_request_context():
+        boundary = g.get('archive_boundary', _UNSET)
+        if boundary is not _UNSET:
+            return boundary
+    boundary = db.session.execute(
+        select(ArchiveState.archived_before).where(ArchiveState.id == STATE_ID)
+    ).scalar()
+    if has_request_context():
+        g.archive_boundary = boundary
+    return boundary
+
+
+def transaction_source(start_date=None, connection=None):
+    """``Transaction`` when a window starting at ``start_date`` is all hot, else AllTransactions"""
+    boundary = archive_boundary(connection)
+    if boundary is None or (start_date is not None and start_date >= boundary):
+        return Transaction
+    return AllTransactions
+
+
+def restore(user_id, id):
+    """Move one archived transaction back into the hot table; True if it was archived"""
+    if archive_boundary() is None:
+        return False
+    hot = Transaction.__table__
+    cold = TransactionArchive.__table__
+    moved = db.session.execute(
+        hot.insert().from_select(
+            COLUMN_NAMES,
+            select(*_columns(cold)).where(cold.c.id == id, cold.c.user_id == user_id)
+        )
+    ).rowcount
+    if moved:
+        db.session.execute(cold.delete().where(cold.c.id == id))
+    return bool(moved)
+
+
+def set_boundary(archived_before):
+    """Move the boundary forward (never back) and commit; returns the boundary in force"""
+    state = db.session.get(ArchiveState, STATE_ID)
+    if state is None:
+        state = ArchiveState(id=STATE_ID, archived_before=archived_before)
+        db.session.add(state)
+    elif state.archived_before is None or archived_before > state.archived_before:
+        state.archived_before = archived_before
+        state.updated_at = datetime.utcnow()
+    db.session.commit()
+    return state.archived_before
+
+
+def archive_transactions(keep_years=2, batch_size=1000, now=None):
+    """Move transactions dated before 1 January ``keep_years`` years back; returns rows moved"""
+    now = now or datetime.utcnow()
+    cutoff = datetime(now.year - keep_years, 1, 1)
+    set_boundary(cutoff)
+
+    hot = Transaction.__table__
+    cold = TransactionArchive.__table__
+    moved = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(hot.c.id, hot.c.user_id)
+            .where(hot.c.id > last_id, hot.c.date < cutoff)
+            .order_by(hot.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+        # Reads of the hot table alone change, so cached responses must too
+        bump_data_version(*{row.user_id for row in rows})
+        db.session.execute(
+            cold.insert().from_select(COLUMN_NAMES, select(*_columns(hot)).where(hot.c.id.in_(ids)))
+        )
+        db.session.execute(hot.delete().where(hot.c.id.in_(ids)))
+        db.session.commit()
+        moved += len(ids)
+        last_id = ids[-1]
+    return moved
+
+
+def archive_status():
+    """(boundary, hot row count, archived row count)"""
+    return (
+        archive_boundary(),
+        db.session.execute(select(func.count()).select_from(Transaction.__table__)).scalar(),
+        db.session.execute(select(func.count()).select_from(TransactionArchive.__table__)).scalar()
+    )
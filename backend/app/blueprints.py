@@ -0,0 +1,56 @@
+"""Blueprint registration, deferred to the first request.
+
+Importing the route modules pulls in marshmallow, dateutil and every
+service module behind them. ``create_app`` only wraps ``wsgi_app``, so a
+worker boots without those imports. The first request then imports and
+registers every blueprint before Flask dispatches it. Flask only allows
+registration before the first request is handled, so the blueprints are
+loaded together rather than one prefix at a time.
+
+``LAZY_BLUEPRINTS = False`` registers them in ``create_app`` instead, e.g.
+for code that needs ``app.url_map`` before serving.
+"""
+import threading
+from importlib import import_module
+
+BLUEPRINTS = (
+    ('.routes.auth', 'auth_bp', '/api/auth'),
+    ('.routes.transactions', 'transaction_bp', '/api/transactions'),
+    ('.routes.budget_goals', 'budget_bp', '/api/budget-goals'),
+    ('.routes.dashboard', 'dashboard_bp', '/api/dashboard'),
+    ('.routes.exports', 'export_bp', '/api/exports'),
+    ('.routes.analytics', 'analytics_bp', '/api/analytics'),
+    ('.routes.batch', 'batch_bp', '/api/batch'),
+)
+
+
+def register_blueprints(app):
+    """Import every route module and register its blueprint"""
+    for module, name, prefix in BLUEPRINTS:
+        blueprint = getattr(import_module(module, __package__), name)
+        app.register_blueprint(blueprint, url_prefix=prefix)
+
+
+class LazyBlueprints:
+    """WSGI wrapper that registers the blueprints just before the first request"""
+
+    def __init__(self, app):
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        self.lock = threading.Lock()
+        self.loaded = False
+
+    def __call__(self, environ, start_response):
+        if not self.loaded:
+            with self.lock:
+                if not self.loaded:
+                    register_blueprints(self.app)
+                    self.loaded = True
+        return self.wsgi_app(environ, start_response)
+
+
+def init_blueprints(app):
+    if app.config.get('LAZY_BLUEPRINTS', True):
+        app.wsgi_app = LazyBlueprints(app)
+    else:
+        register_blueprints(app)
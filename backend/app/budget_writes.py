@@ -0,0 +1,42 @@
+"""Budget goal writes shared by the budget goal routes and ``/api/batch``.
+
+Like ``transaction_writes``, each function takes a validated payload,
+does the whole change including the spend counter, and leaves the commit
+to the caller. Budget reads never store counters, so creating or editing
+a goal stores its counter here.
+"""
+from datetime import datetime
+from .budgets import evaluate_goals, reset_goal
+from .models import db, BudgetGoal
+
+
+def _apply_fields(goal, data):
+    for key in ('amount', 'category', 'period'):
+        if key in data:
+            setattr(goal, key, data[key])
+    if data.get('start_date'):
+        goal.start_date = datetime.strptime(data['start_date'], '%Y-%m-%d')
+
+
+def create_budget_goal(user_id, data):
+    """Insert a validated budget goal payload; returns the new id"""
+    goal = BudgetGoal(user_id=user_id, period=data.get('period', 'monthly'))
+    _apply_fields(goal, data)
+    db.session.add(goal)
+    db.session.flush()
+    evaluate_goals([goal])
+    return goal.id
+
+
+def update_budget_goal(user_id, id, data):
+    goal = BudgetGoal.query.filter_by(id=id, user_id=user_id).first_or_404()
+    _apply_fields(goal, data)
+    evaluate_goals([goal])
+    return goal.id
+
+
+def delete_budget_goal(user_id, id):
+    goal = BudgetGoal.query.filter_by(id=id, user_id=user_id).first_or_404()
+    reset_goal(goal.id)
+    db.session.delete(goal)
+    return id
@@ -0,0 +1,251 @@
+"""Budget goal evaluation: batch grouped queries plus running spend counters.
+
+A goal's period windows repeat from its ``start_date`` (monthly or yearly).
+``BudgetSpend`` holds the expense total for each goal's current window.
+Transaction writes adjust it in place (via ``apply_spend_changes``), so a
+single user's check is a primary-key read. Reads never write: a counter
+that is missing or whose window has rolled over is recomputed in memory
+for that request. Counters are stored by goal writes and by
+``evaluate_all``, which refreshes every goal in chunks. Each chunk's
+windows go into a temporary table and one grouped join against the
+transaction table yields every goal's spend.
+"""
+from datetime import datetime
+from sqlalchemy import bindparam, func, literal, select, text, union_all
+from .archive import transaction_source
+from .models import db, BudgetGoal, BudgetSpend
+
+WINDOW_TABLE = 'budget_window'
+
+
+def period_step(period):
+    """Length of one goal window; anything but 'yearly' is monthly"""
+    # Imported here so loading this module at worker startup does not pull in dateutil
+    from dateutil.relativedelta import relativedelta
+    return relativedelta(years=1) if period == 'yearly' else relativedelta(months=1)
+
+
+def current_window(start_date, period, as_of):
+    """[start, end) of the goal window containing ``as_of``"""
+    step = period_step(period)
+    start_date = start_date or as_of
+    if as_of < start_date:
+        return start_date, start_date + step
+
+    if period == 'yearly':
+        index = as_of.year - start_date.year
+    else:
+        index = (as_of.year - start_date.year) * 12 + as_of.month - start_date.month
+    if start_date + step * index > as_of:
+        index -= 1
+    return start_date + step * index, start_date + step * (index + 1)
+
+
+def _spend_query(window, windows):
+    """Expense totals per goal for the windows in ``window`` (a table of goal windows)
+
+    ``windows`` are the same rows as dicts. A yearly window can start before
+    the archive boundary (ARCHIVE_KEEP_YEARS=0 archives last year), and then
+    the archive is read too.
+    """
+    source = transaction_source(min(window['window_start'] for window in windows))
+    return select(window.c.goal_id, func.coalesce(func.sum(source.amount), 0.0))\
+        .select_from(window)\
+        .outerjoin(source, db.and_(
+            source.user_id == window.c.user_id,
+            source.transaction_type == 'expense',
+            source.date >= window.c.window_start,
+            source.date < window.c.window_end,
+            db.or_(window.c.category.is_(None), source.category == window.c.category)
+        ))\
+        .group_by(window.c.goal_id)
+
+
+def _window_rows(goals, as_of):
+    rows = []
+    for goal in goals:
+        window_start, window_end = current_window(goal.start_date, goal.period, as_of)
+        rows.append({
+            'goal_id': goal.id,
+            'user_id': goal.user_id,
+            'category': goal.category,
+            'window_start': window_start,
+            'window_end': window_end
+        })
+    return rows
+
+
+def _window_table():
+    """Session-local temporary table that holds one chunk of goal windows"""
+    connection = db.session.connection()
+    connection.execute(text(
+        f'CREATE TEMPORARY TABLE IF NOT EXISTS {WINDOW_TABLE} ('
+        'goal_id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, category VARCHAR(50), '
+        'window_start TIMESTAMP NOT NULL, window_end TIMESTAMP NOT NULL)'
+    ))
+    return db.Table(
+        WINDOW_TABLE, db.MetaData(),
+        db.Column('goal_id', db.Integer, primary_key=True),
+        db.Column('user_id', db.Integer),
+        db.Column('category', db.String(50)),
+        db.Column('window_start', db.DateTime),
+        db.Column('window_end', db.DateTime)
+    )
+
+
+def _inline_windows(windows):
+    """The same columns as the temporary table, as a subquery of literals for read-only requests"""
+    rows = [
+        select(
+            literal(window['goal_id'], db.Integer).label('goal_id'),
+            literal(window['user_id'], db.Integer).label('user_id'),
+            literal(window['category'], db.String(50)).label('category'),
+            literal(window['window_start'], db.DateTime).label('window_start'),
+            literal(window['window_end'], db.DateTime).label('window_end')
+        )
+        for window in windows
+    ]
+    return union_all(*rows).subquery(WINDOW_TABLE)
+
+
+def _store_counters(windows, spent_by_goal, goals, as_of):
+    """Upsert BudgetSpend rows for evaluated windows"""
+    amounts = {goal.id: goal.amount for goal in goals}
+    table = BudgetSpend.__table__
+    db.session.execute(table.delete().where(table.c.goal_id.in_([w['goal_id'] for w in windows])))
+    rows = []
+    for window in windows:
+        spent = spent_by_goal.get(window['goal_id'], 0.0)
+        rows.append({
+            'goal_id': window['goal_id'],
+            'user_id': window['user_id'],
+            'window_start': window['window_start'],
+            'window_end': window['window_end'],
+            'spent': spent,
+            'status': BudgetGoal.alert_status(amounts[window['goal_id']], spent),
+            'evaluated_at': as_of
+        })
+    db.session.execute(table.insert(), rows)
+
+
+def evaluate_goals(goals, as_of=None):
+    """Recompute spend for a batch of goals with one grouped query; returns {goal_id: spent}"""
+    as_of = as_of or datetime.utcnow()
+    if not goals:
+        return {}
+
+    windows = _window_rows(goals, as_of)
+    window = _window_table()
+    db.session.execute(window.delete())
+    db.session.execute(window.insert(), windows)
+    spent_by_goal = dict(db.session.execute(_spend_query(window, windows)).all())
+    db.session.execute(window.delete())
+
+    _store_counters(windows, spent_by_goal, goals, as_of)
+    return spent_by_goal
+
+
+def current_spend(goals, as_of=None):
+    """Spend in each goal's current window without writing anything; returns {goal_id: spent}"""
+    as_of = as_of or datetime.utcnow()
+    if not goals:
+        return {}
+    windows = _window_rows(goals, as_of)
+    return dict(db.session.execute(_spend_query(_inline_windows(windows), windows)).all())
+
+
+def evaluate_all(as_of=None, chunk_size=10000):
+    """Nightly refresh of every goal's counter, a chunk of goals per transaction"""
+    as_of = as_of or datetime.utcnow()
+    evaluated = alerts = 0
+    last_id = 0
+    goal_table = BudgetGoal.__table__
+    while True:
+        goals = db.session.execute(
+            select(goal_table).where(goal_table.c.id > last_id)
+            .order_by(goal_table.c.id).limit(chunk_size)
+        ).all()
+        if not goals:
+            break
+        last_id = goals[-1].id
+
+        spent_by_goal = evaluate_goals(goals, as_of)
+        alerts += sum(
+            1 for goal in goals
+            if BudgetGoal.alert_status(goal.amount, spent_by_goal.get(goal.id, 0.0)) != 'ok'
+        )
+        db.session.commit()
+        evaluated += len(goals)
+    return evaluated, alerts
+
+
+def user_budget_status(user_id, as_of=None):
+    """[(goal, spent, status)] for one user, reading counters and recomputing stale ones in memory"""
+    as_of = as_of or datetime.utcnow()
+    goals = BudgetGoal.query.filter_by(user_id=user_id).order_by(BudgetGoal.id).all()
+    counters = {
+        counter.goal_id: counter
+        for counter in BudgetSpend.query.filter_by(user_id=user_id)
+    }
+
+    stale = [
+        goal for goal in goals
+        if goal.id not in counters
+        or not counters[goal.id].window_start <= as_of < counters[goal.id].window_end
+    ]
+    spent_by_goal = {goal_id: counter.spent for goal_id, counter in counters.items()}
+    if stale:
+        # Stored later by the next goal write or ``flask budgets evaluate``
+        spent_by_goal.update(current_spend(stale, as_of))
+
+    return [
+        (goal, spent_by_goal.get(goal.id, 0.0), goal.check_alert(spent_by_goal.get(goal.id, 0.0)))
+        for goal in goals
+    ]
+
+
+def reset_goal(goal_id):
+    """Forget a goal's counter so it is recomputed on next read"""
+    db.session.execute(BudgetSpend.__table__.delete().where(BudgetSpend.goal_id == goal_id))
+
+
+def apply_spend_changes(changes):
+    """Adjust running counters for expense changes
+
+    ``changes`` is a list of (user_id, date, category, signed_amount). Only
+    counters whose current window contains the date are touched; anything
+    outside a window is picked up when that window is next evaluated.
+    """
+    if not changes:
+        return
+    user_ids = {user_id for user_id, _, _, _ in changes}
+    table = BudgetSpend.__table__
+    goal_table = BudgetGoal.__table__
+    counters = db.session.execute(
+        select(table.c.goal_id, table.c.user_id, goal_table.c.category,
+               table.c.window_start, table.c.window_end)
+        .join(goal_table, goal_table.c.id == table.c.goal_id)
+        .where(table.c.user_id.in_(user_ids))
+    ).all()
+    if not counters:
+        return
+
+    by_user = {}
+    for counter in counters:
+        by_user.setdefault(counter.user_id, []).append(counter)
+
+    increments = {}
+    for user_id, date, category, amount in changes:
+        for counter in by_user.get(user_id, ()):
+            if counter.category is not None and counter.category != category:
+                continue
+            if counter.window_start <= date < counter.window_end:
+                increments[counter.goal_id] = increments.get(counter.goal_id, 0.0) + amount
+
+    if increments:
+        db.session.execute(
+            table.update().where(table.c.goal_id == bindparam('counter_goal_id'))
+            .values(spent=table.c.spent + bindparam('increment')),
+            [{'counter_goal_id': goal_id, 'increment': increment}
+             for goal_id, increment in increments.items()]
+        )
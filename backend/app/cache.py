@@ -0,0 +1,230 @@
+"""Per-user versioned response cache for read endpoints.
+
+Every user has a ``data_version`` counter that write routes bump inside
+their own DB transaction. Cache keys include that version, so a write
+makes the user's old entries unreachable without any explicit purge; the
+LRU policy ages them out. The ETag is derived from the same key, so
+``If-None-Match`` can be answered with 304 before the view runs.
+
+Backends:
+    ``memory`` - in-process LRU (per worker)
+    ``sqlite`` - a local SQLite file shared by every worker on the host
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, make_response, request, Response
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import select
+from .models import db, User
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.not_modified = 0
+
+    def as_dict(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'not_modified': self.not_modified
+        }
+
+
+class MemoryCache:
+    """Thread-safe in-process LRU"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.stats.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class SQLiteCache:
+    """LRU stored in a local SQLite file so gunicorn workers share entries
+
+    Access times are refreshed at most once per ``touch_interval`` seconds to
+    keep hits read-only in the common case.
+    """
+
+    def __init__(self, path, max_entries=10000, touch_interval=60):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.local = threading.local()
+        self.stats = CacheStats()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS response_cache '
+                '(key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed REAL NOT NULL)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS ix_response_cache_accessed ON response_cache (accessed)'
+            )
+
+    def _connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return connection
+
+    def get(self, key):
+        connection = self._connection()
+        row = connection.execute(
+            'SELECT value, accessed FROM response_cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        now = time.time()
+        if now - row[1] > self.touch_interval:
+            connection.execute('UPDATE response_cache SET accessed = ? WHERE key = ?', (now, key))
+        return row[0]
+
+    def set(self, key, value):
+        connection = self._connection()
+        connection.execute(
+            'INSERT OR REPLACE INTO response_cache (key, value, accessed) VALUES (?, ?, ?)',
+            (key, value, time.time())
+        )
+        excess = connection.execute('SELECT COUNT(*) FROM response_cache').fetchone()[0] - self.max_entries
+        if excess > 0:
+            connection.execute(
+                'DELETE FROM response_cache WHERE key IN '
+                '(SELECT key FROM response_cache ORDER BY accessed LIMIT ?)', (excess,)
+            )
+            self.stats.evictions += excess
+
+    def clear(self):
+        self._connection().execute('DELETE FROM response_cache')
+
+
+def init_cache(app):
+    """Build the backend named by CACHE_BACKEND ('memory', 'sqlite' or None to disable)"""
+    backend = app.config.get('CACHE_BACKEND', 'memory')
+    max_entries = app.config.get('CACHE_MAX_ENTRIES', 1024)
+    if backend == 'memory':
+        cache = MemoryCache(max_entries)
+    elif backend == 'sqlite':
+        path = app.config.get('CACHE_PATH') or os.path.join(app.instance_path, 'response_cache.db')
+        cache = SQLiteCache(path, max_entries)
+    else:
+        cache = None
+    app.extensions['response_cache'] = cache
+    return cache
+
+
+def get_cache():
+    return current_app.extensions.get('response_cache')
+
+
+def data_version(user_id):
+    return db.session.execute(
+        select(User.data_version).where(User.id == user_id)
+    ).scalar() or 0
+
+
+def bump_data_version(*user_ids):
+    """Invalidate cached reads for these users; call before the write commits
+
+    Returns {user_id: new version}. The change feed stamps rows with it, so
+    writers bump before touching their rows.
+    """
+    user_ids = {int(user_id) for user_id in user_ids}
+    if not user_ids:
+        return {}
+    table = User.__table__
+    stmt = (
+        table.update().where(table.c.id.in_(sorted(user_ids)))
+        .values(data_version=table.c.data_version + 1)
+    )
+    if db.session.get_bind(clause=stmt).dialect.update_returning:
+        rows = db.session.execute(stmt.returning(table.c.id, table.c.data_version))
+    else:
+        db.session.execute(stmt)
+        rows = db.session.execute(
+            select(table.c.id, table.c.data_version).where(table.c.id.in_(sorted(user_ids)))
+        )
+    return dict(rows.all())
+
+
+def cached_response(vary=None):
+    """Cache a JSON view per user and data version, with ETag/304 support
+
+    ``vary`` returns extra key material for views whose output also depends
+    on something besides the user's data and query string, such as the clock.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return view(*args, **kwargs)
+
+            user_id = get_jwt_identity()
+            parts = [
+                str(user_id),
+                str(data_version(user_id)),
+                request.path,
+                '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+            ]
+            if vary is not None:
+                parts.append(str(vary()))
+            key = '|'.join(parts)
+            etag = hashlib.sha1(key.encode()).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                cache.stats.not_modified += 1
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+
+            body = cache.get(key)
+            if body is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                cache.set(key, body)
+
+            response = Response(body, mimetype='application/json')
+            response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
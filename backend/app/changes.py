@@ -0,0 +1,155 @@
+"""Transaction change feed for delta sync.
+
+Every write bumps the owner's ``data_version`` before touching rows and
+stamps inserted or updated transactions with the new value in
+``change_version``. Deletes leave a ``TransactionTombstone`` stamped the
+same way. A user's versions are handed out under the lock on their
+``user`` row, so they commit in order. A client can therefore keep a
+``(version, id)`` position and ask for everything after it.
+
+Feed pages are read below the user's version as of the start of the
+request. When a page reaches that version, the cursor it returns covers
+the whole version, and the next call only sees later writes.
+
+Tombstones are pruned after ``TOMBSTONE_RETENTION_DAYS``. Pruning raises the
+user's ``changes_floor``. A cursor from before the floor may have missed
+deletes, so the feed answers it with ``reset`` and starts again from the
+beginning.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, func, select
+from .archive import AllTransactions
+from .models import db, TransactionTombstone, User
+from .rollups import _insert_for_dialect
+from .serialization import transaction_columns
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+
+def encode_change_cursor(version, id=None):
+    """Cursor after (version, id); without an id it covers the whole version"""
+    payload = json.dumps([version, id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_change_cursor(token):
+    """Return (version, id or None) for a change cursor, or None if it is malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        version, id = json.loads(base64.urlsafe_b64decode(padded))
+        return int(version), None if id is None else int(id)
+    except (ValueError, TypeError):
+        return None
+
+
+def record_deletes(user_id, version, ids):
+    """Write tombstones for deleted transaction ids inside the current session transaction"""
+    if not ids:
+        return
+    table = TransactionTombstone.__table__
+    now = datetime.utcnow()
+    stmt = _insert_for_dialect()(table)
+    # SQLite may hand a deleted rowid out again, so the same id can be deleted twice
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['transaction_id'],
+        set_={
+            'user_id': stmt.excluded.user_id,
+            'change_version': stmt.excluded.change_version,
+            'deleted_at': stmt.excluded.deleted_at
+        }
+    )
+    db.session.execute(stmt, [
+        {'transaction_id': id, 'user_id': int(user_id), 'change_version': version, 'deleted_at': now}
+        for id in ids
+    ])
+
+
+def _after(query, version_column, id_column, cursor):
+    if cursor is None:
+        return query
+    version, id = cursor
+    if id is None:
+        return query.where(version_column > version)
+    return query.where(db.tuple_(version_column, id_column) > (version, id))
+
+
+def changes_since(user_id, cursor=None, limit=DEFAULT_LIMIT):
+    """One page of changes after ``cursor`` (None for a full sync)
+
+    Returns (rows, deleted_ids, next_cursor, has_more, reset). ``rows`` are
+    projected like ``transaction_rows`` plus ``change_version``.
+    """
+    user_id = int(user_id)
+    state = db.session.execute(
+        select(User.data_version, User.changes_floor).where(User.id == user_id)
+    ).one_or_none()
+    current, floor = state if state is not None else (0, 0)
+
+    reset = False
+    if cursor is not None:
+        version, id = cursor
+        if version < floor or (version == floor and id is not None):
+            cursor, reset = None, True
+
+    rows = db.session.execute(
+        _after(
+            select(*transaction_columns(AllTransactions), AllTransactions.change_version)
+            .where(AllTransactions.user_id == user_id, AllTransactions.change_version <= current),
+            AllTransactions.change_version, AllTransactions.id, cursor
+        )
+        .order_by(AllTransactions.change_version, AllTransactions.id)
+        .limit(limit + 1)
+    ).all()
+    changes = [(row.change_version, row.id, row) for row in rows]
+
+    # A full sync starts from an empty client, which has nothing to delete
+    if cursor is not None:
+        tombstones = db.session.execute(
+            _after(
+                select(TransactionTombstone.change_version, TransactionTombstone.transaction_id)
+                .where(TransactionTombstone.user_id == user_id,
+                       TransactionTombstone.change_version <= current),
+                TransactionTombstone.change_version, TransactionTombstone.transaction_id, cursor
+            )
+            .order_by(TransactionTombstone.change_version, TransactionTombstone.transaction_id)
+            .limit(limit + 1)
+        ).all()
+        changes.extend((version, id, None) for version, id in tombstones)
+
+    changes.sort(key=lambda change: (change[0], change[1]))
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if has_more:
+        next_cursor = encode_change_cursor(changes[-1][0], changes[-1][1])
+    else:
+        next_cursor = encode_change_cursor(current)
+
+    upserts = [row for _, _, row in changes if row is not None]
+    deleted = [id for _, id, row in changes if row is None]
+    return upserts, deleted, next_cursor, has_more, reset
+
+
+def prune_tombstones(older_than_days=30):
+    """Delete tombstones older than the retention window; returns how many were removed"""
+    before = datetime.utcnow() - timedelta(days=older_than_days)
+    tombstones = TransactionTombstone.__table__
+    floors = db.session.execute(
+        select(tombstones.c.user_id, func.max(tombstones.c.change_version))
+        .where(tombstones.c.deleted_at < before)
+        .group_by(tombstones.c.user_id)
+    ).all()
+    if not floors:
+        return 0
+
+    users = User.__table__
+    db.session.execute(
+        users.update().where(users.c.id == bindparam('user_id'))
+        .values(changes_floor=bindparam('floor')),
+        [{'user_id': user_id, 'floor': floor} for user_id, floor in floors]
+    )
+    pruned = db.session.execute(tombstones.delete().where(tombstones.c.deleted_at < before)).rowcount
+    db.session.commit()
+    return pruned
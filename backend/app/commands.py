@@ -0,0 +1,211 @@
+from datetime import datetime, timedelta
+from functools import wraps
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from .models import db
+
+# Service modules are imported inside each command, so registering the CLI
+# on every create_app() does not load them (or dateutil) at worker startup
+
+rollups_cli = AppGroup('rollups', help='Maintain the monthly rollup table.')
+schema_cli = AppGroup('schema', help='Apply and inspect schema migrations.')
+search_cli = AppGroup('search', help='Maintain the full-text search index.')
+recurring_cli = AppGroup('recurring', help='Materialize recurring transactions.')
+budgets_cli = AppGroup('budgets', help='Evaluate budget goals.')
+analytics_cli = AppGroup('analytics', help='Precompute spending analytics.')
+changes_cli = AppGroup('changes', help='Maintain the transaction change feed.')
+archive_cli = AppGroup('archive', help='Move old transactions to the archive table.')
+shards_cli = AppGroup('shards', help='Inspect and rebalance user shards.')
+
+
+def per_shard(command):
+    """Run a command body once per shard, with the session pinned to it"""
+    @wraps(command)
+    def wrapper(*args, **kwargs):
+        from .shards import shard_count, sharding_enabled, use_shard
+        for number in range(shard_count()):
+            if sharding_enabled():
+                click.echo(f'Shard {number}:')
+            use_shard(number)
+            try:
+                command(*args, **kwargs)
+            finally:
+                db.session.remove()
+    return wrapper
+
+
+@rollups_cli.command('rebuild')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user.')
+@per_shard
+def rebuild_command(user_id):
+    """Recompute rollups from the transaction table"""
+    from .rollups import rebuild_rollups
+    rebuild_rollups(user_id)
+    click.echo('Rollups rebuilt')
+
+
+@rollups_cli.command('verify')
+@click.option('--user-id', type=int, default=None, help='Only verify this user.')
+@click.option('--fix', is_flag=True, help='Rebuild when drift is found.')
+@per_shard
+def verify_command(user_id, fix):
+    """Compare rollups against the transaction table"""
+    from .rollups import rebuild_rollups, verify_rollups
+    mismatches = verify_rollups(user_id)
+    for key, expected, actual in mismatches:
+        click.echo(f'{key}: expected {expected}, found {actual}')
+
+    if not mismatches:
+        click.echo('Rollups are consistent')
+        return
+
+    if fix:
+        rebuild_rollups(user_id)
+        click.echo(f'Rebuilt rollups after {len(mismatches)} mismatches')
+    else:
+        raise SystemExit(1)
+
+
+@schema_cli.command('upgrade')
+@click.option('--to', 'target', type=int, default=None, help='Stop at this version.')
+def upgrade_command(target):
+    """Apply pending migrations"""
+    from .migrations import upgrade_all
+    from .shards import sharding_enabled
+    for number, applied in upgrade_all(target).items():
+        prefix = f'Shard {number}: ' if sharding_enabled() else ''
+        if applied:
+            click.echo(f'{prefix}Applied migrations: {", ".join(map(str, applied))}')
+        else:
+            click.echo(f'{prefix}Schema is up to date')
+
+
+@schema_cli.command('current')
+def current_command():
+    """Show the applied and latest schema versions"""
+    from .migrations import current_version, latest_version
+    from .shards import engines, sharding_enabled
+    for number, engine in engines():
+        prefix = f'Shard {number}: ' if sharding_enabled() else ''
+        with engine.connect() as connection:
+            click.echo(f'{prefix}Current version: {current_version(connection)}')
+    click.echo(f'Latest version: {latest_version()}')
+
+
+@search_cli.command('rebuild')
+def rebuild_search_command():
+    """Re-index every transaction for full-text search"""
+    from .search import rebuild_search_index
+    from .shards import engines
+    for _, engine in engines():
+        with engine.begin() as connection:
+            rebuild_search_index(connection)
+    click.echo('Search index rebuilt')
+
+
+@recurring_cli.command('run')
+@click.option('--horizon-days', type=int, default=0,
+              help='Also materialize occurrences due this many days ahead.')
+@click.option('--batch-size', type=int, default=1000, help='Rules per transaction.')
+@per_shard
+def run_recurring_command(horizon_days, batch_size):
+    """Materialize every due occurrence for all users; safe to run from cron"""
+    from .recurrence import materialize_due
+    horizon = datetime.utcnow() + timedelta(days=horizon_days)
+    processed, created = materialize_due(horizon, batch_size)
+    click.echo(f'Processed {processed} rules, created {created} transactions')
+
+
+@budgets_cli.command('evaluate')
+@click.option('--chunk-size', type=int, default=10000, help='Goals per grouped query.')
+@per_shard
+def evaluate_budgets_command(chunk_size):
+    """Refresh every budget goal's spend counter and alert status"""
+    from .budgets import evaluate_all
+    evaluated, alerts = evaluate_all(chunk_size=chunk_size)
+    click.echo(f'Evaluated {evaluated} goals, {alerts} in warning or exceeded')
+
+
+@analytics_cli.command('precompute')
+@click.option('--workers', type=int, default=None, help='Worker processes (default: one per CPU).')
+@click.option('--chunk-size', type=int, default=500, help='Users per worker task.')
+@per_shard
+def precompute_analytics_command(workers, chunk_size):
+    """Recompute and store every user's analytics; meant for a nightly cron"""
+    from .analytics import precompute_all
+    processed = precompute_all(workers=workers, chunk_size=chunk_size)
+    click.echo(f'Computed analytics for {processed} users')
+
+
+@changes_cli.command('prune')
+@click.option('--older-than-days', type=int, default=None,
+              help='Tombstone age to keep (default TOMBSTONE_RETENTION_DAYS).')
+@per_shard
+def prune_changes_command(older_than_days):
+    """Delete old delete tombstones; clients synced before them get a full resync"""
+    from .changes import prune_tombstones
+    if older_than_days is None:
+        older_than_days = current_app.config.get('TOMBSTONE_RETENTION_DAYS', 30)
+    pruned = prune_tombstones(older_than_days)
+    click.echo(f'Pruned {pruned} tombstones older than {older_than_days} days')
+
+
+@archive_cli.command('run')
+@click.option('--keep-years', type=click.IntRange(min=1), default=None,
+              help='Full years to keep hot besides the current one (default ARCHIVE_KEEP_YEARS).')
+@click.option('--batch-size', type=int, default=1000, help='Transactions moved per commit.')
+@per_shard
+def run_archive_command(keep_years, batch_size):
+    """Archive transactions older than the kept years; safe to run while serving"""
+    from .archive import archive_transactions
+    if keep_years is None:
+        keep_years = current_app.config.get('ARCHIVE_KEEP_YEARS', 2)
+    moved = archive_transactions(keep_years, batch_size)
+    click.echo(f'Archived {moved} transactions')
+
+
+@archive_cli.command('status')
+@per_shard
+def archive_status_command():
+    """Show the archive boundary and the hot and archived row counts"""
+    from .archive import archive_status
+    boundary, hot, archived = archive_status()
+    click.echo(f'Boundary: {boundary.date().isoformat() if boundary else "none"}')
+    click.echo(f'Hot transactions: {hot}')
+    click.echo(f'Archived transactions: {archived}')
+
+
+@shards_cli.command('status')
+def shards_status_command():
+    """Show users and transactions per shard"""
+    from .shards import shard_sizes
+    for number, (users, transactions) in shard_sizes().items():
+        click.echo(f'Shard {number}: {users} users, {transactions} transactions')
+
+
+@shards_cli.command('move')
+@click.option('--user-id', type=int, required=True)
+@click.option('--to', 'target', type=int, required=True, help='Destination shard number.')
+@click.option('--grace-seconds', type=float, default=2.0, help='Wait for in-flight requests.')
+def move_user_command(user_id, target, grace_seconds):
+    """Move one user's data to another shard; re-run it to finish an interrupted move"""
+    from .shards import move_user, shard_count
+    if not 0 <= target < shard_count():
+        raise click.BadParameter(f'choose a shard from 0 to {shard_count() - 1}', param_hint='--to')
+    copied = move_user(user_id, target, grace_seconds)
+    click.echo(f'Moved user {user_id} to shard {target} ({copied} rows)')
+
+
+@shards_cli.command('rebalance')
+@click.option('--limit', type=int, default=None, help='Move at most this many users.')
+@click.option('--grace-seconds', type=float, default=2.0, help='Wait for in-flight requests per user.')
+def rebalance_command(limit, grace_seconds):
+    """Move users whose hashed shard changed, e.g. after adding a shard to SHARD_URIS"""
+    from .shards import rebalance
+
+    def report(user_id, source, target, copied):
+        click.echo(f'User {user_id}: shard {source} -> {target} ({copied} rows)')
+
+    moved = rebalance(grace_seconds, limit, on_move=report)
+    click.echo(f'Moved {moved} users')
@@ -2,6 +2,71 @@ import os
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret')
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///budget.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///expense_tracker.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    JWT_SECRET_KEY = 'super-secret-key'
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key')  # Change in production
+
+    # Migrations run from `flask schema upgrade`; set to migrate on boot instead
+    AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', '').lower() in ('1', 'true')
+    # Import and register route blueprints on the first request (see app/blueprints.py)
+    LAZY_BLUEPRINTS = os.environ.get('LAZY_BLUEPRINTS', 'true').lower() in ('1', 'true')
+
+    # Optional read replica; reads during GET requests are sent to it
+    READ_REPLICA_URI = os.environ.get('READ_REPLICA_URL')
+
+    # Extra databases for per-user data, comma-separated; the main one is shard 0 (see app/shards.py)
+    SHARD_URIS = [uri.strip() for uri in os.environ.get('SHARD_URLS', '').split(',') if uri.strip()]
+
+    # SQLite profile, applied to every new connection
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'busy_timeout': 5000,
+        'synchronous': 'NORMAL',
+        'mmap_size': 268435456
+    }
+
+    # PostgreSQL pool profile, per worker process
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = True
+
+    # Group-commit queue for transaction writes (see app/write_queue.py)
+    WRITE_QUEUE_ENABLED = os.environ.get('WRITE_QUEUE_ENABLED', '').lower() in ('1', 'true')
+    WRITE_QUEUE_MAX_BATCH = int(os.environ.get('WRITE_QUEUE_MAX_BATCH', 100))
+    WRITE_QUEUE_MAX_WAIT_MS = float(os.environ.get('WRITE_QUEUE_MAX_WAIT_MS', 5))
+    # Seconds a request waits for its write; then 503 if it never started, 504 if its outcome is unknown
+    WRITE_QUEUE_TIMEOUT = float(os.environ.get('WRITE_QUEUE_TIMEOUT', 30))
+
+    # Deleted-transaction tombstones kept for the change feed (see app/changes.py)
+    TOMBSTONE_RETENTION_DAYS = int(os.environ.get('TOMBSTONE_RETENTION_DAYS', 30))
+
+    # Password KDF parameters (werkzeug method strings) and its bounded pool (see app/passwords.py)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH', 16))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 32))
+
+    # Full years kept in the hot transaction table (see app/archive.py)
+    ARCHIVE_KEEP_YEARS = int(os.environ.get('ARCHIVE_KEEP_YEARS', 2))
+
+class ProductionConfig(Config):
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    CACHE_BACKEND = 'sqlite'
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite://')
+    READ_REPLICA_URI = os.environ.get('TEST_READ_REPLICA_URL')
+    # Only logged, so one repeated query does not fail unrelated tests; tests/test_n_plus_one.py raises
+    N_PLUS_ONE_DETECTION = 'log'
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    AUTO_MIGRATE = True
+
+config = {
+    'default': Config,
+    'production': ProductionConfig,
+    'testing': TestingConfig
+}
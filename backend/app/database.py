@@ -0,0 +1,135 @@
+"""Engine profiles and read-replica routing.
+
+``configure_database`` turns the ``DB_*`` and ``SQLITE_PRAGMAS`` settings
+into engine options before ``db.init_app``:
+
+- SQLite connections get WAL, a busy timeout, ``synchronous=NORMAL`` and
+  memory-mapped reads, applied on connect, so concurrent workers read
+  while one writes instead of failing with "database is locked".
+- PostgreSQL gets a sized QueuePool with pre-ping and recycling.
+
+When ``READ_REPLICA_URI`` is set it is registered as the ``replica`` bind,
+and ``RoutingSession`` sends reads made during GET/HEAD requests there.
+Each ``SHARD_URIS`` entry becomes a ``shard-<n>`` bind; a session pinned to
+a shard (see app/shards.py) sends everything there.
+"""
+from functools import wraps
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+REPLICA_BIND = 'replica'
+SHARD_BIND = 'shard-{}'
+READ_METHODS = ('GET', 'HEAD')
+
+
+def normalize_uri(uri):
+    # Heroku-style URLs use a scheme SQLAlchemy no longer accepts
+    if uri and uri.startswith('postgres://'):
+        return 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def engine_options(uri, config):
+    """Engine keyword arguments for a database URI under the app's profile"""
+    backend = make_url(uri).get_backend_name()
+    if backend == 'postgresql':
+        return {
+            'pool_size': config.get('DB_POOL_SIZE', 5),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+            'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)
+        }
+    if backend == 'sqlite':
+        # Matches busy_timeout so pysqlite's own wait agrees with the pragma
+        busy_timeout = config.get('SQLITE_PRAGMAS', {}).get('busy_timeout', 5000)
+        return {'connect_args': {'timeout': busy_timeout / 1000}}
+    return {}
+
+
+def configure_database(app):
+    """Fill in engine options and the replica bind; call before db.init_app"""
+    config = app.config
+    config['SQLALCHEMY_DATABASE_URI'] = normalize_uri(config['SQLALCHEMY_DATABASE_URI'])
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in config:
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(config['SQLALCHEMY_DATABASE_URI'], config)
+
+    replica = normalize_uri(config.get('READ_REPLICA_URI'))
+    if replica:
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        binds[REPLICA_BIND] = {'url': replica, **engine_options(replica, config)}
+        config['SQLALCHEMY_BINDS'] = binds
+
+    shards = [normalize_uri(uri) for uri in config.get('SHARD_URIS') or []]
+    if shards:
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        for number, uri in enumerate(shards, start=1):
+            binds[SHARD_BIND.format(number)] = {'url': uri, **engine_options(uri, config)}
+        config['SQLALCHEMY_BINDS'] = binds
+
+
+def install_engine_events(app, db):
+    """Apply SQLITE_PRAGMAS to every new SQLite connection; call after db.init_app"""
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite' and pragmas:
+                event.listen(engine, 'connect', _pragma_listener(pragmas))
+
+
+def _pragma_listener(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return set_pragmas
+
+
+def use_primary(view):
+    """Keep a GET view on the primary, for reads that must see the latest writes or that write"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_primary = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+    """Session that sends reads in GET/HEAD requests to the replica bind
+
+    A session pinned to a shard other than 0 (``info['shard']``) sends every
+    statement to that shard's bind instead; the replica only mirrors the
+    main database.
+
+    Flushes, INSERT/UPDATE/DELETE statements and raw ``connection()`` calls
+    go to the primary. After one of them, the session stays on the primary
+    for the rest of the request, so a request always reads its own writes.
+    DML written as ``text()`` cannot be recognised, so views that issue it
+    must be marked ``use_primary``.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get('shard'):
+            return self._db.engines[SHARD_BIND.format(self.info['shard'])]
+        if bind is None and self._read_from_replica(mapper, clause):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def connection(self, *args, **kwargs):
+        self.info['primary'] = True
+        return super().connection(*args, **kwargs)
+
+    def _read_from_replica(self, mapper, clause):
+        if self.info.get('primary') or not has_request_context():
+            return False
+        if request.method not in READ_METHODS or g.get('use_primary'):
+            return False
+        if REPLICA_BIND not in self._db.engines:
+            return False
+        if self._flushing or getattr(clause, 'is_dml', False):
+            self.info['primary'] = True
+            return False
+        return mapper is not None or clause is not None
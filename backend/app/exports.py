@@ -0,0 +1,185 @@
+"""Streaming export of a user's transactions to CSV, NDJSON or a JSON array.
+
+Rows are read in fixed-size batches, so memory does not grow with history
+size, and archived transactions are included. PostgreSQL reads through one
+server-side cursor (``yield_per``). SQLite reads keyset-ordered batches in short transactions, so a long
+export never holds a read lock that blocks writers. Background exports
+run on a small local thread pool and record status and progress in
+``ExportLog``, on the requesting user's shard.
+"""
+import csv
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import Lock
+from sqlalchemy import select
+from .archive import AllTransactions
+from .models import db, ExportLog
+from .serialization import iter_json_array
+from .shards import current_shard, use_shard
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'json': ('application/json', 'json'),
+}
+
+COLUMNS = (
+    AllTransactions.id, AllTransactions.date, AllTransactions.amount, AllTransactions.category,
+    AllTransactions.transaction_type, AllTransactions.description,
+    AllTransactions.is_recurring, AllTransactions.recurring_interval
+)
+HEADER = [column.key for column in COLUMNS]
+
+_executor = None
+_executor_lock = Lock()
+
+
+def iter_batches(user_id, batch_size=1000, engine=None):
+    """Yield lists of row tuples for a user, oldest first"""
+    engine = engine or db.session.get_bind()
+    base = select(*COLUMNS).where(AllTransactions.user_id == user_id)\
+        .order_by(AllTransactions.date, AllTransactions.id)
+
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as connection:
+            result = connection.execution_options(yield_per=batch_size).execute(base)
+            for partition in result.partitions():
+                yield partition
+        return
+
+    last = None
+    while True:
+        query = base
+        if last is not None:
+            query = query.where(db.tuple_(AllTransactions.date, AllTransactions.id) > last)
+        with engine.connect() as connection:
+            batch = connection.execute(query.limit(batch_size)).all()
+        if not batch:
+            return
+        yield batch
+        last = (batch[-1].date, batch[-1].id)
+
+
+def _row_values(row):
+    values = list(row)
+    values[1] = row.date.isoformat() if row.date else None
+    return values
+
+
+def csv_chunks(batches):
+    """Encode batches as CSV text, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADER)
+    yield buffer.getvalue()
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(_row_values(row) for row in batch)
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(batches):
+    """Encode batches as newline-delimited JSON, one chunk per batch"""
+    for batch in batches:
+        yield ''.join(
+            json.dumps(dict(zip(HEADER, _row_values(row)))) + '\n' for row in batch
+        )
+
+
+ENCODERS = {
+    'csv': csv_chunks,
+    'ndjson': ndjson_chunks,
+    # Same objects as the list endpoints, streamed as one array
+    'json': iter_json_array,
+}
+
+
+def stream_export(user_id, export_format, batch_size=1000):
+    """Iterator of text chunks for the whole export"""
+    # Resolved now, while the session is still pinned to the user's shard
+    engine = db.session.get_bind()
+    return ENCODERS[export_format](iter_batches(user_id, batch_size, engine))
+
+
+def export_path(app, export_log):
+    directory = app.config.get('EXPORT_DIR') or os.path.join(app.instance_path, 'exports')
+    extension = EXPORT_FORMATS[export_log.export_type][1]
+    return os.path.join(directory, str(export_log.user_id), f'{export_log.id}.{extension}')
+
+
+def get_executor(app):
+    """Process-wide export worker pool, sized by EXPORT_WORKERS"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('EXPORT_WORKERS', 2),
+                thread_name_prefix='export'
+            )
+        return _executor
+
+
+def run_export(app, export_id, shard=0):
+    """Write an export file and record progress; runs on a worker thread"""
+    with app.app_context():
+        use_shard(shard)
+        export_log = db.session.get(ExportLog, export_id)
+        batch_size = app.config.get('EXPORT_BATCH_SIZE', 1000)
+        path = export_path(app, export_log)
+        partial = path + '.part'
+
+        try:
+            export_log.status = 'running'
+            export_log.rows_exported = 0
+            db.session.commit()
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            batches = _counted(iter_batches(export_log.user_id, batch_size), export_log)
+            chunks = ENCODERS[export_log.export_type](batches)
+            with open(partial, 'w', newline='', encoding='utf-8') as handle:
+                for chunk_number, chunk in enumerate(chunks):
+                    handle.write(chunk)
+                    if chunk_number % 10 == 0:
+                        db.session.commit()
+            os.replace(partial, path)
+
+            export_log.file_path = path
+            export_log.status = 'completed'
+            export_log.timestamp = datetime.utcnow()
+            db.session.commit()
+        except Exception as error:
+            db.session.rollback()
+            export_log.status = 'failed'
+            export_log.error_message = str(error)[:200]
+            db.session.commit()
+            if os.path.exists(partial):
+                os.remove(partial)
+        finally:
+            db.session.remove()
+
+
+def _counted(batches, export_log):
+    """Pass batches through while keeping export_log.rows_exported current"""
+    for batch in batches:
+        export_log.rows_exported += len(batch)
+        yield batch
+
+
+def start_export(app, user_id, export_format):
+    """Create a pending ExportLog and queue the export on the worker pool"""
+    export_log = ExportLog(
+        user_id=user_id,
+        export_type=export_format,
+        status='pending',
+        rows_exported=0
+    )
+    db.session.add(export_log)
+    db.session.commit()
+
+    get_executor(app).submit(run_export, app, export_log.id, current_shard())
+    return export_log
@@ -0,0 +1,294 @@
+"""Streaming bulk import of transactions from JSON, CSV or NDJSON uploads.
+
+Records are read lazily from the request stream, validated a batch at a
+time with one pass per column, and inserted through Core executemany in
+chunks. Rollup deltas and recurrence rules are written per chunk in the
+same transaction; the user's data version is bumped once, before the
+first chunk, and stamped on every row for the change feed.
+"""
+import csv
+import io
+import json
+import math
+from datetime import datetime, timezone
+from .cache import bump_data_version
+from .models import db, Transaction, VALID_CATEGORIES, TRANSACTION_TYPES, RECURRING_INTERVALS
+from .recurrence import create_rules
+from .rollups import RollupDelta
+
+MAX_REPORTED_ERRORS = 100
+TRUE_VALUES = {True, 'true', 'True', 'TRUE', '1', 'yes', 1}
+FALSE_VALUES = {False, 'false', 'False', 'FALSE', '0', 'no', 0, '', None}
+
+CATEGORY_SET = frozenset(VALID_CATEGORIES)
+TYPE_SET = frozenset(TRANSACTION_TYPES)
+INTERVAL_SET = frozenset(RECURRING_INTERVALS)
+DELIMITERS = frozenset(' \t\r\n,]')
+
+
+class ImportFormatError(ValueError):
+    """The upload could not be parsed in the declared format"""
+
+
+def iter_json_records(stream, read_size=65536):
+    """Legacy JSON array body, decoded one element at a time as the stream is read"""
+    decoder = json.JSONDecoder()
+    reader = io.TextIOWrapper(stream, encoding='utf-8')
+    buffer, position, eof = '', 0, False
+
+    def next_char():
+        # Skips whitespace, reading more as needed; '' at the end of the body
+        nonlocal buffer, position, eof
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n':
+                position += 1
+            if position < len(buffer) or eof:
+                return buffer[position:position + 1]
+            buffer, position = reader.read(read_size), 0
+            eof = not buffer
+
+    def invalid(message):
+        return ImportFormatError(f'Invalid JSON: {message}')
+
+    first = next_char()
+    if first != '[':
+        # Tell a valid non-array body apart from malformed JSON
+        try:
+            json.loads(buffer[position:] + reader.read())
+        except ValueError as error:
+            raise invalid(error)
+        raise ImportFormatError('Expected a list of transactions')
+    position += 1
+    if next_char() == ']':
+        position += 1
+    else:
+        while True:
+            next_char()
+            while True:
+                try:
+                    record, end = decoder.raw_decode(buffer, position)
+                    # Only a delimiter proves the value is whole; "12" may be the start of "12.5"
+                    if eof or buffer[end:end + 1] in DELIMITERS:
+                        break
+                except ValueError as error:
+                    if eof:
+                        raise invalid(error)
+                more = reader.read(read_size)
+                buffer, position, eof = buffer[position:] + more, 0, not more
+            position = end
+            yield record
+
+            separator = next_char()
+            position += 1
+            if separator == ']':
+                break
+            if separator != ',':
+                raise invalid(f'expected "," or "]" but found {separator!r}' if separator else 'unexpected end')
+    if next_char():
+        raise invalid('extra data after the array')
+
+
+def iter_ndjson_records(stream):
+    for line_number, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8'), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            raise ImportFormatError(f'Invalid JSON on line {line_number}: {error}')
+
+
+def iter_csv_records(stream):
+    return csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8', newline=''))
+
+
+READERS = {
+    'application/json': iter_json_records,
+    'application/x-ndjson': iter_ndjson_records,
+    'application/jsonl': iter_ndjson_records,
+    'text/csv': iter_csv_records,
+}
+
+
+def iter_batches(records, batch_size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _member(value, allowed):
+    """Set membership that treats unhashable JSON values (lists, objects) as absent"""
+    try:
+        return value in allowed
+    except TypeError:
+        return False
+
+
+def _choice_error(value, choices):
+    if value is None:
+        return 'Missing data for required field.'
+    return 'Must be one of: ' + ', '.join(choices) + '.'
+
+
+def _column(batch, field):
+    return [record.get(field) if isinstance(record, dict) else None for record in batch]
+
+
+def validate_batch(batch, user_id, now):
+    """Validate a batch column by column
+
+    Returns (rows, errors): insertable dicts, and {position: {field: [messages]}}
+    for every record that failed.
+    """
+    errors = {}
+
+    def fail(position, field, message):
+        errors.setdefault(position, {}).setdefault(field, []).append(message)
+
+    for position, record in enumerate(batch):
+        if not isinstance(record, dict):
+            fail(position, '_schema', 'Invalid input type.')
+
+    amounts = []
+    for position, value in enumerate(_column(batch, 'amount')):
+        try:
+            # Same rules as TransactionSchema's Float field: no booleans, no nan or infinity
+            if isinstance(value, bool):
+                raise TypeError(value)
+            amount = float(value)
+        except (TypeError, ValueError):
+            missing = value in (None, '')
+            fail(position, 'amount', 'Missing data for required field.' if missing else 'Not a valid number.')
+            amount = None
+        else:
+            if not math.isfinite(amount):
+                fail(position, 'amount', 'Special numeric values (nan or infinity) are not permitted.')
+                amount = None
+            elif not amount >= 0.01:
+                fail(position, 'amount', 'Must be greater than or equal to 0.01.')
+        amounts.append(amount)
+
+    descriptions = _column(batch, 'description')
+    for position, value in enumerate(descriptions):
+        if value is None:
+            fail(position, 'description', 'Missing data for required field.')
+        elif not isinstance(value, str):
+            fail(position, 'description', 'Not a valid string.')
+
+    categories = _column(batch, 'category')
+    for position, value in enumerate(categories):
+        if not _member(value, CATEGORY_SET):
+            fail(position, 'category', _choice_error(value, VALID_CATEGORIES))
+
+    types = _column(batch, 'transaction_type')
+    for position, value in enumerate(types):
+        if not _member(value, TYPE_SET):
+            fail(position, 'transaction_type', _choice_error(value, TRANSACTION_TYPES))
+
+    recurring = []
+    for position, value in enumerate(_column(batch, 'is_recurring')):
+        if _member(value, TRUE_VALUES):
+            recurring.append(True)
+        elif _member(value, FALSE_VALUES):
+            recurring.append(False)
+        else:
+            fail(position, 'is_recurring', 'Not a valid boolean.')
+            recurring.append(False)
+
+    intervals = _column(batch, 'recurring_interval')
+    for position, value in enumerate(intervals):
+        if _member(value, (None, '')):
+            intervals[position] = None
+        elif not _member(value, INTERVAL_SET):
+            fail(position, 'recurring_interval', _choice_error(value, RECURRING_INTERVALS))
+
+    dates = []
+    for position, value in enumerate(_column(batch, 'date')):
+        if value in (None, ''):
+            dates.append(now)
+            continue
+        try:
+            date = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            fail(position, 'date', 'Not a valid datetime.')
+            dates.append(None)
+            continue
+        if date.tzinfo is not None:
+            # Stored as naive UTC, like every other timestamp
+            date = date.astimezone(timezone.utc).replace(tzinfo=None)
+        dates.append(date)
+
+    rows = [
+        {
+            'user_id': user_id,
+            'amount': amounts[position],
+            'description': descriptions[position],
+            'category': categories[position],
+            'transaction_type': types[position],
+            'date': dates[position],
+            'is_recurring': recurring[position],
+            'recurring_interval': intervals[position]
+        }
+        for position in range(len(batch))
+        if position not in errors
+    ]
+    return rows, errors
+
+
+def import_transactions(records, user_id, chunk_size=1000, skip_invalid=False):
+    """Validate and insert records in chunks inside the current session transaction
+
+    Returns a summary dict. Without skip_invalid nothing is inserted once any
+    record fails; the caller must roll back when 'failed' is non-zero.
+    """
+    user_id = int(user_id)
+    table = Transaction.__table__
+    now = datetime.utcnow()
+    inserted = failed = offset = 0
+    row_errors = []
+    version = None
+
+    for batch in iter_batches(records, chunk_size):
+        rows, errors = validate_batch(batch, user_id, now)
+        for position in sorted(errors):
+            failed += 1
+            if len(row_errors) < MAX_REPORTED_ERRORS:
+                row_errors.append({'index': offset + position, 'errors': errors[position]})
+        offset += len(batch)
+
+        if failed and not skip_invalid:
+            # Keep validating so the caller gets every error, but stop writing
+            continue
+        if rows:
+            if version is None:
+                version = bump_data_version(user_id)[user_id]
+            for row in rows:
+                row['change_version'] = version
+            if any(row['is_recurring'] for row in rows):
+                # Recurring rows need their ids to seed recurrence rules
+                ids = db.session.execute(
+                    table.insert().returning(table.c.id, sort_by_parameter_order=True), rows
+                ).scalars().all()
+                for row, id in zip(rows, ids):
+                    row['id'] = id
+                create_rules(rows)
+            else:
+                db.session.execute(table.insert(), rows)
+            delta = RollupDelta()
+            for row in rows:
+                delta.add_values(user_id, row['date'], row['category'],
+                                 row['transaction_type'], row['amount'])
+            delta.apply()
+            inserted += len(rows)
+
+    return {
+        'received': offset,
+        'inserted': inserted,
+        'failed': failed,
+        'errors': row_errors
+    }
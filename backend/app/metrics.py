@@ -0,0 +1,218 @@
+"""Request instrumentation: latency, SQL counts and response sizes, exposed at /metrics.
+
+Each request records its latency, the number of SQL statements it ran,
+their total time, and the response size. The SQL figures come from
+SQLAlchemy cursor events. Everything is aggregated into per-endpoint
+histograms, which ``/metrics`` serves in the Prometheus text format
+together with the response-cache counters. Figures are per process, so
+each gunicorn worker is scraped (or aggregated) separately.
+
+Config:
+    ``METRICS_ENABLED`` - register the hooks and endpoint (default True)
+    ``SLOW_REQUEST_MS`` - requests slower than this log their SQL (default 500)
+    ``N_PLUS_ONE_DETECTION`` - None, 'log' or 'raise'; flags a request that
+        runs the same statement ``N_PLUS_ONE_THRESHOLD`` times (default 10)
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger(__name__ + '.slow')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+# Statements kept per request for the slow log; the counters see all of them
+MAX_RECORDED_STATEMENTS = 200
+
+
+class NPlusOneError(RuntimeError):
+    """A request ran the same statement too many times"""
+
+
+class Histogram:
+    def __init__(self, name, help, buckets, labels=('method', 'endpoint')):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.labels = labels
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            items = sorted(self.series.items())
+        for label_values, series in items:
+            labels = _labels(self.labels, label_values)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series[-1]}')
+            lines.append(f'{self.name}_sum{{{labels}}} {series[-2]}')
+            lines.append(f'{self.name}_count{{{labels}}} {series[-1]}')
+        return lines
+
+
+class RequestCounter:
+    def __init__(self, name, help, labels=('method', 'endpoint', 'status')):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values):
+        with self.lock:
+            self.counts[label_values] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self.lock:
+            items = sorted(self.counts.items())
+        for label_values, count in items:
+            lines.append(f'{self.name}{{{_labels(self.labels, label_values)}}} {count}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class Metrics:
+    def __init__(self):
+        self.requests = RequestCounter('http_requests_total', 'Requests by endpoint and status.')
+        self.latency = Histogram('http_request_duration_seconds', 'Request latency.', LATENCY_BUCKETS)
+        self.queries = Histogram('http_request_sql_queries', 'SQL statements per request.', QUERY_BUCKETS)
+        self.db_time = Histogram('http_request_sql_duration_seconds', 'Time spent in SQL per request.',
+                                 LATENCY_BUCKETS)
+        self.size = Histogram('http_response_size_bytes', 'Response body size.', SIZE_BUCKETS)
+
+    def render(self, cache=None):
+        lines = []
+        for metric in (self.requests, self.latency, self.queries, self.db_time, self.size):
+            lines.extend(metric.render())
+        if cache is not None:
+            for key, value in cache.stats.as_dict().items():
+                name = f'response_cache_{key}_total'
+                lines.extend([f'# TYPE {name} counter', f'{name} {value}'])
+        return '\n'.join(lines) + '\n'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and has_request_context():
+        context.metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'metrics_started', None)
+    stats = g.get('sql_stats') if started is not None else None
+    if stats is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats['count'] += 1
+    stats['seconds'] += elapsed
+    stats['repeats'][statement] += 1
+    if len(stats['statements']) < MAX_RECORDED_STATEMENTS:
+        stats['statements'].append((elapsed, statement))
+
+
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.sql_stats = {'count': 0, 'seconds': 0.0, 'repeats': Counter(), 'statements': []}
+
+
+def _endpoint():
+    # The URL rule, not the path, keeps label cardinality bounded
+    return request.url_rule.rule if request.url_rule else '<unmatched>'
+
+
+def _finish_request(response):
+    started = g.pop('request_started', None)
+    stats = g.pop('sql_stats', None)
+    if started is None or stats is None or request.path == '/metrics':
+        return response
+
+    elapsed = time.perf_counter() - started
+    metrics = current_app.extensions['metrics']
+    labels = (request.method, _endpoint())
+    metrics.requests.inc(*labels, response.status_code)
+    metrics.latency.observe(elapsed, *labels)
+    metrics.queries.observe(stats['count'], *labels)
+    metrics.db_time.observe(stats['seconds'], *labels)
+    if response.content_length is not None:
+        metrics.size.observe(response.content_length, *labels)
+
+    if elapsed * 1000 >= current_app.config.get('SLOW_REQUEST_MS', 500):
+        _log_slow_request(elapsed, stats)
+    _check_n_plus_one(stats)
+    return response
+
+
+def _log_slow_request(elapsed, stats):
+    slowest = sorted(stats['statements'], reverse=True)[:5]
+    slow_logger.warning(
+        '%s %s took %.0f ms with %d SQL statements (%.0f ms in SQL); slowest:\n%s',
+        request.method, request.full_path.rstrip('?'), elapsed * 1000,
+        stats['count'], stats['seconds'] * 1000,
+        '\n'.join(f'  {seconds * 1000:.1f} ms  {" ".join(statement.split())[:500]}'
+                  for seconds, statement in slowest)
+    )
+
+
+def _check_n_plus_one(stats):
+    mode = current_app.config.get('N_PLUS_ONE_DETECTION')
+    if not mode or not stats['repeats']:
+        return
+    threshold = current_app.config.get('N_PLUS_ONE_THRESHOLD', 10)
+    statement, count = stats['repeats'].most_common(1)[0]
+    if count < threshold:
+        return
+
+    message = f'{request.method} {request.path} ran this statement {count} times: {" ".join(statement.split())[:500]}'
+    if mode == 'raise':
+        raise NPlusOneError(message)
+    logger.warning('Possible N+1 query: %s', message)
+
+
+def metrics_view():
+    metrics = current_app.extensions['metrics']
+    body = metrics.render(current_app.extensions.get('response_cache'))
+    return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_metrics(app):
+    """Install the request hooks and the /metrics endpoint"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return None
+
+    metrics = Metrics()
+    app.extensions['metrics'] = metrics
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    return metrics
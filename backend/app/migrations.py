@@ -0,0 +1,271 @@
+"""Versioned schema migrations.
+
+Each migration is a function taking a Connection, registered with
+``@migration(version, description)``. Applied versions are recorded in the
+``schema_version`` table; ``upgrade`` runs whatever is missing, in order,
+each inside its own transaction.
+
+The app does not migrate on boot. ``flask schema upgrade`` applies
+migrations, and ``init_schema_check`` only reads the stored version at
+startup (one query). While the database is behind the code, requests get
+503 and the version is read again on each one, so workers recover as
+soon as the upgrade has run. ``AUTO_MIGRATE`` upgrades on boot instead,
+for throwaway databases such as the test config's in-memory SQLite. With
+sharding on, every shard carries the full schema and the check uses the
+oldest of their versions.
+"""
+import logging
+from datetime import datetime
+from flask import jsonify
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.schema import CreateColumn
+from .models import (
+    db, User, Transaction, BudgetGoal, BudgetSpend, ExportLog, MonthlyRollup, RecurrenceRule,
+    TransactionArchive, TransactionTombstone, UserAnalytics, ArchiveState
+)
+from .rollups import rollup_totals_query
+from .recurrence import backfill_recurrence_rules
+from .search import create_search_index
+from .shards import engines
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+schema_metadata = MetaData()
+schema_version = Table(
+    'schema_version', schema_metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('description', String(200)),
+    Column('applied_at', DateTime, default=datetime.utcnow)
+)
+
+
+def migration(version, description):
+    """Register a migration function under a schema version"""
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return fn
+    return register
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def current_version(connection):
+    """Highest applied version, or 0 for a database that has never been migrated"""
+    if not inspect(connection).has_table(schema_version.name):
+        return 0
+    versions = connection.execute(select(schema_version.c.version)).scalars().all()
+    return max(versions, default=0)
+
+
+def upgrade(engine=None, target=None):
+    """Apply pending migrations up to ``target`` (default: latest) and return their versions"""
+    engine = engine or db.engine
+    target = latest_version() if target is None else target
+
+    with engine.begin() as connection:
+        schema_metadata.create_all(connection)
+        applied = current_version(connection)
+
+    done = []
+    for version, description, fn in MIGRATIONS:
+        if version <= applied or version > target:
+            continue
+        with engine.begin() as connection:
+            fn(connection)
+            connection.execute(schema_version.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        done.append(version)
+    return done
+
+
+def stored_version(engine=None):
+    """Highest applied version in a single query; 0 when nothing was ever applied"""
+    engine = engine or db.engine
+    try:
+        with engine.connect() as connection:
+            return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        # No schema_version table yet
+        return 0
+
+
+def upgrade_all(target=None):
+    """Upgrade the main database and every shard; returns {shard: applied versions}"""
+    return {number: upgrade(engine, target) for number, engine in engines()}
+
+
+def oldest_version():
+    """The lowest stored version across the main database and the shards"""
+    return min(stored_version(engine) for _, engine in engines())
+
+
+def init_schema_check(app):
+    """Compare the stored schema version with the code's at startup"""
+    with app.app_context():
+        if app.config.get('AUTO_MIGRATE'):
+            upgrade_all()
+            return
+        applied = oldest_version()
+    latest = latest_version()
+    if applied >= latest:
+        return
+
+    logger.error('Database schema is at version %s, code expects %s; run `flask schema upgrade`',
+                 applied, latest)
+    state = {'applied': applied}
+
+    @app.before_request
+    def require_current_schema():
+        if state['applied'] < latest:
+            state['applied'] = oldest_version()
+        if state['applied'] < latest:
+            return jsonify({'error': 'Database schema is out of date'}), 503
+
+
+def create_indexes_if_missing(connection, model, *names):
+    """Create the named indexes declared on a model, skipping existing ones"""
+    indexes = {index.name: index for index in model.__table__.indexes}
+    for name in names:
+        indexes[name].create(bind=connection, checkfirst=True)
+
+
+def add_columns_if_missing(connection, model, *names):
+    """ALTER TABLE ADD COLUMN for model columns the live table does not have yet"""
+    table = model.__table__
+    existing = {column['name'] for column in inspect(connection).get_columns(table.name)}
+    preparer = connection.dialect.identifier_preparer
+    for name in names:
+        if name in existing:
+            continue
+        column_ddl = CreateColumn(table.c[name]).compile(dialect=connection.dialect)
+        connection.execute(text(f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {column_ddl}'))
+
+
+@migration(1, 'initial schema')
+def initial_schema(connection):
+    # Fresh databases get every current table here; later migrations then
+    # only have work to do on databases created before they existed
+    db.metadata.create_all(connection)
+
+
+@migration(2, 'monthly rollups')
+def monthly_rollups(connection):
+    table = MonthlyRollup.__table__
+    table.create(bind=connection, checkfirst=True)
+    connection.execute(table.delete())
+    connection.execute(table.insert().from_select(
+        ['user_id', 'month', 'category', 'transaction_type', 'total', 'count'],
+        # Predates the archive table, which older databases do not have yet
+        rollup_totals_query(source=Transaction)
+    ))
+
+
+@migration(3, 'transaction composite indexes')
+def transaction_indexes(connection):
+    create_indexes_if_missing(
+        connection, Transaction,
+        'ix_transaction_user_date',
+        'ix_transaction_user_category',
+        'ix_transaction_user_type_date'
+    )
+
+
+@migration(4, 'full-text search index')
+def search_index(connection):
+    # The archive table arrives in migration 11 and is indexed from migration 14
+    create_search_index(connection, ('transaction',))
+
+
+@migration(5, 'export progress columns')
+def export_progress(connection):
+    add_columns_if_missing(connection, ExportLog, 'rows_exported', 'error_message')
+
+
+@migration(6, 'recurrence rules')
+def recurrence_rules(connection):
+    RecurrenceRule.__table__.create(bind=connection, checkfirst=True)
+    add_columns_if_missing(connection, Transaction, 'recurrence_rule_id')
+    create_indexes_if_missing(connection, Transaction, 'ux_transaction_rule_date')
+    backfill_recurrence_rules(connection)
+
+
+@migration(7, 'per-user data version')
+def user_data_version(connection):
+    add_columns_if_missing(connection, User, 'data_version')
+
+
+@migration(8, 'budget spend counters')
+def budget_spend(connection):
+    BudgetSpend.__table__.create(bind=connection, checkfirst=True)
+    create_indexes_if_missing(connection, BudgetGoal, 'ix_budget_goal_user')
+
+
+@migration(9, 'transaction change feed')
+def change_feed(connection):
+    # Existing rows keep change_version 0 and arrive with a client's first full sync
+    add_columns_if_missing(connection, Transaction, 'change_version')
+    add_columns_if_missing(connection, User, 'changes_floor')
+    create_indexes_if_missing(connection, Transaction, 'ix_transaction_user_change')
+    TransactionTombstone.__table__.create(bind=connection, checkfirst=True)
+
+
+@migration(10, 'precomputed user analytics')
+def user_analytics(connection):
+    UserAnalytics.__table__.create(bind=connection, checkfirst=True)
+
+
+@migration(11, 'transaction archive')
+def transaction_archive(connection):
+    TransactionArchive.__table__.create(bind=connection, checkfirst=True)
+    ArchiveState.__table__.create(bind=connection, checkfirst=True)
+
+
+@migration(12, 'user shard assignment')
+def user_shard(connection):
+    add_columns_if_missing(connection, User, 'shard', 'shard_moving')
+
+
+@migration(13, 'transaction ids are never reused')
+def transaction_autoincrement(connection):
+    # Without AUTOINCREMENT, SQLite hands out max(id) + 1, so deleting the newest
+    # row could give its id, or an archived row's, to the next insert. PostgreSQL
+    # sequences never go back.
+    if connection.dialect.name != 'sqlite':
+        return
+    ddl = connection.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'transaction'"
+    )).scalar()
+    if 'AUTOINCREMENT' in ddl.upper():
+        return
+
+    table = Transaction.__table__
+    connection.execute(text('ALTER TABLE "transaction" RENAME TO transaction_old'))
+    for index in table.indexes:
+        connection.execute(text(f'DROP INDEX IF EXISTS {index.name}'))
+    table.create(bind=connection)
+    existing = {column['name'] for column in inspect(connection).get_columns('transaction_old')}
+    columns = ', '.join(f'"{column.name}"' for column in table.c if column.name in existing)
+    connection.execute(text(f'INSERT INTO "transaction" ({columns}) SELECT {columns} FROM transaction_old'))
+    # Dropping the old table also drops the search triggers, recreated below
+    connection.execute(text('DROP TABLE transaction_old'))
+
+    # Continue after every id handed out so far, archived ones included
+    connection.execute(text("DELETE FROM sqlite_sequence WHERE name = 'transaction'"))
+    connection.execute(text(
+        """INSERT INTO sqlite_sequence (name, seq) SELECT 'transaction', max(
+               coalesce((SELECT max(id) FROM "transaction"), 0),
+               coalesce((SELECT max(id) FROM transaction_archive), 0))"""
+    ))
+    create_search_index(connection)
+
+
+@migration(14, 'search archived transactions')
+def archive_search_index(connection):
+    create_search_index(connection)
@@ -0,0 +1,205 @@
+from datetime import datetime, timedelta
+from flask_sqlalchemy import SQLAlchemy
+from .database import RoutingSession
+from .passwords import hash_password, verify_password
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+VALID_CATEGORIES = [
+    'food', 'transport', 'utilities', 'entertainment', 
+    'healthcare', 'shopping', 'housing', 'other'
+]
+TRANSACTION_TYPES = ['income', 'expense']
+RECURRING_INTERVALS = ['daily', 'weekly', 'monthly', 'yearly']
+
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Highest change version whose tombstones have been pruned; older sync cursors must reset
+    changes_floor = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Database holding the user's data; NULL means the main one (see app/shards.py)
+    shard = db.Column(db.Integer)
+    shard_moving = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    # Write-only: user.transactions.select() builds a query, nothing loads a whole history
+    transactions = db.relationship('Transaction', backref='user', lazy='write_only', passive_deletes=True)
+    budget_goals = db.relationship('BudgetGoal', backref='user', lazy='write_only', passive_deletes=True)
+
+    def set_password(self, password):
+        self.password_hash = hash_password(password)
+
+    def check_password(self, password):
+        return verify_password(self.password_hash, password)
+
+class Transaction(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    amount = db.Column(db.Float, nullable=False)
+    description = db.Column(db.String(200))
+    category = db.Column(db.String(50))
+    transaction_type = db.Column(db.String(20))  # 'income' or 'expense'
+    date = db.Column(db.DateTime, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    is_recurring = db.Column(db.Boolean, default=False)
+    recurring_interval = db.Column(db.String(20))  # 'monthly', 'weekly', etc.
+    recurrence_rule_id = db.Column(db.Integer, db.ForeignKey('recurrence_rule.id'))
+    # The owner's data_version at the last insert or update, for the change feed
+    change_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        db.Index('ix_transaction_user_change', 'user_id', 'change_version', 'id'),
+        db.Index('ix_transaction_user_date', 'user_id', 'date', 'id'),
+        db.Index('ix_transaction_user_category', 'user_id', 'category'),
+        db.Index('ix_transaction_user_type_date', 'user_id', 'transaction_type', 'date'),
+        # One materialized occurrence per rule and date, so scheduler re-runs are idempotent
+        db.Index('ux_transaction_rule_date', 'recurrence_rule_id', 'date', unique=True),
+        # Ids are never handed out twice, so a new row cannot take an archived row's id
+        {'sqlite_autoincrement': True},
+    )
+
+    @staticmethod
+    def get_monthly_summary(user_id, month, year):
+        """Get monthly income/expense totals for a user, aggregated in SQL"""
+        from .aggregates import summarize
+
+        start_date = datetime(year, month, 1)
+        if month == 12:
+            end_date = datetime(year + 1, 1, 1)
+        else:
+            end_date = datetime(year, month + 1, 1)
+
+        return summarize(user_id, start_date, end_date - timedelta(microseconds=1))
+
+class RecurrenceRule(db.Model):
+    """Template for a repeating transaction; occurrence n falls on anchor_date + n * interval"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    source_transaction_id = db.Column(db.Integer)
+    amount = db.Column(db.Float, nullable=False)
+    description = db.Column(db.String(200))
+    category = db.Column(db.String(50))
+    transaction_type = db.Column(db.String(20))
+    interval = db.Column(db.String(20), nullable=False)  # 'daily', 'weekly', 'monthly', 'yearly'
+    anchor_date = db.Column(db.DateTime, nullable=False)
+    next_index = db.Column(db.Integer, nullable=False, default=1)
+    next_date = db.Column(db.DateTime, nullable=False)
+    end_date = db.Column(db.DateTime)
+    active = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_recurrence_rule_due', 'active', 'next_date'),
+        db.Index('ix_recurrence_rule_user', 'user_id'),
+    )
+
+class BudgetGoal(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    category = db.Column(db.String(50))
+    amount = db.Column(db.Float, nullable=False)
+    period = db.Column(db.String(20))  # 'monthly', 'yearly'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    start_date = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_budget_goal_user', 'user_id'),
+    )
+    
+    def check_alert(self, current_spending):
+        """Check if spending is approaching or exceeding budget goal"""
+        return BudgetGoal.alert_status(self.amount, current_spending)
+
+    @staticmethod
+    def alert_status(amount, current_spending):
+        """check_alert thresholds for callers holding plain values"""
+        if current_spending >= amount:
+            return "exceeded"
+        elif current_spending >= (amount * 0.8):
+            return "warning"
+        return "ok"
+
+class BudgetSpend(db.Model):
+    """Running expense total for a budget goal's current period window"""
+    goal_id = db.Column(db.Integer, db.ForeignKey('budget_goal.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    window_start = db.Column(db.DateTime, nullable=False)
+    window_end = db.Column(db.DateTime, nullable=False)
+    spent = db.Column(db.Float, nullable=False, default=0)
+    status = db.Column(db.String(20))  # 'ok', 'warning', 'exceeded'
+    evaluated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_budget_spend_user', 'user_id'),
+    )
+
+class TransactionArchive(db.Model):
+    """Cold storage for transactions dated before the archive boundary (see app/archive.py)"""
+    __tablename__ = 'transaction_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    amount = db.Column(db.Float, nullable=False)
+    description = db.Column(db.String(200))
+    category = db.Column(db.String(50))
+    transaction_type = db.Column(db.String(20))
+    date = db.Column(db.DateTime)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    is_recurring = db.Column(db.Boolean, default=False)
+    recurring_interval = db.Column(db.String(20))
+    recurrence_rule_id = db.Column(db.Integer, db.ForeignKey('recurrence_rule.id'))
+    change_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        db.Index('ix_transaction_archive_user_date', 'user_id', 'date', 'id'),
+        db.Index('ix_transaction_archive_user_change', 'user_id', 'change_version', 'id'),
+    )
+
+class ArchiveState(db.Model):
+    """Single row: transactions dated before archived_before may be in transaction_archive"""
+    id = db.Column(db.Integer, primary_key=True)
+    archived_before = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class TransactionTombstone(db.Model):
+    """Marks a deleted transaction so delta-sync clients learn about the delete"""
+    transaction_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    change_version = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_tombstone_user_change', 'user_id', 'change_version', 'transaction_id'),
+        db.Index('ix_tombstone_deleted_at', 'deleted_at'),
+    )
+
+class UserAnalytics(db.Model):
+    """Precomputed analytics payload; current while as_of and data_version still match"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True, autoincrement=False)
+    as_of = db.Column(db.Date, nullable=False)
+    data_version = db.Column(db.Integer, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    payload = db.Column(db.Text, nullable=False)  # JSON document
+
+class ExportLog(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    export_type = db.Column(db.String(20))  # 'csv', 'pdf', etc.
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    file_path = db.Column(db.String(200))
+    status = db.Column(db.String(20))  # 'pending', 'running', 'completed', 'failed'
+    rows_exported = db.Column(db.Integer, default=0)
+    error_message = db.Column(db.String(200))
+
+class MonthlyRollup(db.Model):
+    """Per-user monthly totals, maintained alongside every Transaction write"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    month = db.Column(db.String(7), nullable=False)  # 'YYYY-MM'
+    category = db.Column(db.String(50), nullable=False, default='')
+    transaction_type = db.Column(db.String(20), nullable=False, default='')
+    total = db.Column(db.Float, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'month', 'category', 'transaction_type',
+                            name='uq_monthly_rollup_key'),
+    )
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""Password hashing with per-deployment parameters and a bounded KDF pool.
+
+``PASSWORD_HASH_METHOD`` takes werkzeug's method strings, e.g. ``scrypt``,
+``scrypt:16384:8:1`` or ``pbkdf2:sha256:600000``. A stored hash that was
+made with another method or a shorter salt still verifies. ``login`` then
+replaces it with a fresh hash, so tuning the parameters upgrades users as
+they sign in.
+
+scrypt and PBKDF2 run in hashlib's C code and release the GIL. So a small
+thread pool of ``PASSWORD_HASH_WORKERS`` bounds how many cores the KDF can
+take, while other requests keep running in the remaining threads. At most
+``PASSWORD_HASH_QUEUE`` hashes may wait for a worker. Beyond that
+``submit`` raises ``HasherBusy`` at once, and the auth routes answer 503
+with Retry-After instead of stacking up work during a login storm.
+"""
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'scrypt'
+DEFAULT_SALT_LENGTH = 16
+
+_method_prefixes = {}
+
+
+class HasherBusy(Exception):
+    """Every KDF worker is busy and the wait queue is full"""
+
+
+class PasswordHasher:
+    def __init__(self, method=DEFAULT_METHOD, salt_length=DEFAULT_SALT_LENGTH,
+                 workers=2, max_queue=32, timeout=30):
+        self.method = method
+        self.salt_length = salt_length
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='kdf')
+        self.slots = threading.BoundedSemaphore(workers + max_queue)
+        self.rejected = 0
+        self.dummy_hash = None
+
+    def submit(self, fn, *args):
+        """Run ``fn(*args)`` on the pool and wait for it; raises HasherBusy when full"""
+        if not self.slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HasherBusy()
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future.result(timeout=self.timeout)
+
+    def hash(self, password):
+        return self.submit(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, stored_hash, password):
+        return self.submit(check_password_hash, stored_hash, password)
+
+    def verify_unknown(self, password):
+        """Spend one verify on a throwaway hash, so unknown emails cost as much as bad passwords"""
+        if self.dummy_hash is None:
+            self.dummy_hash = self.hash('')
+        self.verify(self.dummy_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        """True if ``stored_hash`` was not made with the configured method and salt length"""
+        method, _, rest = stored_hash.partition('$')
+        salt = rest.partition('$')[0]
+        return method != method_prefix(self.method) or len(salt) < self.salt_length
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+def method_prefix(method):
+    """The method as werkzeug writes it into a hash, with its default parameters filled in"""
+    prefix = _method_prefixes.get(method)
+    if prefix is None:
+        # One throwaway hash per method, then cached for the process
+        prefix = generate_password_hash('', method, 1).partition('$')[0]
+        _method_prefixes[method] = prefix
+    return prefix
+
+
+def init_password_hasher(app):
+    """Create the app's KDF pool from PASSWORD_HASH_* config"""
+    hasher = PasswordHasher(
+        method=app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+        salt_length=app.config.get('PASSWORD_SALT_LENGTH', DEFAULT_SALT_LENGTH),
+        workers=app.config.get('PASSWORD_HASH_WORKERS', 2),
+        max_queue=app.config.get('PASSWORD_HASH_QUEUE', 32),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT', 30)
+    )
+    atexit.register(hasher.close)
+    app.extensions['password_hasher'] = hasher
+    return hasher
+
+
+def _hasher():
+    if has_app_context():
+        return current_app.extensions.get('password_hasher')
+    return None
+
+
+def hash_password(password):
+    """Hash with the app's configured parameters, on its KDF pool when there is one"""
+    hasher = _hasher()
+    if hasher is None:
+        return generate_password_hash(password, DEFAULT_METHOD, DEFAULT_SALT_LENGTH)
+    return hasher.hash(password)
+
+
+def verify_password(stored_hash, password):
+    hasher = _hasher()
+    if hasher is None:
+        return check_password_hash(stored_hash, password)
+    return hasher.verify(stored_hash, password)
+
+
+def verify_unknown(password):
+    hasher = _hasher()
+    if hasher is not None:
+        hasher.verify_unknown(password)
+
+
+def needs_rehash(stored_hash):
+    hasher = _hasher()
+    if hasher is None:
+        return False
+    return hasher.needs_rehash(stored_hash)
@@ -0,0 +1,247 @@
+"""Recurrence rules and the batch scheduler that materializes their occurrences.
+
+Occurrence ``n`` of a rule falls on ``anchor_date + n * interval``, always
+computed from the anchor so month-end dates do not drift. The scheduler
+pages through due rules by id and works out each rule's dates in one step.
+It inserts the occurrences with a single executemany and advances
+``next_index``/``next_date`` in the same transaction. A unique
+(recurrence_rule_id, date) index makes re-runs insert nothing twice.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, bindparam, select, text
+from .cache import bump_data_version
+from .models import db, RecurrenceRule, Transaction, TransactionArchive
+from .rollups import RollupDelta
+
+FIXED_STEPS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+CALENDAR_MONTHS = {
+    'monthly': 1,
+    'yearly': 12,
+}
+
+# Bounds the work one rule can add to a single run; the rest is picked up next run
+MAX_OCCURRENCES_PER_RULE = 1000
+
+
+def interval_step(interval):
+    """timedelta (fixed length) or relativedelta (calendar) between occurrences"""
+    if interval in FIXED_STEPS:
+        return FIXED_STEPS[interval]
+    # Imported here so loading this module at worker startup does not pull in dateutil
+    from dateutil.relativedelta import relativedelta
+    return relativedelta(months=CALENDAR_MONTHS[interval])
+
+
+def occurrence_date(anchor_date, interval, index):
+    return anchor_date + interval_step(interval) * index
+
+
+def occurrence_dates(anchor_date, interval, start_index, horizon, end_date=None,
+                     limit=MAX_OCCURRENCES_PER_RULE):
+    """(index, date) pairs from start_index up to the horizon/end date"""
+    stop = min(horizon, end_date) if end_date else horizon
+    step = interval_step(interval)
+
+    if isinstance(step, timedelta):
+        # Fixed-length steps: the number of due occurrences is a single division
+        first = anchor_date + step * start_index
+        if first > stop:
+            return []
+        count = min(limit, (stop - first) // step + 1)
+        return [(start_index + n, first + step * n) for n in range(count)]
+
+    dates = []
+    index = start_index
+    while len(dates) < limit:
+        date = anchor_date + step * index
+        if date > stop:
+            break
+        dates.append((index, date))
+        index += 1
+    return dates
+
+
+def create_rule_for(transaction):
+    """Turn a recurring transaction into the seed (occurrence 0) of a new rule"""
+    rule = RecurrenceRule(
+        user_id=transaction.user_id,
+        source_transaction_id=transaction.id,
+        amount=transaction.amount,
+        description=transaction.description,
+        category=transaction.category,
+        transaction_type=transaction.transaction_type,
+        interval=transaction.recurring_interval,
+        anchor_date=transaction.date,
+        next_index=1,
+        next_date=occurrence_date(transaction.date, transaction.recurring_interval, 1)
+    )
+    db.session.add(rule)
+    db.session.flush()
+    transaction.recurrence_rule_id = rule.id
+    return rule
+
+
+def seeded_rule(transaction):
+    """The rule ``transaction`` is the seed of, or None
+
+    Materialized occurrences point at their rule too, but are not its seed.
+    """
+    if transaction.recurrence_rule_id is None:
+        return None
+    rule = db.session.get(RecurrenceRule, transaction.recurrence_rule_id)
+    return rule if rule is not None and rule.source_transaction_id == transaction.id else None
+
+
+def remove_rule(rule):
+    """Delete a rule; the occurrences it already materialized stay, unlinked from it"""
+    for table in (Transaction.__table__, TransactionArchive.__table__):
+        db.session.execute(
+            table.update().where(table.c.recurrence_rule_id == rule.id).values(recurrence_rule_id=None)
+        )
+    db.session.delete(rule)
+
+
+def create_rules(rows):
+    """Rules for freshly inserted recurring rows (dicts that include their ``id``)"""
+    seeds = [row for row in rows if row.get('is_recurring') and row.get('recurring_interval')]
+    if not seeds:
+        return 0
+
+    rule_rows = [
+        {
+            'user_id': row['user_id'],
+            'source_transaction_id': row['id'],
+            'amount': row['amount'],
+            'description': row['description'],
+            'category': row['category'],
+            'transaction_type': row['transaction_type'],
+            'interval': row['recurring_interval'],
+            'anchor_date': row['date'],
+            'next_index': 1,
+            'next_date': occurrence_date(row['date'], row['recurring_interval'], 1),
+            'active': True,
+            'created_at': datetime.utcnow()
+        }
+        for row in seeds
+    ]
+    rule_table = RecurrenceRule.__table__
+    rule_ids = db.session.execute(
+        rule_table.insert().returning(rule_table.c.id, sort_by_parameter_order=True), rule_rows
+    ).scalars().all()
+
+    table = Transaction.__table__
+    db.session.execute(
+        table.update().where(table.c.id == bindparam('transaction_id'))
+        .values(recurrence_rule_id=bindparam('rule_id')),
+        [{'transaction_id': row['id'], 'rule_id': rule_id} for row, rule_id in zip(seeds, rule_ids)]
+    )
+    return len(rule_ids)
+
+
+def _insert_ignoring_duplicates():
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    table = Transaction.__table__
+    return insert(table).on_conflict_do_nothing(
+        index_elements=['recurrence_rule_id', 'date']
+    ).returning(table.c.user_id, table.c.date, table.c.category,
+                table.c.transaction_type, table.c.amount)
+
+
+def materialize_due(horizon=None, batch_size=1000):
+    """Materialize every occurrence due up to ``horizon`` for all users
+
+    Returns (rules_processed, transactions_created).
+    """
+    horizon = horizon or datetime.utcnow()
+    insert_occurrences = _insert_ignoring_duplicates()
+    rule_table = RecurrenceRule.__table__
+    advance_rules = rule_table.update()\
+        .where(rule_table.c.id == bindparam('rule_id'))\
+        .values(next_index=bindparam('new_index'), next_date=bindparam('new_date'),
+                active=bindparam('still_active'))
+
+    processed = created = 0
+    last_id = 0
+    while True:
+        rules = db.session.execute(
+            select(rule_table)
+            .where(rule_table.c.active.is_(True),
+                   rule_table.c.next_date <= horizon,
+                   rule_table.c.id > last_id)
+            .order_by(rule_table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rules:
+            break
+        last_id = rules[-1].id
+
+        versions = bump_data_version(*{rule.user_id for rule in rules})
+        occurrences = []
+        advances = []
+        for rule in rules:
+            due = occurrence_dates(rule.anchor_date, rule.interval, rule.next_index,
+                                   horizon, rule.end_date)
+            next_index = due[-1][0] + 1 if due else rule.next_index
+            next_date = occurrence_date(rule.anchor_date, rule.interval, next_index)
+            occurrences.extend(
+                {
+                    'user_id': rule.user_id,
+                    'amount': rule.amount,
+                    'description': rule.description,
+                    'category': rule.category,
+                    'transaction_type': rule.transaction_type,
+                    'date': date,
+                    'is_recurring': True,
+                    'recurring_interval': rule.interval,
+                    'recurrence_rule_id': rule.id,
+                    'change_version': versions[rule.user_id]
+                }
+                for _, date in due
+            )
+            advances.append({
+                'rule_id': rule.id,
+                'new_index': next_index,
+                'new_date': next_date,
+                'still_active': rule.end_date is None or next_date <= rule.end_date
+            })
+
+        if occurrences:
+            delta = RollupDelta()
+            for row in db.session.execute(insert_occurrences, occurrences):
+                delta.add_values(*row)
+                created += 1
+            delta.apply()
+        db.session.execute(advance_rules, advances)
+        db.session.commit()
+        processed += len(rules)
+
+    return processed, created
+
+
+def backfill_recurrence_rules(connection):
+    """Create rules for recurring transactions saved before rules existed"""
+    connection.execute(text(
+        """INSERT INTO recurrence_rule
+               (user_id, source_transaction_id, amount, description, category, transaction_type,
+                "interval", anchor_date, next_index, next_date, active, created_at)
+           SELECT t.user_id, t.id, t.amount, t.description, t.category, t.transaction_type,
+                  t.recurring_interval, t.date, 0, t.date, :active, :now
+           FROM "transaction" t
+           WHERE t.is_recurring = :active
+             AND t.recurrence_rule_id IS NULL
+             AND t.date IS NOT NULL
+             AND t.recurring_interval IN ('daily', 'weekly', 'monthly', 'yearly')"""
+    ).bindparams(bindparam('now', type_=DateTime)), {'active': True, 'now': datetime.utcnow()})
+    # Linking each seed row makes occurrence 0 a no-op for the scheduler
+    connection.execute(text(
+        """UPDATE "transaction" SET recurrence_rule_id = (
+               SELECT r.id FROM recurrence_rule r WHERE r.source_transaction_id = "transaction".id
+           )
+           WHERE is_recurring = :active AND recurrence_rule_id IS NULL"""
+    ), {'active': True})
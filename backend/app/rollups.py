@@ -0,0 +1,204 @@
+from sqlalchemy import func, select
+from .archive import AllTransactions
+from .budgets import apply_spend_changes
+from .models import db, MonthlyRollup
+from .sql import month_key
+
+# Rollup rows store '' instead of NULL so the unique key can drive upserts
+EMPTY_KEY = ''
+
+
+def _key(user_id, date, category, transaction_type):
+    return (int(user_id), date.strftime('%Y-%m'), category or EMPTY_KEY, transaction_type or EMPTY_KEY)
+
+
+def _insert_for_dialect():
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+class RollupDelta:
+    """Collects aggregate changes for a unit of work and applies them together
+
+    Monthly rollups are upserted in one statement; expense changes are also
+    passed to the budget spend counters.
+    """
+
+    def __init__(self):
+        self.changes = {}
+        self.spend_changes = []
+
+    def add(self, transaction, sign=1):
+        """Count a transaction in (sign=1) or out of (sign=-1) its monthly bucket"""
+        self.add_values(transaction.user_id, transaction.date, transaction.category,
+                        transaction.transaction_type, transaction.amount, sign)
+
+    def add_values(self, user_id, date, category, transaction_type, amount, sign=1):
+        """Same as add, for callers holding plain column values instead of objects"""
+        key = _key(user_id, date, category, transaction_type)
+        total, count = self.changes.get(key, (0.0, 0))
+        self.changes[key] = (total + sign * float(amount), count + sign)
+        if transaction_type == 'expense':
+            self.spend_changes.append((key[0], date, category, sign * float(amount)))
+
+    def remove(self, transaction):
+        self.add(transaction, sign=-1)
+
+    def apply(self):
+        """Upsert the collected deltas inside the current session transaction"""
+        apply_spend_changes(self.spend_changes)
+        self.spend_changes = []
+        rows = [
+            {
+                'user_id': user_id,
+                'month': month,
+                'category': category,
+                'transaction_type': transaction_type,
+                'total': total,
+                'count': count
+            }
+            for (user_id, month, category, transaction_type), (total, count) in self.changes.items()
+            if count or total
+        ]
+        self.changes = {}
+        if not rows:
+            return
+
+        table = MonthlyRollup.__table__
+        stmt = _insert_for_dialect()(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'month', 'category', 'transaction_type'],
+            set_={
+                'total': table.c.total + stmt.excluded.total,
+                'count': table.c.count + stmt.excluded.count
+            }
+        )
+        db.session.execute(stmt)
+
+
+def record_transactions(transactions, sign=1):
+    """Apply rollup changes for a batch of flushed transactions"""
+    delta = RollupDelta()
+    for transaction in transactions:
+        delta.add(transaction, sign)
+    delta.apply()
+
+
+def rollup_totals_query(user_id=None, source=AllTransactions):
+    """Grouped totals straight from the transaction rows, archived ones included"""
+    month = month_key(source.date)
+    category = func.coalesce(source.category, EMPTY_KEY)
+    transaction_type = func.coalesce(source.transaction_type, EMPTY_KEY)
+    query = select(
+        source.user_id, month, category, transaction_type,
+        func.sum(source.amount), func.count()
+    ).group_by(source.user_id, month, category, transaction_type)
+    if user_id is not None:
+        query = query.where(source.user_id == user_id)
+    return query
+
+
+def rebuild_rollups(user_id=None):
+    """Recompute rollups from the transaction table, for one user or everyone"""
+    delete = MonthlyRollup.__table__.delete()
+    if user_id is not None:
+        delete = delete.where(MonthlyRollup.user_id == user_id)
+    db.session.execute(delete)
+
+    columns = ['user_id', 'month', 'category', 'transaction_type', 'total', 'count']
+    db.session.execute(
+        MonthlyRollup.__table__.insert().from_select(columns, rollup_totals_query(user_id))
+    )
+    db.session.commit()
+
+
+def verify_rollups(user_id=None, tolerance=1e-6):
+    """Return a list of (key, expected, actual) tuples for every drifted bucket"""
+    expected = {
+        (row[0], row[1], row[2], row[3]): (row[4] or 0.0, row[5])
+        for row in db.session.execute(rollup_totals_query(user_id))
+    }
+
+    query = select(
+        MonthlyRollup.user_id, MonthlyRollup.month, MonthlyRollup.category,
+        MonthlyRollup.transaction_type, MonthlyRollup.total, MonthlyRollup.count
+    )
+    if user_id is not None:
+        query = query.where(MonthlyRollup.user_id == user_id)
+    actual = {
+        (row[0], row[1], row[2], row[3]): (row[4], row[5])
+        for row in db.session.execute(query)
+        if row[5]
+    }
+
+    mismatches = []
+    for key in expected.keys() | actual.keys():
+        want = expected.get(key, (0.0, 0))
+        got = actual.get(key, (0.0, 0))
+        if want[1] != got[1] or abs(want[0] - got[0]) > tolerance:
+            mismatches.append((key, want, got))
+    return sorted(mismatches)
+
+
+def _live_buckets(user_id):
+    return db.session.query(MonthlyRollup).filter(
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.count > 0
+    )
+
+
+def totals_by_type(user_id, month=None, before=None):
+    """{transaction_type: total} for one month, or all time when month is None
+
+    ``before`` ('YYYY-MM') limits the totals to earlier months.
+    """
+    query = _live_buckets(user_id)
+    if month is not None:
+        query = query.filter(MonthlyRollup.month == month)
+    if before is not None:
+        query = query.filter(MonthlyRollup.month < before)
+    rows = query.with_entities(
+        MonthlyRollup.transaction_type, func.sum(MonthlyRollup.total)
+    ).group_by(MonthlyRollup.transaction_type)
+    return {transaction_type or None: total for transaction_type, total in rows}
+
+
+def totals_by_category(user_id):
+    """{category: total} over the user's whole history"""
+    rows = _live_buckets(user_id).with_entities(
+        MonthlyRollup.category, func.sum(MonthlyRollup.total)
+    ).group_by(MonthlyRollup.category)
+    return {category or None: total for category, total in rows}
+
+
+def totals_by_month(user_id):
+    """{'YYYY-MM': total} over the user's whole history"""
+    rows = _live_buckets(user_id).with_entities(
+        MonthlyRollup.month, func.sum(MonthlyRollup.total)
+    ).group_by(MonthlyRollup.month)
+    return dict(rows.all())
+
+
+def user_buckets(user_id):
+    """Every live (month, category, transaction_type, total, count) bucket of a user
+
+    One indexed read that callers can fold into several totals at once;
+    '' keys come back as None.
+    """
+    rows = _live_buckets(user_id).with_entities(
+        MonthlyRollup.month, MonthlyRollup.category, MonthlyRollup.transaction_type,
+        MonthlyRollup.total, MonthlyRollup.count
+    )
+    return [
+        (month, category or None, transaction_type or None, total, count)
+        for month, category, transaction_type, total, count in rows
+    ]
+
+
+def transaction_count(user_id):
+    return _live_buckets(user_id).with_entities(
+        func.coalesce(func.sum(MonthlyRollup.count), 0)
+    ).scalar()
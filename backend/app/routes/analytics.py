@@ -0,0 +1,20 @@
+from flask import Blueprint, current_app, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from .. import analytics
+from ..models import db
+
+analytics_bp = Blueprint('analytics', __name__)
+
+@analytics_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_analytics():
+    user_id = get_jwt_identity()
+    refresh = request.args.get('refresh', '').lower() in ('1', 'true')
+    
+    # Usually one primary-key read of the nightly result; recomputed when the user's data moved on
+    payload = None if refresh else analytics.stored_analytics(user_id)
+    if payload is None:
+        payload = analytics.refresh_user(user_id)
+        db.session.commit()
+    
+    return current_app.response_class(payload + '\n', mimetype=current_app.json.mimetype)
@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token
+from sqlalchemy import select, update
 from ..models import db, User
+from ..passwords import HasherBusy, hash_password, needs_rehash, verify_password, verify_unknown
+from ..shards import assign_shard
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -17,6 +20,9 @@ def signup():
     user = User(email=email, username=username)
     user.set_password(password)
     db.session.add(user)
+    # The id picks the user's shard, whose mirror row must exist before the first sign-in
+    db.session.flush()
+    assign_shard(user)
     db.session.commit()
 
     return jsonify(message="User created"), 201
@@ -27,10 +33,32 @@ def login():
     email = data.get('email')
     password = data.get('password')
 
-    user = User.query.filter_by(email=email).first()
+    if not email or not password:
+        return jsonify(message="Invalid credentials"), 401
+
+    # Only the two columns the check needs, through the unique email index
+    user = db.session.execute(
+        select(User.id, User.password_hash).where(User.email == email)
+    ).first()
 
-    if not user or not user.check_password(password):
+    if user is None:
+        verify_unknown(password)
+        return jsonify(message="Invalid credentials"), 401
+    if not verify_password(user.password_hash, password):
         return jsonify(message="Invalid credentials"), 401
 
+    # Hashes made with older parameters are upgraded while the password is at hand
+    if needs_rehash(user.password_hash):
+        db.session.execute(
+            update(User)
+            .where(User.id == user.id, User.password_hash == user.password_hash)
+            .values(password_hash=hash_password(password))
+        )
+        db.session.commit()
+
     token = create_access_token(identity=user.id)
     return jsonify(token=token), 200
+
+@auth_bp.errorhandler(HasherBusy)
+def handle_hasher_busy(error):
+    return jsonify(message="Too many sign-ins right now, try again shortly"), 503, {'Retry-After': '1'}
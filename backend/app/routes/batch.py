@@ -0,0 +1,165 @@
+"""POST /api/batch: many transaction and budget goal writes in one request.
+
+    {"atomic": true,
+     "operations": [
+        {"method": "POST", "resource": "transactions", "body": {...}},
+        {"method": "PUT", "resource": "transactions", "id": 12, "body": {...}},
+        {"method": "DELETE", "resource": "budget-goals", "id": 3}
+     ]}
+
+The JWT is verified once. Operations run in order through the same
+schemas and write functions as the single-item routes, and they commit
+together. With ``atomic`` (the default), the first failure rolls back the
+whole batch: the response is 409, and the operations after it report 424.
+With ``"atomic": false``, each operation runs in its own savepoint, so a
+failed one is undone alone and the others still commit. Results come back
+in request order as ``{"status": ..., "body": ...}``, matching what the
+single-item route would have answered. ``atomic`` must be a JSON boolean.
+An unexpected error is logged and reported as a 500 without its details.
+"""
+import logging
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.exceptions import HTTPException
+from .. import budget_writes, transaction_writes
+from ..cache import bump_data_version
+from ..models import db
+from ..write_queue import execute_write
+from .budget_goals import budget_goal_schema
+from .transactions import transaction_schema
+
+batch_bp = Blueprint('batch', __name__)
+logger = logging.getLogger(__name__)
+
+MAX_OPERATIONS = 500
+
+# (resource, method): (schema, partial, write function, success status, message)
+OPERATIONS = {
+    ('transactions', 'POST'): (transaction_schema, False, transaction_writes.create_transaction,
+                               201, 'Transaction created successfully'),
+    ('transactions', 'PUT'): (transaction_schema, True, transaction_writes.update_transaction,
+                              200, 'Transaction updated successfully'),
+    ('transactions', 'DELETE'): (None, False, transaction_writes.delete_transaction,
+                                 200, 'Transaction deleted successfully'),
+    ('budget-goals', 'POST'): (budget_goal_schema, False, budget_writes.create_budget_goal,
+                               201, 'Budget goal created successfully'),
+    ('budget-goals', 'PUT'): (budget_goal_schema, True, budget_writes.update_budget_goal,
+                              200, 'Budget goal updated successfully'),
+    ('budget-goals', 'DELETE'): (None, False, budget_writes.delete_budget_goal,
+                                 200, 'Budget goal deleted successfully'),
+}
+
+
+class BatchAborted(Exception):
+    """An atomic batch hit a failing operation; carries the results so far"""
+
+    def __init__(self, results):
+        super().__init__('Batch rolled back')
+        self.results = results
+
+
+def parse_operation(operation):
+    """Return ((write, args, success status, message), None), or (None, error result)"""
+    if not isinstance(operation, dict):
+        return None, {'status': 400, 'body': {'error': 'Operation must be an object'}}
+    method = str(operation.get('method', '')).upper()
+    entry = OPERATIONS.get((operation.get('resource'), method))
+    if entry is None:
+        return None, {'status': 400, 'body': {
+            'error': f'Unsupported operation. Use one of: {", ".join(f"{m} {r}" for r, m in OPERATIONS)}'
+        }}
+    schema, partial, write, status, message = entry
+
+    args = []
+    if method != 'POST':
+        if not isinstance(operation.get('id'), int):
+            return None, {'status': 400, 'body': {'error': 'Operation needs an integer id'}}
+        args.append(operation['id'])
+    if schema is not None:
+        body = operation.get('body')
+        if not isinstance(body, dict):
+            return None, {'status': 400, 'body': {'error': 'Operation needs a JSON object body'}}
+        errors = schema.validate(body, partial=partial)
+        if errors:
+            return None, {'status': 400, 'body': {'errors': errors}}
+        args.append(body)
+    return (write, args, status, message), None
+
+
+def _run(write, user_id, args, status, message):
+    try:
+        result = write(user_id, *args)
+    except HTTPException as error:
+        return False, {'status': error.code, 'body': {'error': error.name}}
+    except Exception:
+        logger.exception('Batch operation failed')
+        return False, {'status': 500, 'body': {'error': 'Internal Server Error'}}
+    body = {'message': message}
+    if status == 201:
+        body['id'] = result
+    return True, {'status': status, 'body': body}
+
+
+def run_batch(user_id, calls, atomic):
+    """Apply parsed operations in order; a write function for ``execute_write``"""
+    # Lock the user's row up front. On SQLite this DML also opens the outer
+    # transaction; a SAVEPOINT issued first would commit on its own release.
+    bump_data_version(user_id)
+    results = []
+    for index, (write, args, status, message) in enumerate(calls):
+        if atomic:
+            ok, result = _run(write, user_id, args, status, message)
+            results.append(result)
+            if not ok:
+                results.extend({'status': 424, 'body': {'error': 'Not applied'}} for _ in calls[index + 1:])
+                raise BatchAborted(results)
+            continue
+
+        savepoint = db.session.begin_nested()
+        ok, result = _run(write, user_id, args, status, message)
+        if ok:
+            savepoint.commit()
+        else:
+            savepoint.rollback()
+        results.append(result)
+    return results
+
+
+@batch_bp.route('', methods=['POST'])
+@batch_bp.route('/', methods=['POST'])
+@jwt_required()
+def batch():
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('operations'), list):
+        return jsonify({'error': 'Expected {"operations": [...]}'}), 400
+    atomic = data.get('atomic', True)
+    if not isinstance(atomic, bool):
+        return jsonify({'error': '"atomic" must be true or false'}), 400
+    operations = data['operations']
+    if not operations:
+        return jsonify({'committed': True, 'results': []})
+    if len(operations) > MAX_OPERATIONS:
+        return jsonify({'error': f'At most {MAX_OPERATIONS} operations per batch'}), 400
+
+    # Everything is validated before the first write
+    parsed = [parse_operation(operation) for operation in operations]
+    invalid = [error for _, error in parsed if error is not None]
+    if invalid and atomic:
+        return jsonify({
+            'committed': False,
+            'results': [error or {'status': 424, 'body': {'error': 'Not applied'}} for _, error in parsed]
+        }), 400
+
+    calls = [call for call, _ in parsed if call is not None]
+    try:
+        # One commit for the whole batch, through the group-commit queue when it is on
+        applied = iter(execute_write(run_batch, user_id, calls, atomic))
+    except BatchAborted as aborted:
+        db.session.rollback()
+        return jsonify({'committed': False, 'results': aborted.results}), 409
+
+    return jsonify({
+        'committed': True,
+        'results': [next(applied) if error is None else error for _, error in parsed]
+    })
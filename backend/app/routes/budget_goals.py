@@ -0,0 +1,111 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from marshmallow import Schema, fields, validate
+from .. import budget_writes
+from ..budgets import user_budget_status
+from ..database import use_primary
+from ..models import BudgetGoal, db, VALID_CATEGORIES
+
+budget_bp = Blueprint('budget_goals', __name__)
+
+class BudgetGoalSchema(Schema):
+    amount = fields.Float(required=True, validate=validate.Range(min=0.01))
+    category = fields.Str(allow_none=True, validate=validate.OneOf(VALID_CATEGORIES))
+    period = fields.Str(validate=validate.OneOf(['monthly', 'yearly']))
+    start_date = fields.Date()
+
+budget_goal_schema = BudgetGoalSchema()
+
+def format_budget_goal_response(goal, spent=None, status=None):
+    """Helper function to format budget goal response"""
+    response = {
+        'id': goal.id,
+        'category': goal.category,
+        'amount': float(goal.amount),
+        'period': goal.period,
+        'start_date': goal.start_date.isoformat() if goal.start_date else None
+    }
+    if status is not None:
+        response['spent'] = spent
+        response['status'] = status
+    return response
+
+@budget_bp.route('/', methods=['GET'])
+@jwt_required()
+@use_primary
+def get_budget_goals():
+    user_id = get_jwt_identity()
+    
+    return jsonify({
+        'budget_goals': [
+            format_budget_goal_response(goal, spent, status)
+            for goal, spent, status in user_budget_status(user_id)
+        ]
+    })
+
+@budget_bp.route('/alerts', methods=['GET'])
+@jwt_required()
+@use_primary
+def get_budget_alerts():
+    user_id = get_jwt_identity()
+    
+    return jsonify({
+        'alerts': [
+            format_budget_goal_response(goal, spent, status)
+            for goal, spent, status in user_budget_status(user_id)
+            if status != 'ok'
+        ]
+    })
+
+@budget_bp.route('/', methods=['POST'])
+@jwt_required()
+def create_budget_goal():
+    user_id = get_jwt_identity()
+    data = request.get_json()
+    
+    errors = budget_goal_schema.validate(data)
+    if errors:
+        return jsonify({'errors': errors}), 400
+    
+    goal_id = budget_writes.create_budget_goal(user_id, data)
+    db.session.commit()
+    
+    return jsonify({
+        'id': goal_id,
+        'message': 'Budget goal created successfully'
+    }), 201
+
+@budget_bp.route('/<int:id>', methods=['GET'])
+@jwt_required()
+@use_primary
+def get_budget_goal(id):
+    user_id = get_jwt_identity()
+    BudgetGoal.query.filter_by(id=id, user_id=user_id).first_or_404()
+    
+    for goal, spent, status in user_budget_status(user_id):
+        if goal.id == id:
+            return jsonify(format_budget_goal_response(goal, spent, status))
+
+@budget_bp.route('/<int:id>', methods=['PUT'])
+@jwt_required()
+def update_budget_goal(id):
+    user_id = get_jwt_identity()
+    data = request.get_json()
+    
+    errors = budget_goal_schema.validate(data, partial=True)
+    if errors:
+        return jsonify({'errors': errors}), 400
+    
+    budget_writes.update_budget_goal(user_id, id, data)
+    db.session.commit()
+    
+    return jsonify({'message': 'Budget goal updated successfully'})
+
+@budget_bp.route('/<int:id>', methods=['DELETE'])
+@jwt_required()
+def delete_budget_goal(id):
+    user_id = get_jwt_identity()
+    budget_writes.delete_budget_goal(user_id, id)
+    db.session.commit()
+    
+    return jsonify({'message': 'Budget goal deleted successfully'})
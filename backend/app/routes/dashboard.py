@@ -0,0 +1,91 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from .. import aggregates, rollups
+from ..cache import cached_response
+from ..serialization import transaction_dict
+from .transactions import _this_hour, paginate_transactions
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+SECTIONS = ('summary', 'category_summary', 'categories', 'statistics', 'transactions')
+PERIODS = {
+    'week': relativedelta(weeks=1),
+    'month': relativedelta(months=1),
+    'year': relativedelta(years=1),
+}
+
+def requested_sections(fields):
+    """Parse ?fields=a,b into a set of known section names, or None if one is unknown"""
+    if not fields:
+        return set(SECTIONS)
+    sections = {field.strip() for field in fields.split(',') if field.strip()}
+    if not sections <= set(SECTIONS):
+        return None
+    return sections
+
+def rollup_sections(user_id, sections, month, year):
+    """summary, category_summary and categories folded from one read of the user's rollups"""
+    month_key = f'{year:04d}-{month:02d}'
+    totals = {}
+    by_category = {}
+    for bucket_month, category, transaction_type, total, count in rollups.user_buckets(user_id):
+        if bucket_month == month_key:
+            totals[transaction_type] = totals.get(transaction_type, 0) + total
+        by_category[category] = by_category.get(category, 0) + total
+
+    result = {}
+    if 'summary' in sections:
+        total_income = totals.get('income', 0)
+        total_expenses = totals.get('expense', 0)
+        result['summary'] = {
+            'month': month,
+            'year': year,
+            'total_income': total_income,
+            'total_expenses': total_expenses,
+            'net': total_income - total_expenses
+        }
+    if 'category_summary' in sections:
+        result['category_summary'] = by_category
+    if 'categories' in sections:
+        result['categories'] = sorted(by_category, key=lambda category: (category is not None, category or ''))
+    return result
+
+@dashboard_bp.route('/', methods=['GET'])
+@jwt_required()
+@cached_response(vary=_this_hour)
+def get_dashboard():
+    user_id = get_jwt_identity()
+    sections = requested_sections(request.args.get('fields'))
+    if sections is None:
+        return jsonify({'error': f'Unknown field. Use any of: {", ".join(SECTIONS)}'}), 400
+
+    now = datetime.now()
+    try:
+        month = int(request.args.get('month', now.month))
+        year = int(request.args.get('year', now.year))
+    except ValueError:
+        return jsonify({'error': 'Invalid month or year'}), 400
+    period = request.args.get('period', 'month')
+
+    dashboard = {}
+    if sections & {'summary', 'category_summary', 'categories'}:
+        dashboard.update(rollup_sections(user_id, sections, month, year))
+
+    if 'statistics' in sections:
+        start_date = now - PERIODS.get(period, PERIODS['year'])
+        stats = aggregates.statistics(user_id, start_date, now)
+        stats['period'] = period
+        dashboard['statistics'] = stats
+
+    if 'transactions' in sections:
+        items, next_cursor, _ = paginate_transactions(
+            user_id, {}, limit=request.args.get('limit', 10)
+        )
+        dashboard['transactions'] = {
+            'transactions': [transaction_dict(row) for row in items],
+            'next': next_cursor
+        }
+
+    return jsonify(dashboard)
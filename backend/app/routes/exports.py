@@ -0,0 +1,84 @@
+from flask import Blueprint, Response, current_app, jsonify, request, send_file, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..exports import EXPORT_FORMATS, start_export, stream_export
+from ..models import ExportLog
+
+export_bp = Blueprint('exports', __name__)
+
+def format_export_response(export_log):
+    """Helper function to format export response"""
+    return {
+        'id': export_log.id,
+        'export_type': export_log.export_type,
+        'status': export_log.status,
+        'rows_exported': export_log.rows_exported or 0,
+        'error': export_log.error_message,
+        'timestamp': export_log.timestamp.isoformat() if export_log.timestamp else None
+    }
+
+@export_bp.route('/', methods=['POST'])
+@jwt_required()
+def create_export():
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    export_format = data.get('format', 'csv')
+    
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format. Use one of: {", ".join(EXPORT_FORMATS)}'}), 400
+    
+    export_log = start_export(current_app._get_current_object(), user_id, export_format)
+    return jsonify(format_export_response(export_log)), 202
+
+@export_bp.route('/', methods=['GET'])
+@jwt_required()
+def list_exports():
+    user_id = get_jwt_identity()
+    exports = ExportLog.query.filter_by(user_id=user_id)\
+        .order_by(ExportLog.id.desc())\
+        .limit(50)\
+        .all()
+    
+    return jsonify({'exports': [format_export_response(e) for e in exports]})
+
+@export_bp.route('/<int:id>', methods=['GET'])
+@jwt_required()
+def get_export(id):
+    user_id = get_jwt_identity()
+    export_log = ExportLog.query.filter_by(id=id, user_id=user_id).first_or_404()
+    
+    return jsonify(format_export_response(export_log))
+
+@export_bp.route('/<int:id>/download', methods=['GET'])
+@jwt_required()
+def download_export(id):
+    user_id = get_jwt_identity()
+    export_log = ExportLog.query.filter_by(id=id, user_id=user_id).first_or_404()
+    
+    if export_log.status != 'completed' or not export_log.file_path:
+        return jsonify({'error': 'Export is not ready', 'status': export_log.status}), 409
+    
+    # conditional=True answers Range and If-None-Match requests from the file
+    mimetype, extension = EXPORT_FORMATS[export_log.export_type]
+    return send_file(
+        export_log.file_path,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=f'transactions-{export_log.id}.{extension}',
+        conditional=True
+    )
+
+@export_bp.route('/stream', methods=['GET'])
+@jwt_required()
+def stream_transactions():
+    user_id = get_jwt_identity()
+    export_format = request.args.get('format', 'csv')
+    
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format. Use one of: {", ".join(EXPORT_FORMATS)}'}), 400
+    
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    return Response(
+        stream_with_context(stream_export(user_id, export_format)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=transactions.{extension}'}
+    )
@@ -1,59 +1,37 @@
 
+import base64
+import json
 import logging
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
-from ..models import Transaction, db
+from ..models import Transaction, TransactionArchive, db, VALID_CATEGORIES, TRANSACTION_TYPES, RECURRING_INTERVALS
+from .. import aggregates, changes, rollups, timeseries, transaction_writes
+from ..archive import AllTransactions, archive_boundary, transaction_source
+from ..cache import cached_response
+from ..changes import decode_change_cursor
+from ..importer import READERS as IMPORT_READERS, ImportFormatError, import_transactions
+from ..search import decode_search_cursor, search
+from ..serialization import transaction_dict, transaction_response, transaction_rows, transactions_response
+from ..write_queue import execute_write
 from marshmallow import Schema, fields, validate
 from dateutil.relativedelta import relativedelta
 
-logging.basicConfig(level=INFO)
+logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 transaction_bp = Blueprint('transactions', __name__)
 
-VALID_CATEGORIES = [
-    'food', 'transport', 'utilities', 'entertainment', 
-    'healthcare', 'shopping', 'housing', 'other'
-]
-
 class TransactionSchema(Schema):
     amount = fields.Float(required=True, validate=validate.Range(min=0.01))
     description = fields.Str(required=True)
     category = fields.Str(required=True, validate=validate.OneOf(VALID_CATEGORIES))
-    transaction_type = fields.Str(validate=validate.OneOf(['income', 'expense']))
+    transaction_type = fields.Str(validate=validate.OneOf(TRANSACTION_TYPES))
     is_recurring = fields.Boolean()
-    recurring_interval = fields.Str(validate=validate.OneOf(['daily', 'weekly', 'monthly', 'yearly']))
+    recurring_interval = fields.Str(validate=validate.OneOf(RECURRING_INTERVALS))
 
 transaction_schema = TransactionSchema()
 
-def calculate_next_recurring_date(current_date, interval):
-    """Calculate next date based on recurring interval"""
-    if interval == 'daily':
-        return current_date + relativedelta(days=1)
-    elif interval == 'weekly':
-        return current_date + relativedelta(weeks=1)
-    elif interval == 'monthly':
-        return current_date + relativedelta(months=1)
-    elif interval == 'yearly':
-        return current_date + relativedelta(years=1)
-    return None
-
-def handle_recurring_transaction(transaction):
-    """Helper function to handle recurring transactions"""
-    if transaction.is_recurring:
-        next_transaction = Transaction(
-            user_id=transaction.user_id,
-            amount=transaction.amount,
-            description=transaction.description,
-            category=transaction.category,
-            transaction_type=transaction.transaction_type,
-            is_recurring=True,
-            recurring_interval=transaction.recurring_interval,
-            date=calculate_next_recurring_date(transaction.date, transaction.recurring_interval)
-        )
-        db.session.add(next_transaction)
-
 def validate_date_range(start_date, end_date):
     """Validate date range for transaction queries"""
     try:
@@ -67,6 +45,124 @@ def validate_date_range(start_date, end_date):
     except ValueError:
         return False, "Invalid date format. Use YYYY-MM-DD"
 
+def apply_transaction_filters(query, args, source=Transaction):
+    """Apply date, category, type and amount filters from request args"""
+    start_date = args.get('start_date')
+    end_date = args.get('end_date')
+    is_valid, error = validate_date_range(start_date, end_date)
+    if not is_valid:
+        return None, error
+    
+    if start_date:
+        query = query.filter(source.date >= datetime.strptime(start_date, '%Y-%m-%d'))
+    if end_date:
+        query = query.filter(source.date <= datetime.strptime(end_date, '%Y-%m-%d'))
+    if args.get('category'):
+        query = query.filter(source.category == args['category'])
+    if args.get('transaction_type'):
+        query = query.filter(source.transaction_type == args['transaction_type'])
+    
+    try:
+        if args.get('min_amount'):
+            query = query.filter(source.amount >= float(args['min_amount']))
+        if args.get('max_amount'):
+            query = query.filter(source.amount <= float(args['max_amount']))
+    except ValueError:
+        return None, "Invalid amount filter"
+    
+    return query, None
+
+def filtered_rows(user_id, args, source=Transaction):
+    """A user's transaction_rows from ``source`` with the request filters applied"""
+    return apply_transaction_filters(
+        transaction_rows(source).filter(source.user_id == user_id), args, source
+    )
+
+def _start_date(args):
+    return datetime.strptime(args['start_date'], '%Y-%m-%d') if args.get('start_date') else None
+
+def encode_cursor(transaction, direction):
+    """Build an opaque cursor pointing at a transaction's (date, id) position"""
+    payload = json.dumps([transaction.date.isoformat(), transaction.id, direction])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(token):
+    """Return (date, id, direction) for a cursor, or None if it is malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        date, id, direction = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ('next', 'prev'):
+            return None
+        return datetime.fromisoformat(date), int(id), direction
+    except (ValueError, TypeError):
+        return None
+
+def keyset_paginate(query, cursor=None, limit=10, source=Transaction):
+    """Newest-first keyset pagination over (date, id)
+
+    Returns (items, next_cursor, prev_cursor). Cost depends only on the page
+    size, never on how deep into the history the cursor points.
+    """
+    try:
+        limit = min(100, max(1, int(limit)))
+    except (TypeError, ValueError):
+        limit = 10
+    
+    position = (source.date, source.id)
+    backwards = False
+    if cursor:
+        date, id, direction = cursor
+        backwards = direction == 'prev'
+        if backwards:
+            query = query.filter(db.tuple_(*position) > (date, id))
+        else:
+            query = query.filter(db.tuple_(*position) < (date, id))
+    
+    if backwards:
+        query = query.order_by(source.date.asc(), source.id.asc())
+    else:
+        query = query.order_by(source.date.desc(), source.id.desc())
+    
+    items = query.limit(limit + 1).all()
+    has_more = len(items) > limit
+    items = items[:limit]
+    if backwards:
+        items.reverse()
+    
+    if not items:
+        return items, None, None
+    
+    has_next = has_more if not backwards else True
+    has_prev = has_more if backwards else cursor is not None
+    return (
+        items,
+        encode_cursor(items[-1], 'next') if has_next else None,
+        encode_cursor(items[0], 'prev') if has_prev else None
+    )
+
+def paginate_transactions(user_id, args, cursor=None, limit=10):
+    """keyset_paginate over a user's filtered transactions, reading the archive only when needed
+
+    Archived rows are all dated before the archive boundary. So an oldest-first
+    page from a cursor on or after the boundary never reaches them, and a full
+    newest-first page from the hot table is complete if its last row is on or
+    after the boundary.
+    """
+    source = transaction_source(_start_date(args))
+    if source is not Transaction:
+        boundary = archive_boundary()
+        backwards = cursor is not None and cursor[2] == 'prev'
+        if backwards and cursor[0] >= boundary:
+            source = Transaction
+        elif not backwards and (cursor is None or cursor[0] >= boundary):
+            query, _ = filtered_rows(user_id, args)
+            items, next_cursor, prev_cursor = keyset_paginate(query, cursor, limit)
+            if next_cursor and items[-1].date >= boundary:
+                return items, next_cursor, prev_cursor
+    
+    query, _ = filtered_rows(user_id, args, source)
+    return keyset_paginate(query, cursor, limit, source)
+
 def paginate_query(query, page=1, per_page=10):
     """Helper function to handle pagination"""
     try:
@@ -78,36 +174,63 @@ def paginate_query(query, page=1, per_page=10):
     
     return query.paginate(page=page, per_page=per_page, error_out=False)
 
+def _today():
+    """Cache key part for views whose defaults depend on the current date"""
+    return datetime.now().strftime('%Y-%m-%d')
+
+def _this_hour():
+    """Cache key part for views with a sliding window ending now"""
+    return datetime.now().strftime('%Y-%m-%d %H')
+
 def format_transaction_response(transaction):
     """Helper function to format transaction response"""
-    return {
-        'id': transaction.id,
-        'amount': float(transaction.amount),
-        'description': transaction.description,
-        'category': transaction.category,
-        'transaction_type': transaction.transaction_type,
-        'date': transaction.date.isoformat(),
-        'is_recurring': transaction.is_recurring,
-        'recurring_interval': transaction.recurring_interval
-    }
+    return transaction_dict(transaction)
 
 @transaction_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_transactions():
     user_id = get_jwt_identity()
-    query = Transaction.query.filter_by(user_id=user_id)
+    is_valid, error = validate_date_range(request.args.get('start_date'), request.args.get('end_date'))
+    if not is_valid:
+        return jsonify({'error': error}), 400
+    
+    # Windows starting before the archive boundary also read archived transactions
+    source = transaction_source(_start_date(request.args))
+    query, error = filtered_rows(user_id, request.args, source)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    # Cursor mode: opaque next/prev tokens, optional total
+    if 'cursor' in request.args or request.args.get('mode') == 'cursor':
+        cursor = None
+        if request.args.get('cursor'):
+            cursor = decode_cursor(request.args['cursor'])
+            if cursor is None:
+                return jsonify({'error': 'Invalid cursor'}), 400
+        
+        items, next_cursor, prev_cursor = paginate_transactions(
+            user_id, request.args, cursor, request.args.get('limit', request.args.get('per_page'))
+        )
+        response = {
+            'next': next_cursor,
+            'prev': prev_cursor
+        }
+        if request.args.get('include_total', '').lower() in ('1', 'true'):
+            response['total'] = query.order_by(None).count()
+        return transactions_response(items, **response)
     
     # Apply filters and pagination
+    query = query.order_by(source.date.desc(), source.id.desc())
     paginated = paginate_query(query, 
                              request.args.get('page'), 
                              request.args.get('per_page'))
     
-    return jsonify({
-        'transactions': [format_transaction_response(t) for t in paginated.items],
-        'total': paginated.total,
-        'pages': paginated.pages,
-        'current_page': paginated.page
-    })
+    return transactions_response(
+        paginated.items,
+        total=paginated.total,
+        pages=paginated.pages,
+        current_page=paginated.page
+    )
 
 @transaction_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -120,23 +243,11 @@ def create_transaction():
     if errors:
         return jsonify({'errors': errors}), 400
     
-    transaction = Transaction(
-        user_id=user_id,
-        amount=data['amount'],
-        description=data.get('description'),
-        category=data.get('category'),
-        transaction_type=data['transaction_type'],
-        is_recurring=data.get('is_recurring', False),
-        recurring_interval=data.get('recurring_interval')
-    )
-    
-    db.session.add(transaction)
-    db.session.commit()
-    
-    handle_recurring_transaction(transaction)
+    # Committed here, or with other writes when the group-commit queue is on
+    transaction_id = execute_write(transaction_writes.create_transaction, user_id, data)
     
     return jsonify({
-        'id': transaction.id,
+        'id': transaction_id,
         'message': 'Transaction created successfully'
     }), 201
 
@@ -144,9 +255,15 @@ def create_transaction():
 @jwt_required()
 def get_transaction(id):
     user_id = get_jwt_identity()
-    transaction = Transaction.query.filter_by(id=id, user_id=user_id).first_or_404()
-    
-    return jsonify(format_transaction_response(transaction))
+    transaction = transaction_rows()\
+        .filter(Transaction.id == id, Transaction.user_id == user_id)\
+        .first()
+    if transaction is None:
+        transaction = transaction_rows(TransactionArchive)\
+            .filter(TransactionArchive.id == id, TransactionArchive.user_id == user_id)\
+            .first_or_404()
+    
+    return transaction_response(transaction)
 
 @transaction_bp.route('/<int:id>', methods=['PUT'])
 @jwt_required()
@@ -159,35 +276,27 @@ def update_transaction(id):
     if errors:
         return jsonify({'errors': errors}), 400
     
-    transaction = Transaction.query.filter_by(id=id, user_id=user_id).first_or_404()
-    
-    for key, value in data.items():
-        if hasattr(transaction, key):
-            setattr(transaction, key, value)
-    
-    db.session.commit()
+    execute_write(transaction_writes.update_transaction, user_id, id, data)
     return jsonify({'message': 'Transaction updated successfully'})
 
 @transaction_bp.route('/<int:id>', methods=['DELETE'])
 @jwt_required()
 def delete_transaction(id):
     user_id = get_jwt_identity()
-    transaction = Transaction.query.filter_by(id=id, user_id=user_id).first_or_404()
-    
-    db.session.delete(transaction)
-    db.session.commit()
+    execute_write(transaction_writes.delete_transaction, user_id, id)
     return jsonify({'message': 'Transaction deleted successfully'})
 
 @transaction_bp.route('/summary', methods=['GET'])
 @jwt_required()
+@cached_response(vary=_today)
 def get_summary():
     user_id = get_jwt_identity()
     month = int(request.args.get('month', datetime.now().month))
     year = int(request.args.get('year', datetime.now().year))
     
-    transactions = Transaction.get_monthly_summary(user_id, month, year)
-    total_income = sum(t.amount for t in transactions if t.transaction_type == 'income')
-    total_expenses = sum(t.amount for t in transactions if t.transaction_type == 'expense')
+    totals = rollups.totals_by_type(user_id, f'{year:04d}-{month:02d}')
+    total_income = totals.get('income', 0)
+    total_expenses = totals.get('expense', 0)
     
     return jsonify({
         'month': month,
@@ -199,39 +308,73 @@ def get_summary():
 
 @transaction_bp.route('/category-summary', methods=['GET'])
 @jwt_required()
+@cached_response()
 def get_category_summary():
     user_id = get_jwt_identity()
-    transactions = Transaction.query.filter_by(user_id=user_id).all()
-    
-    category_totals = {}
-    for t in transactions:
-        if t.category not in category_totals:
-            category_totals[t.category] = 0
-        category_totals[t.category] += t.amount
     
-    return jsonify(category_totals)
+    return jsonify(rollups.totals_by_category(user_id))
 
 @transaction_bp.route('/search', methods=['GET'])
 @jwt_required()
 def search_transactions():
     user_id = get_jwt_identity()
     search_term = request.args.get('q', '')
+    token = request.args.get('cursor')
+    
+    is_valid, error = validate_date_range(request.args.get('start_date'), request.args.get('end_date'))
+    if not is_valid:
+        return jsonify({'error': error}), 400
     
-    query = Transaction.query.filter_by(user_id=user_id)
+    # Archived rows are indexed too; windows starting before the boundary search them
+    source = transaction_source(_start_date(request.args))
+    query, error = filtered_rows(user_id, request.args, source)
+    if error:
+        return jsonify({'error': error}), 400
     
-    if search_term:
-        query = query.filter(
-            db.or_(
-                Transaction.description.ilike(f'%{search_term}%'),
-                Transaction.category.ilike(f'%{search_term}%')
-            )
-        )
+    try:
+        limit = min(100, max(1, int(request.args.get('limit', 50))))
+    except ValueError:
+        limit = 50
+    
+    if search_term.strip():
+        cursor = decode_search_cursor(token) if token else None
+        if token and cursor is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        transactions, next_cursor = search(query, user_id, search_term, cursor, limit, source)
+    else:
+        cursor = decode_cursor(token) if token else None
+        if token and cursor is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        transactions, next_cursor, _ = paginate_transactions(user_id, request.args, cursor, limit)
+    
+    response = transactions_response(transactions)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@transaction_bp.route('/changes', methods=['GET'])
+@jwt_required()
+def get_changes():
+    user_id = get_jwt_identity()
+    token = request.args.get('since')
+    
+    cursor = decode_change_cursor(token) if token else None
+    if token and cursor is None:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    try:
+        limit = min(changes.MAX_LIMIT, max(1, int(request.args.get('limit', changes.DEFAULT_LIMIT))))
+    except ValueError:
+        limit = changes.DEFAULT_LIMIT
     
-    transactions = query.all()
-    return jsonify([format_transaction_response(t) for t in transactions])
+    # Upserts go under 'transactions'; 'reset' tells the client to drop its copy first
+    upserts, deleted, next_cursor, has_more, reset = changes.changes_since(user_id, cursor, limit)
+    return transactions_response(upserts, deleted=deleted, next=next_cursor,
+                                 has_more=has_more, reset=reset)
 
 @transaction_bp.route('/statistics', methods=['GET'])
 @jwt_required()
+@cached_response(vary=_this_hour)
 def get_transaction_statistics():
     user_id = get_jwt_identity()
     
@@ -247,58 +390,126 @@ def get_transaction_statistics():
     else:
         start_date = end_date - relativedelta(years=1)
     
-    transactions = Transaction.query.filter(
-        Transaction.user_id == user_id,
-        Transaction.date.between(start_date, end_date)
-    ).all()
+    stats = aggregates.statistics(user_id, start_date, end_date)
+    stats['period'] = period
     
-    return jsonify({
-        'total_transactions': len(transactions),
-        'average_amount': sum(t.amount for t in transactions) / len(transactions) if transactions else 0,
-        'most_common_category': max(set(t.category for t in transactions), key=lambda x: sum(1 for t in transactions if t.category == x)) if transactions else None,
-        'period': period
+    return jsonify(stats)
+
+@transaction_bp.route('/timeseries', methods=['GET'])
+@jwt_required()
+@cached_response(vary=_today)
+def get_timeseries():
+    user_id = get_jwt_identity()
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    
+    is_valid, error = validate_date_range(start_date, end_date)
+    if not is_valid:
+        return jsonify({'error': error}), 400
+    
+    interval = request.args.get('interval', 'day')
+    if interval not in timeseries.BUCKET_UNITS:
+        return jsonify({'error': f'Invalid interval. Use one of: {", ".join(timeseries.BUCKET_UNITS)}'}), 400
+    
+    series = [name.strip() for name in request.args.get('series', 'income,expense').split(',') if name.strip()]
+    unknown = [name for name in series if name not in timeseries.BASE_SERIES]
+    if unknown:
+        return jsonify({'error': f'Unknown series. Use any of: {", ".join(timeseries.BASE_SERIES)}'}), 400
+    
+    categories = [name.strip() for name in request.args.get('categories', '').split(',') if name.strip()]
+    if any(category not in VALID_CATEGORIES for category in categories):
+        return jsonify({'error': f'Invalid category. Use any of: {", ".join(VALID_CATEGORIES)}'}), 400
+    
+    transaction_type = request.args.get('transaction_type')
+    if transaction_type and transaction_type not in TRANSACTION_TYPES:
+        return jsonify({'error': 'Invalid transaction type'}), 400
+    
+    try:
+        max_points = int(request.args.get('max_points', timeseries.DEFAULT_MAX_POINTS))
+        max_points = min(timeseries.MAX_POINTS, max(3, max_points))
+    except ValueError:
+        max_points = timeseries.DEFAULT_MAX_POINTS
+    
+    # end_date is inclusive, so the window runs to the start of the next day
+    if end_date:
+        end = datetime.strptime(end_date, '%Y-%m-%d')
+    else:
+        end = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    try:
+        end += relativedelta(days=1)
+        start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else end - relativedelta(years=1)
+    except (OverflowError, ValueError):
+        return jsonify({'error': 'Date out of range'}), 400
+    if timeseries.bucket_count(start, end - relativedelta(microseconds=1), interval) > timeseries.MAX_BUCKETS:
+        return jsonify({
+            'error': f'Too many {interval} buckets; at most {timeseries.MAX_BUCKETS}. '
+                     'Use a shorter date range or a longer interval'
+        }), 400
+    
+    result = timeseries.build_series(
+        user_id, interval, start, end, series, categories, transaction_type,
+        cumulative=request.args.get('cumulative', '').lower() in ('1', 'true'),
+        max_points=max_points
+    )
+    result.update({
+        'interval': interval,
+        'period': {
+            'start': start.strftime('%Y-%m-%d'),
+            'end': (end - relativedelta(days=1)).strftime('%Y-%m-%d')
+        }
     })
+    return jsonify(result)
 
 @transaction_bp.route('/bulk', methods=['POST'])
 @jwt_required()
 def bulk_create_transactions():
     user_id = get_jwt_identity()
-    transactions_data = request.get_json()
-    
-    if not isinstance(transactions_data, list):
-        return jsonify({'error': 'Expected a list of transactions'}), 400
-    
-    created_transactions = []
-    for data in transactions_data:
-        errors = transaction_schema.validate(data)
-        if errors:
-            return jsonify({'errors': errors, 'at_index': len(created_transactions)}), 400
-            
-        transaction = Transaction(
-            user_id=user_id,
-            amount=data['amount'],
-            description=data.get('description'),
-            category=data.get('category'),
-            transaction_type=data['transaction_type']
-        )
-        created_transactions.append(transaction)
     
-    db.session.bulk_save_objects(created_transactions)
+    # JSON arrays, NDJSON and CSV uploads are all read from the request stream
+    reader = IMPORT_READERS.get(request.mimetype or 'application/json')
+    if reader is None:
+        return jsonify({'error': f'Unsupported content type. Use one of: {", ".join(IMPORT_READERS)}'}), 415
+    
+    skip_invalid = request.args.get('skip_invalid', '').lower() in ('1', 'true')
+    try:
+        chunk_size = min(10000, max(1, int(request.args.get('chunk_size', 1000))))
+    except ValueError:
+        chunk_size = 1000
+    
+    try:
+        summary = import_transactions(reader(request.stream), user_id, chunk_size, skip_invalid)
+    except ImportFormatError as error:
+        db.session.rollback()
+        return jsonify({'error': str(error)}), 400
+    
+    if summary['failed'] and not skip_invalid:
+        db.session.rollback()
+        first = summary['errors'][0]
+        return jsonify({
+            'errors': first['errors'],
+            'at_index': first['index'],
+            'failed': summary['failed'],
+            'row_errors': summary['errors']
+        }), 400
+    
     db.session.commit()
     
     return jsonify({
-        'message': f'Successfully created {len(created_transactions)} transactions',
-        'count': len(created_transactions)
+        'message': f'Successfully created {summary["inserted"]} transactions',
+        'count': summary['inserted'],
+        'skipped': summary['failed'],
+        'row_errors': summary['errors']
     }), 201
 
 @transaction_bp.route('/categories', methods=['GET'])
 @jwt_required()
+@cached_response()
 def get_categories():
     user_id = get_jwt_identity()
     
     # Get unique categories for user
-    categories = db.session.query(Transaction.category)\
-        .filter_by(user_id=user_id)\
+    categories = db.session.query(AllTransactions.category)\
+        .filter(AllTransactions.user_id == user_id)\
         .distinct()\
         .all()
     
@@ -308,6 +519,7 @@ def get_categories():
 
 @transaction_bp.route('/report', methods=['GET'])
 @jwt_required()
+@cached_response()
 def generate_report():
     user_id = get_jwt_identity()
     start_date = request.args.get('start_date')
@@ -318,42 +530,36 @@ def generate_report():
     if not is_valid:
         return jsonify({'error': error}), 400
     
-    query = Transaction.query.filter_by(user_id=user_id)
-    
-    if start_date:
-        query = query.filter(Transaction.date >= datetime.strptime(start_date, '%Y-%m-%d'))
-    if end_date:
-        query = query.filter(Transaction.date <= datetime.strptime(end_date, '%Y-%m-%d'))
-    
-    transactions = query.all()
+    if not start_date and not end_date:
+        # Whole-history reports come straight from the monthly rollups
+        totals = rollups.totals_by_type(user_id)
+        return jsonify({
+            'period': {
+                'start': start_date,
+                'end': end_date
+            },
+            'summary': {
+                'total_income': totals.get('income', 0),
+                'total_expenses': totals.get('expense', 0),
+                'transaction_count': rollups.transaction_count(user_id)
+            },
+            'category_breakdown': rollups.totals_by_category(user_id),
+            'monthly_totals': rollups.totals_by_month(user_id)
+        })
+    
+    start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+    end = datetime.strptime(end_date, '%Y-%m-%d') if end_date else None
     
     report = {
         'period': {
             'start': start_date,
             'end': end_date
         },
-        'summary': {
-            'total_income': sum(t.amount for t in transactions if t.transaction_type == 'income'),
-            'total_expenses': sum(t.amount for t in transactions if t.transaction_type == 'expense'),
-            'transaction_count': len(transactions)
-        },
-        'category_breakdown': {},
-        'monthly_totals': {}
+        'summary': aggregates.summarize(user_id, start, end),
+        'category_breakdown': aggregates.category_totals(user_id, start, end),
+        'monthly_totals': aggregates.monthly_totals(user_id, start, end)
     }
     
-    # Add category breakdown
-    for t in transactions:
-        if t.category not in report['category_breakdown']:
-            report['category_breakdown'][t.category] = 0
-        report['category_breakdown'][t.category] += t.amount
-    
-    # Add monthly totals
-    for t in transactions:
-        month_key = t.date.strftime('%Y-%m')
-        if month_key not in report['monthly_totals']:
-            report['monthly_totals'][month_key] = 0
-        report['monthly_totals'][month_key] += t.amount
-    
     return jsonify(report)
 
 @transaction_bp.errorhandler(Exception)
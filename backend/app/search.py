@@ -0,0 +1,178 @@
+"""Indexed full-text search over transaction descriptions and categories.
+
+SQLite uses a contentless FTS5 table, ``transaction_fts``, kept in sync by
+triggers on the transaction and archive tables; the two share one id space.
+Each row carries an ``owner`` token, so a user's matches come straight from
+the index instead of being filtered afterwards. PostgreSQL uses a GIN
+expression index over a ``simple`` tsvector on each table and needs no
+extra sync. Other databases fall back to ILIKE.
+"""
+import base64
+import json
+import re
+from sqlalchemy import Column, Float, Integer, MetaData, Table, Text, func, literal_column, text
+from .models import db, Transaction
+
+FTS_TABLE = 'transaction_fts'
+MAX_TERMS = 8
+
+fts = Table(
+    FTS_TABLE, MetaData(),
+    Column('rowid', Integer, primary_key=True),
+    Column('owner', Text),
+    Column('description', Text),
+    Column('category', Text)
+)
+
+SQLITE_TABLE = f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+    USING fts5(owner, description, category, content='', prefix='2 3')"""
+
+
+def _sqlite_triggers(table, prefix, other=None):
+    """Triggers keeping the index in step with ``table``
+
+    Archiving and restoring copy a row into ``other`` before deleting it
+    here (or the reverse). Skipping rows present in the other table keeps
+    those moves from touching the index.
+    """
+    moved = f'WHEN NOT EXISTS (SELECT 1 FROM "{other}" WHERE id = {{}}.id)' if other else ''
+    return [
+        f"""CREATE TRIGGER {FTS_TABLE}_{prefix}ai AFTER INSERT ON "{table}" {moved.format('new')} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, owner, description, category)
+            VALUES (new.id, 'u' || new.user_id, new.description, new.category);
+        END""",
+        f"""CREATE TRIGGER {FTS_TABLE}_{prefix}ad AFTER DELETE ON "{table}" {moved.format('old')} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, owner, description, category)
+            VALUES ('delete', old.id, 'u' || old.user_id, old.description, old.category);
+        END""",
+        f"""CREATE TRIGGER {FTS_TABLE}_{prefix}au
+            AFTER UPDATE OF user_id, description, category ON "{table}" BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, owner, description, category)
+            VALUES ('delete', old.id, 'u' || old.user_id, old.description, old.category);
+            INSERT INTO {FTS_TABLE}(rowid, owner, description, category)
+            VALUES (new.id, 'u' || new.user_id, new.description, new.category);
+        END""",
+    ]
+
+
+# Table: (SQLite trigger name prefix, PostgreSQL index name); the hot table keeps its original names
+SEARCHED_TABLES = {
+    'transaction': ('', 'ix_transaction_search'),
+    'transaction_archive': ('archive_', 'ix_transaction_archive_search'),
+}
+
+POSTGRES_DOCUMENT = "to_tsvector('simple', coalesce(description, '') || ' ' || coalesce(category, ''))"
+
+
+def create_search_index(connection, tables=tuple(SEARCHED_TABLES)):
+    """Create the dialect's search structures for ``tables`` and index their rows"""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        connection.execute(text(SQLITE_TABLE))
+        for table in tables:
+            prefix = SEARCHED_TABLES[table][0]
+            other = next((name for name in tables if name != table), None)
+            for action in ('ai', 'ad', 'au'):
+                connection.execute(text(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{prefix}{action}'))
+            for statement in _sqlite_triggers(table, prefix, other):
+                connection.execute(text(statement))
+        rebuild_search_index(connection, tables)
+    elif dialect == 'postgresql':
+        for table in tables:
+            connection.execute(text(
+                f'CREATE INDEX IF NOT EXISTS {SEARCHED_TABLES[table][1]} ON "{table}" '
+                f'USING gin ({POSTGRES_DOCUMENT})'
+            ))
+
+
+def rebuild_search_index(connection, tables=tuple(SEARCHED_TABLES)):
+    """Re-index every row of ``tables`` from scratch"""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"))
+        for table in tables:
+            connection.execute(text(
+                f"""INSERT INTO {FTS_TABLE}(rowid, owner, description, category)
+                    SELECT id, 'u' || user_id, description, category FROM "{table}" """
+            ))
+    elif dialect == 'postgresql':
+        for table in tables:
+            connection.execute(text(f'REINDEX INDEX {SEARCHED_TABLES[table][1]}'))
+
+
+def _terms(search_term):
+    return re.findall(r'\w+', search_term.lower())[:MAX_TERMS]
+
+
+def _fts_match(user_id, terms):
+    """FTS5 query: this user's rows whose text has every term as a prefix"""
+    words = ' '.join(f'"{term}"*' for term in terms)
+    return f'owner:"u{int(user_id)}" AND ({words})'
+
+
+def _tsquery(terms):
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def encode_search_cursor(rank, id):
+    payload = json.dumps([rank, id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_search_cursor(token):
+    """Return (rank, id) for a search cursor, or None if it is malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        rank, id = json.loads(base64.urlsafe_b64decode(padded))
+        return float(rank), int(id)
+    except (ValueError, TypeError):
+        return None
+
+
+def search(query, user_id, search_term, cursor=None, limit=50, source=Transaction):
+    """Rank-ordered matches for ``search_term`` within an already-filtered query
+
+    ``query`` selects ``source`` columns (including ``id``); ``source`` is
+    ``Transaction`` or ``AllTransactions`` (see app/archive.py). Returns
+    (rows, next_cursor); each row also carries its ``search_rank``, where
+    lower is a better match.
+    """
+    terms = _terms(search_term)
+    if not terms:
+        return [], None
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        rank = func.bm25(literal_column(FTS_TABLE), 0.0, 1.0, 0.5)
+        query = query.join(fts, fts.c.rowid == source.id)\
+            .filter(literal_column(FTS_TABLE).op('MATCH')(_fts_match(user_id, terms)))
+    elif dialect == 'postgresql':
+        tsquery = func.to_tsquery('simple', _tsquery(terms))
+        document = literal_column(POSTGRES_DOCUMENT)
+        rank = -func.ts_rank(document, tsquery, type_=Float)
+        query = query.filter(document.op('@@')(tsquery))
+    else:
+        rank = literal_column('0.0')
+        for term in terms:
+            query = query.filter(db.or_(
+                source.description.ilike(f'%{term}%'),
+                source.category.ilike(f'%{term}%')
+            ))
+
+    if cursor:
+        last_rank, last_id = cursor
+        query = query.filter(db.or_(
+            rank > last_rank,
+            db.and_(rank == last_rank, source.id > last_id)
+        ))
+
+    rows = query.add_columns(rank.label('search_rank'))\
+        .order_by(rank, source.id)\
+        .limit(limit + 1)\
+        .all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_search_cursor(rows[-1].search_rank, rows[-1].id)
+    return rows, next_cursor
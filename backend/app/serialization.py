@@ -0,0 +1,131 @@
+"""Fast JSON encoding for transaction rows.
+
+List endpoints select only the columns a response needs, as row tuples,
+and encode each row straight to JSON text. This skips ORM hydration and
+the intermediate dict per transaction. Strings go through the stdlib's C
+``encode_basestring_ascii``. The output is byte-for-byte what ``jsonify``
+would produce for ``format_transaction_response``: sorted keys, compact
+separators, ASCII escapes and a trailing newline. If the app's JSON
+provider is configured any other way, the helpers fall back to
+``jsonify``.
+"""
+import json
+import math
+from json.encoder import encode_basestring_ascii
+from flask import current_app, jsonify
+from flask.json.provider import DefaultJSONProvider
+from .models import db, Transaction
+
+TRANSACTION_COLUMNS = (
+    Transaction.id, Transaction.amount, Transaction.description, Transaction.category,
+    Transaction.transaction_type, Transaction.date, Transaction.is_recurring,
+    Transaction.recurring_interval
+)
+
+
+def transaction_columns(source=Transaction):
+    """TRANSACTION_COLUMNS taken from ``source``, e.g. ``archive.AllTransactions``"""
+    if source is Transaction:
+        return TRANSACTION_COLUMNS
+    return tuple(getattr(source, column.key) for column in TRANSACTION_COLUMNS)
+
+
+def transaction_rows(source=Transaction):
+    """Query over just the columns a transaction response needs"""
+    return db.session.query(*transaction_columns(source))
+
+
+def transaction_dict(row):
+    """Dict form of a transaction (ORM instance or projected row)"""
+    return {
+        'id': row.id,
+        'amount': float(row.amount),
+        'description': row.description,
+        'category': row.category,
+        'transaction_type': row.transaction_type,
+        'date': row.date.isoformat(),
+        'is_recurring': row.is_recurring,
+        'recurring_interval': row.recurring_interval
+    }
+
+
+def _string(value):
+    return 'null' if value is None else encode_basestring_ascii(value)
+
+
+def _float(value):
+    value = float(value)
+    return float.__repr__(value) if math.isfinite(value) else json.dumps(value)
+
+
+def _bool(value):
+    return 'null' if value is None else ('true' if value else 'false')
+
+
+def encode_transaction(row):
+    """JSON object text for one row, keys in sorted order"""
+    return (
+        f'{{"amount":{_float(row.amount)},"category":{_string(row.category)},'
+        f'"date":"{row.date.isoformat()}","description":{_string(row.description)},'
+        f'"id":{int(row.id)},"is_recurring":{_bool(row.is_recurring)},'
+        f'"recurring_interval":{_string(row.recurring_interval)},'
+        f'"transaction_type":{_string(row.transaction_type)}}}'
+    )
+
+
+def encode_transactions(rows):
+    return '[' + ','.join(map(encode_transaction, rows)) + ']'
+
+
+def iter_json_array(batches):
+    """Stream a JSON array of transactions, one text chunk per batch of rows"""
+    yield '['
+    separator = ''
+    for batch in batches:
+        if batch:
+            yield separator + ','.join(map(encode_transaction, batch))
+            separator = ','
+    yield ']\n'
+
+
+def fast_path_enabled(app=None):
+    """True when jsonify would emit exactly what the encoders above produce"""
+    app = app or current_app
+    provider = app.json
+    if type(provider) is not DefaultJSONProvider:
+        return False
+    compact = provider.compact if provider.compact is not None else not app.debug
+    return compact and provider.sort_keys and provider.ensure_ascii
+
+
+def _response(body):
+    return current_app.response_class(body + '\n', mimetype=current_app.json.mimetype)
+
+
+def transaction_response(row):
+    """Single-transaction response"""
+    if not fast_path_enabled():
+        return jsonify(transaction_dict(row))
+    return _response(encode_transaction(row))
+
+
+def transactions_response(rows, **fields):
+    """Transaction list response, either a bare array or an object with extra ``fields``
+
+    With ``fields`` the rows go under the ``transactions`` key, next to them.
+    """
+    if not fast_path_enabled():
+        items = [transaction_dict(row) for row in rows]
+        return jsonify({**fields, 'transactions': items} if fields else items)
+
+    body = encode_transactions(rows)
+    if fields:
+        members = {
+            key: current_app.json.dumps(value, separators=(',', ':'))
+            for key, value in fields.items()
+        }
+        members['transactions'] = body
+        body = '{' + ','.join(
+            f'{encode_basestring_ascii(key)}:{members[key]}' for key in sorted(members)
+        ) + '}'
+    return _response(body)
@@ -0,0 +1,331 @@
+"""Optional user sharding across several databases.
+
+With ``SHARD_URIS`` set, every user's data (transactions, budget goals,
+exports, rollups and everything else keyed by ``user_id``) lives in one
+of ``1 + len(SHARD_URIS)`` databases. Shard 0 is the main database, which
+also stays the only home of authentication data. So one SQLite file's
+single writer lock no longer caps writes for the whole service.
+
+- A new user's shard is chosen by ``jump_hash`` of the user id and stored
+  in ``User.shard`` in the main database. Users from before sharding have
+  no shard and stay on shard 0.
+- Every other shard keeps a mirror ``user`` row per resident user,
+  without a usable password. It carries the shard-local
+  ``data_version`` and ``changes_floor``, so writes never touch the main
+  database.
+- Verifying a request's JWT looks up the user's shard (one primary-key
+  read) and pins the session to that shard's engine. Routes then bind to
+  the right database without changing any query.
+- ``flask shards move`` and ``flask shards rebalance`` move users between
+  shards. Jump consistent hashing means that adding a shard to
+  ``SHARD_URIS`` and rebalancing moves only the users the new shard takes
+  over. Ids are allocated per database, so a moved user's rows get new
+  ids and their clients resync through the change feed.
+
+A user being moved gets 503 until the move finishes. Maintenance commands
+run once per shard (see app/commands.py). The group-commit write queue is
+off while sharding is on.
+"""
+import hashlib
+import time
+from flask import current_app, jsonify
+from sqlalchemy import bindparam, func, or_, select, update
+from werkzeug.exceptions import ServiceUnavailable
+from .archive import COLUMN_NAMES, archive_boundary
+from .database import SHARD_BIND
+from .models import db, RecurrenceRule, Transaction, TransactionArchive, TransactionTombstone, User
+from .rollups import _insert_for_dialect
+
+
+class ShardMoving(ServiceUnavailable):
+    """The user's data is being moved between shards"""
+    description = 'Account data is being moved, retry shortly'
+
+
+def jump_hash(user_id, buckets):
+    """Lamping and Veach's jump consistent hash of a user id into ``buckets``"""
+    key = int.from_bytes(hashlib.blake2b(str(int(user_id)).encode(), digest_size=8).digest(), 'big')
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def shard_count():
+    return 1 + len(current_app.config.get('SHARD_URIS') or [])
+
+
+def sharding_enabled():
+    return shard_count() > 1
+
+
+def shard_engine(number):
+    return db.engines[None if number == 0 else SHARD_BIND.format(number)]
+
+
+def engines():
+    """(shard number, engine) for every shard, main database first"""
+    return [(number, shard_engine(number)) for number in range(shard_count())]
+
+
+def use_shard(number):
+    """Pin this app context's session to a shard; 0 is the main database"""
+    db.session.info['shard'] = number
+
+
+def current_shard():
+    return db.session.info.get('shard', 0)
+
+
+def user_shard(user_id):
+    """(shard, moving) for a user, read from the main database"""
+    with db.engine.connect() as connection:
+        row = connection.execute(
+            select(User.shard, User.shard_moving).where(User.id == int(user_id))
+        ).first()
+    if row is None:
+        return 0, False
+    return row.shard or 0, bool(row.shard_moving)
+
+
+def select_user_shard(user_id):
+    """Pin the session to the user's shard; 503 while the user is being moved"""
+    number, moving = user_shard(user_id)
+    if moving:
+        raise ShardMoving()
+    use_shard(number)
+
+
+def on_current_shard(model=User):
+    """Clause selecting the users that live on the session's shard"""
+    number = current_shard()
+    if number == 0:
+        return or_(model.shard.is_(None), model.shard == 0)
+    return model.shard == number
+
+
+def init_sharding(app, jwt):
+    """Pin each request's session to its user's shard once the JWT is verified"""
+    if not app.config.get('SHARD_URIS'):
+        return
+
+    @jwt.token_verification_loader
+    def select_shard(jwt_header, jwt_data):
+        select_user_shard(jwt_data[app.config.get('JWT_IDENTITY_CLAIM', 'sub')])
+        return True
+
+    # Registered on the app so it wins over blueprint-wide Exception handlers
+    @app.errorhandler(ShardMoving)
+    def handle_shard_moving(error):
+        return jsonify({'error': error.description}), 503, {'Retry-After': '1'}
+
+
+def assign_shard(user):
+    """Choose a flushed new user's shard and write its mirror row there"""
+    if not sharding_enabled():
+        return
+    user.shard = jump_hash(user.id, shard_count())
+    if user.shard:
+        with shard_engine(user.shard).begin() as connection:
+            _write_mirror(connection, user.shard, {'id': user.id, 'username': user.username, 'email': user.email})
+
+
+def _write_mirror(connection, number, row):
+    table = User.__table__
+    values = {**row, 'password_hash': '', 'shard': number, 'shard_moving': False}
+    stmt = _insert_for_dialect()(table).values(**values)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=['id'],
+        set_={name: stmt.excluded[name] for name in values if name != 'id'}
+    ))
+
+
+def user_tables():
+    """Tables holding per-user rows, in foreign-key order"""
+    return [table for table in db.metadata.sorted_tables
+            if table.name != User.__tablename__ and 'user_id' in table.c]
+
+
+def _copy_transactions(reader, writer, user_id, id_maps):
+    """Copy hot and archived transactions; archived ones stay archived where the target allows"""
+    hot = Transaction.__table__
+    cold = TransactionArchive.__table__
+    archived = reader.execute(select(cold).where(cold.c.user_id == user_id).order_by(cold.c.id)).mappings().all()
+    rows = reader.execute(select(hot).where(hot.c.user_id == user_id).order_by(hot.c.id)).mappings().all()
+    # Hot and archived rows share one id space, so every row takes a new id from the hot table
+    rows = [dict(row) for row in archived] + [dict(row) for row in rows]
+    new_ids = _insert_remapped(writer, hot, rows, id_maps)
+
+    boundary = archive_boundary(writer)
+    if boundary is None:
+        return len(rows)
+    to_archive = [new_id for row, new_id in zip(rows[:len(archived)], new_ids)
+                  if row['date'] is not None and row['date'] < boundary]
+    if to_archive:
+        writer.execute(cold.insert().from_select(
+            COLUMN_NAMES, select(*[hot.c[name] for name in COLUMN_NAMES]).where(hot.c.id.in_(to_archive))
+        ))
+        writer.execute(hot.delete().where(hot.c.id.in_(to_archive)))
+    return len(rows)
+
+
+def _insert_remapped(writer, table, rows, id_maps):
+    """Insert rows with foreign keys mapped to new ids; returns the new primary keys"""
+    for row in rows:
+        for column in table.c:
+            for foreign_key in column.foreign_keys:
+                mapping = id_maps.get(foreign_key.column.table.name)
+                if mapping is not None and row[column.name] is not None:
+                    row[column.name] = mapping.get(row[column.name])
+    key = table.autoincrement_column
+    if not rows:
+        return []
+    if key is None:
+        writer.execute(table.insert(), rows)
+        return []
+    old_ids = [row.pop(key.name) for row in rows]
+    new_ids = writer.execute(table.insert().returning(key, sort_by_parameter_order=True), rows).scalars().all()
+    id_maps[table.name] = dict(zip(old_ids, new_ids))
+    return new_ids
+
+
+def copy_user_rows(reader, writer, user_id):
+    """Copy a user's rows between databases under ids the target allocates; returns rows copied
+
+    Primary keys are per database, so keeping them could collide with the
+    target's own rows. Tables are copied in foreign-key order and every
+    reference is rewritten through the old-to-new id maps. Tombstones name
+    rows that no longer exist and are not copied; the caller resets the
+    user's sync cursors instead.
+    """
+    id_maps = {}
+    copied = 0
+    skipped = (TransactionArchive.__tablename__, TransactionTombstone.__tablename__)
+    for table in user_tables():
+        if table.name in skipped:
+            continue
+        if table is Transaction.__table__:
+            copied += _copy_transactions(reader, writer, user_id, id_maps)
+            continue
+        rows = reader.execute(
+            select(table).where(table.c.user_id == user_id).order_by(*table.primary_key.columns)
+        ).mappings().all()
+        _insert_remapped(writer, table, [dict(row) for row in rows], id_maps)
+        copied += len(rows)
+
+    # Not a foreign key, but recurrence backfills match rules to transactions by it
+    rules = RecurrenceRule.__table__
+    transactions = id_maps.get(Transaction.__tablename__, {})
+    sources = reader.execute(
+        select(rules.c.id, rules.c.source_transaction_id).where(rules.c.user_id == user_id)
+    ).all()
+    if sources:
+        writer.execute(
+            rules.update().where(rules.c.id == bindparam('rule_id'))
+            .values(source_transaction_id=bindparam('source_id')),
+            [{'rule_id': id_maps[rules.name][rule_id], 'source_id': transactions.get(source_id)}
+             for rule_id, source_id in sources]
+        )
+    return copied
+
+
+def _set_moving(user_id, moving, shard=None):
+    users = User.__table__
+    values = {'shard_moving': moving}
+    if shard is not None:
+        values['shard'] = shard
+    with db.engine.begin() as connection:
+        connection.execute(update(users).where(users.c.id == user_id).values(**values))
+
+
+def _purge_elsewhere(user_id, target):
+    """Delete the user's rows, and mirror rows, from every shard except ``target``"""
+    users = User.__table__
+    for number, engine in engines():
+        if number == target:
+            continue
+        with engine.begin() as connection:
+            for table in reversed(user_tables()):
+                connection.execute(table.delete().where(table.c.user_id == user_id))
+            if number != 0:
+                connection.execute(users.delete().where(users.c.id == user_id))
+
+
+def move_user(user_id, target, grace_seconds=2.0):
+    """Move a user's data to shard ``target``; returns the number of rows copied
+
+    1. Mark the user as moving; their requests get 503 from now on.
+    2. Wait ``grace_seconds`` for requests already past that check.
+    3. Copy the rows to the target in one transaction (``copy_user_rows``).
+       The target's user row gets a data version one past the source's,
+       and the change-feed floor moves up to it, so cached reads are
+       dropped and clients resync under the new ids.
+    4. Point the user at the target in the main database.
+    5. Delete the user's rows from every other shard, then clear the mark.
+
+    Re-running a move that stopped part way finishes it.
+    """
+    user_id = int(user_id)
+    source, moving = user_shard(user_id)
+    if source == target and not moving:
+        return 0
+    _set_moving(user_id, True)
+
+    copied = 0
+    if source != target:
+        time.sleep(grace_seconds)
+        users = User.__table__
+        with shard_engine(source).connect() as reader, shard_engine(target).begin() as writer:
+            version = reader.execute(select(users.c.data_version).where(users.c.id == user_id)).scalar() or 0
+            state = {'data_version': version + 1, 'changes_floor': version + 1}
+            if target == 0:
+                writer.execute(update(users).where(users.c.id == user_id).values(**state))
+            else:
+                account = reader.execute(
+                    select(users.c.username, users.c.email).where(users.c.id == user_id)
+                ).one()
+                _write_mirror(writer, target, {'id': user_id, **account._asdict(), **state})
+            for table in reversed(user_tables()):
+                writer.execute(table.delete().where(table.c.user_id == user_id))
+            copied = copy_user_rows(reader, writer, user_id)
+        _set_moving(user_id, True, shard=target)
+
+    _purge_elsewhere(user_id, target)
+    _set_moving(user_id, False)
+    return copied
+
+
+def rebalance(grace_seconds=2.0, limit=None, on_move=None):
+    """Move users whose hashed shard changed (e.g. after adding a shard); returns users moved"""
+    moved = 0
+    for user_id, source, target in misplaced_users()[:limit]:
+        copied = move_user(user_id, target, grace_seconds)
+        moved += 1
+        if on_move is not None:
+            on_move(user_id, source, target, copied)
+    return moved
+
+
+def misplaced_users():
+    """(user id, current shard, hashed shard) for users not on their hashed shard"""
+    count = shard_count()
+    with db.engine.connect() as connection:
+        rows = connection.execute(select(User.id, func.coalesce(User.shard, 0)).order_by(User.id)).all()
+    return [(user_id, shard, jump_hash(user_id, count)) for user_id, shard in rows
+            if jump_hash(user_id, count) != shard]
+
+
+def shard_sizes():
+    """{shard: (users, transactions)}"""
+    sizes = {}
+    with db.engine.connect() as connection:
+        users = dict(connection.execute(
+            select(func.coalesce(User.shard, 0), func.count()).group_by(func.coalesce(User.shard, 0))
+        ).all())
+    for number, engine in engines():
+        with engine.connect() as connection:
+            transactions = connection.execute(select(func.count()).select_from(Transaction.__table__)).scalar()
+        sizes[number] = (users.get(number, 0), transactions)
+    return sizes
@@ -0,0 +1,60 @@
+from sqlalchemy import String
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+
+class month_key(FunctionElement):
+    """'YYYY-MM' bucket of a datetime expression, portable across SQLite and PostgreSQL"""
+    name = 'month_key'
+    type = String()
+    inherit_cache = True
+
+
+@compiles(month_key)
+def _month_key_sqlite(element, compiler, **kw):
+    return "strftime('%%Y-%%m', %s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(month_key, 'postgresql')
+def _month_key_postgresql(element, compiler, **kw):
+    return "to_char(%s, 'YYYY-MM')" % compiler.process(element.clauses, **kw)
+
+
+BUCKET_UNITS = ('day', 'week', 'month')
+
+
+class date_bucket(FunctionElement):
+    """'YYYY-MM-DD' start of the day, ISO week (Monday) or month holding a datetime expression
+
+    Usage: ``date_bucket('week', Transaction.date)``.
+    """
+    name = 'date_bucket'
+    type = String()
+    inherit_cache = True
+    # The unit changes the SQL text, so it has to be part of the statement cache key
+    _traverse_internals = FunctionElement._traverse_internals + [('unit', InternalTraversal.dp_string)]
+
+    def __init__(self, unit, expr, **kw):
+        if unit not in BUCKET_UNITS:
+            raise ValueError(f'Unknown bucket unit: {unit}')
+        self.unit = unit
+        super().__init__(expr, **kw)
+
+
+@compiles(date_bucket)
+def _date_bucket_sqlite(element, compiler, **kw):
+    expr = compiler.process(element.clauses, **kw)
+    if element.unit == 'day':
+        return "strftime('%%Y-%%m-%%d', %s)" % expr
+    if element.unit == 'week':
+        # Forward to Sunday (no-op on Sundays), then back to that week's Monday
+        return "date(%s, 'weekday 0', '-6 days')" % expr
+    return "strftime('%%Y-%%m-01', %s)" % expr
+
+
+@compiles(date_bucket, 'postgresql')
+def _date_bucket_postgresql(element, compiler, **kw):
+    return "to_char(date_trunc('%s', %s), 'YYYY-MM-DD')" % (
+        element.unit, compiler.process(element.clauses, **kw)
+    )
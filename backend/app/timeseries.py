@@ -0,0 +1,185 @@
+"""Bucketed time series for charts.
+
+Totals are grouped into day, week (ISO, Monday start) or month buckets in
+SQL, by transaction type and optionally by category. Buckets without
+transactions are filled with zero. ``balance`` is the running net and
+starts from the user's net before the window. Series longer than
+``max_points`` are downsampled with Largest-Triangle-Three-Buckets (LTTB).
+LTTB keeps the peaks and troughs a chart needs, so the response size is
+bounded whatever the date range. The zero-filled series is built in
+memory first, so a window may hold at most ``MAX_BUCKETS`` buckets.
+"""
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import case, func, select
+from . import rollups
+from .archive import transaction_source
+from .models import db
+from .sql import BUCKET_UNITS, date_bucket
+
+BASE_SERIES = ('income', 'expense', 'net', 'balance')
+DEFAULT_MAX_POINTS = 500
+MAX_POINTS = 5000
+# About 27 years of days; longer windows need a longer interval
+MAX_BUCKETS = 10000
+
+STEPS = {
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+    'month': relativedelta(months=1),
+}
+
+
+def bucket_start(date, unit):
+    """The bucket a date falls into, matching ``date_bucket`` in SQL"""
+    date = date.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == 'week':
+        return date - timedelta(days=date.weekday())
+    if unit == 'month':
+        return date.replace(day=1)
+    return date
+
+
+def bucket_count(start, end, unit):
+    """How many keys ``bucket_keys`` returns, worked out without building them"""
+    first = bucket_start(start, unit)
+    if end < first:
+        return 0
+    if unit == 'month':
+        return (end.year - first.year) * 12 + end.month - first.month + 1
+    return (end - first) // STEPS[unit] + 1
+
+
+def bucket_keys(start, end, unit):
+    """Every bucket key from the one holding ``start`` through the one holding ``end``"""
+    keys = []
+    current = bucket_start(start, unit)
+    while current <= end:
+        keys.append(current.strftime('%Y-%m-%d'))
+        current += STEPS[unit]
+    return keys
+
+
+def _signed_amount(source):
+    return case(
+        (source.transaction_type == 'income', source.amount),
+        (source.transaction_type == 'expense', -source.amount),
+        else_=0
+    )
+
+
+def opening_balance(user_id, before):
+    """Net of income and expenses before ``before``
+
+    Whole months come from the rollups; only the days of ``before``'s own
+    month are summed from transactions.
+    """
+    month_start = before.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    totals = rollups.totals_by_type(user_id, before=month_start.strftime('%Y-%m'))
+    source = transaction_source(month_start)
+    partial = db.session.execute(
+        select(func.coalesce(func.sum(_signed_amount(source)), 0))
+        .where(source.user_id == user_id,
+               source.date >= month_start, source.date < before)
+    ).scalar()
+    return (totals.get('income') or 0) - (totals.get('expense') or 0) + float(partial)
+
+
+def bucket_totals(user_id, unit, start, end, by_category=False):
+    """[(bucket, transaction_type, category or None, total)] for [start, end)"""
+    source = transaction_source(start)
+    bucket = date_bucket(unit, source.date)
+    columns = [bucket, source.transaction_type]
+    if by_category:
+        columns.append(source.category)
+    query = (
+        select(*columns, func.sum(source.amount))
+        .where(source.user_id == user_id, source.date >= start, source.date < end)
+        .group_by(*columns)
+    )
+    rows = db.session.execute(query).all()
+    if by_category:
+        return [tuple(row) for row in rows]
+    return [(key, transaction_type, None, total) for key, transaction_type, total in rows]
+
+
+def lttb(points, threshold):
+    """Downsample (x, y) points to ``threshold`` points with Largest-Triangle-Three-Buckets
+
+    The first and last points are always kept. In each bucket between them,
+    the point kept is the one forming the largest triangle with the last
+    kept point and the average of the next bucket.
+    """
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    every = (count - 2) / (threshold - 2)
+    previous = 0
+    for index in range(threshold - 2):
+        next_start = int((index + 1) * every) + 1
+        next_end = min(int((index + 2) * every) + 1, count)
+        span = next_end - next_start
+        avg_x = sum(x for x, _ in points[next_start:next_end]) / span
+        avg_y = sum(y for _, y in points[next_start:next_end]) / span
+
+        ax, ay = points[previous]
+        best, best_area = None, -1.0
+        for candidate in range(int(index * every) + 1, next_start):
+            x, y = points[candidate]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = candidate, area
+        sampled.append(points[best])
+        previous = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def build_series(user_id, unit, start, end, series=('income', 'expense'), categories=(),
+                 transaction_type=None, cumulative=False, max_points=DEFAULT_MAX_POINTS):
+    """Gap-filled, optionally cumulative and downsampled series for [start, end)
+
+    ``series`` names come from BASE_SERIES. Each entry of ``categories`` adds a
+    ``category:<name>`` series, restricted to ``transaction_type`` when given.
+    Returns {'buckets': total bucket count, 'downsampled': bool,
+    'series': {name: [[bucket, value], ...]}}.
+    """
+    keys = bucket_keys(start, end - timedelta(microseconds=1), unit)
+    position = {key: index for index, key in enumerate(keys)}
+    values = {name: [0.0] * len(keys) for name in series}
+    for category in categories:
+        values[f'category:{category}'] = [0.0] * len(keys)
+
+    wanted = set(categories)
+    for key, row_type, category, total in bucket_totals(user_id, unit, start, end, bool(categories)):
+        index = position.get(key)
+        if index is None or total is None:
+            continue
+        total = float(total)
+        if row_type in ('income', 'expense') and row_type in values:
+            values[row_type][index] += total
+        signed = total if row_type == 'income' else -total if row_type == 'expense' else 0.0
+        for name in ('net', 'balance'):
+            if name in values:
+                values[name][index] += signed
+        if category in wanted and (transaction_type is None or row_type == transaction_type):
+            values[f'category:{category}'][index] += total
+
+    opening = opening_balance(user_id, start) if 'balance' in values else 0.0
+    for name, points in values.items():
+        if cumulative or name == 'balance':
+            running = opening if name == 'balance' else 0.0
+            for index, value in enumerate(points):
+                running += value
+                points[index] = running
+
+    downsampled = len(keys) > max_points
+    result = {}
+    for name, points in values.items():
+        indexed = list(enumerate(points))
+        if downsampled:
+            indexed = lttb(indexed, max_points)
+        result[name] = [[keys[index], round(value, 2)] for index, value in indexed]
+    return {'buckets': len(keys), 'downsampled': downsampled, 'series': result}
@@ -0,0 +1,73 @@
+"""Transaction writes shared by the routes and the group-commit queue.
+
+Each function does a write's full unit of work, meaning the row change,
+rollup and budget deltas, recurrence rule, cache version bump and
+change-feed stamp or tombstone. Archived transactions are moved back to
+the hot table before they are changed. It leaves the commit to the caller, so the
+same code runs per request or batched by ``write_queue``.
+"""
+from .archive import restore
+from .cache import bump_data_version
+from .changes import record_deletes
+from .models import db, Transaction
+from .recurrence import create_rule_for, remove_rule, seeded_rule
+from .rollups import RollupDelta, record_transactions
+
+
+def create_transaction(user_id, data):
+    """Insert a validated transaction payload; returns the new id"""
+    version = bump_data_version(user_id)[int(user_id)]
+    transaction = Transaction(
+        user_id=user_id,
+        amount=data['amount'],
+        description=data.get('description'),
+        category=data.get('category'),
+        transaction_type=data['transaction_type'],
+        is_recurring=data.get('is_recurring', False),
+        recurring_interval=data.get('recurring_interval'),
+        change_version=version
+    )
+    db.session.add(transaction)
+    db.session.flush()
+    record_transactions([transaction])
+    if transaction.is_recurring and transaction.recurring_interval:
+        create_rule_for(transaction)
+    return transaction.id
+
+
+def update_transaction(user_id, id, data):
+    restore(user_id, id)
+    transaction = Transaction.query.filter_by(id=id, user_id=user_id).first_or_404()
+    rule = seeded_rule(transaction)
+
+    delta = RollupDelta()
+    delta.remove(transaction)
+    for key, value in data.items():
+        if hasattr(transaction, key):
+            setattr(transaction, key, value)
+    # Giving an interval makes the transaction recurring unless the payload says otherwise
+    if data.get('recurring_interval') and 'is_recurring' not in data:
+        transaction.is_recurring = True
+    recurring = bool(transaction.is_recurring and transaction.recurring_interval)
+    if rule is not None and (not recurring or rule.interval != transaction.recurring_interval):
+        transaction.recurrence_rule_id = None
+        remove_rule(rule)
+    transaction.change_version = bump_data_version(user_id)[int(user_id)]
+    db.session.flush()
+    delta.add(transaction)
+    delta.apply()
+    # Occurrences of another rule keep pointing at it and do not seed their own
+    if recurring and transaction.recurrence_rule_id is None:
+        create_rule_for(transaction)
+    return transaction.id
+
+
+def delete_transaction(user_id, id):
+    restore(user_id, id)
+    transaction = Transaction.query.filter_by(id=id, user_id=user_id).first_or_404()
+
+    version = bump_data_version(user_id)[int(user_id)]
+    db.session.delete(transaction)
+    record_transactions([transaction], sign=-1)
+    record_deletes(user_id, version, [transaction.id])
+    return id
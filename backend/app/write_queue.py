@@ -0,0 +1,180 @@
+"""Optional group-commit queue for transaction writes.
+
+With ``WRITE_QUEUE_ENABLED``, create/update/delete requests hand their
+unit of work to one writer thread per process. The writer drains up to
+``WRITE_QUEUE_MAX_BATCH`` operations, waiting at most
+``WRITE_QUEUE_MAX_WAIT_MS`` for the batch to fill, and commits them in a
+single transaction. That is one fsync and one lock acquisition per batch
+instead of per request. Callers block until their batch has committed,
+so an acknowledgement is durable and carries the operation's result,
+such as a new row id.
+
+If anything in a batch fails, it is rolled back and each operation is
+retried in its own transaction. One bad request therefore only fails
+itself.
+
+A caller waits at most ``WRITE_QUEUE_TIMEOUT`` seconds. If the writer has
+not started its operation by then, the operation is withdrawn and the
+request gets 503: nothing was written, so retrying is safe. Once started,
+it can no longer be withdrawn and may still commit, so the request gets
+504 with ``"outcome": "unknown"``. Clients must re-read (for instance
+through the change feed) before retrying such a write, or they may
+apply it twice.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from flask import current_app, jsonify
+from werkzeug.exceptions import GatewayTimeout, ServiceUnavailable
+from .models import db
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteNotApplied(ServiceUnavailable):
+    """The write was still queued when the caller gave up; it was withdrawn"""
+    description = 'Too many writes queued; nothing was written, retry shortly'
+
+
+class WriteOutcomeUnknown(GatewayTimeout):
+    """The write had started when the caller gave up; it may still commit"""
+    description = 'The write did not finish in time and may still commit; re-read before retrying'
+
+
+class WriteQueue:
+    def __init__(self, app, max_batch=100, max_wait=0.005, timeout=30):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.operations = 0
+
+    def submit(self, operation, *args):
+        """Queue ``operation(*args)`` and wait until it has been committed; returns its result
+
+        Raises ``WriteNotApplied`` or ``WriteOutcomeUnknown`` after ``timeout`` seconds.
+        """
+        self._ensure_started()
+        future = Future()
+        self.queue.put((future, operation, args))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Only an operation the writer has not picked up yet can be withdrawn
+            if future.cancel():
+                raise WriteNotApplied()
+            raise WriteOutcomeUnknown()
+
+    def close(self):
+        """Commit whatever is queued and stop the writer"""
+        with self.lock:
+            if self.thread is None:
+                return
+            self.queue.put(_STOP)
+            self.thread.join()
+            self.thread = None
+
+    def _ensure_started(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+                self.thread.start()
+
+    def _next_batch(self):
+        first = self.queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self.queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            # Claim each operation; ones whose callers already gave up are skipped
+            batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            with self.app.app_context():
+                try:
+                    self._commit_batch(batch)
+                except Exception:
+                    # Callers see their own error from the one-by-one retry
+                    logger.debug('Write batch failed; retrying operations one by one', exc_info=True)
+                    db.session.rollback()
+                    self._commit_each(batch)
+            self.batches += 1
+            self.operations += len(batch)
+
+    def _commit_batch(self, batch):
+        results = [operation(*args) for _, operation, args in batch]
+        db.session.commit()
+        for (future, _, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def _commit_each(self, batch):
+        for future, operation, args in batch:
+            try:
+                result = operation(*args)
+                db.session.commit()
+            except Exception as error:
+                db.session.rollback()
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+def init_write_queue(app):
+    """Create the queue when WRITE_QUEUE_ENABLED is set; the writer starts on first use"""
+    write_queue = None
+    # One writer thread cannot follow each request's shard; shards spread the writes instead
+    if app.config.get('WRITE_QUEUE_ENABLED') and not app.config.get('SHARD_URIS'):
+        write_queue = WriteQueue(
+            app,
+            max_batch=app.config.get('WRITE_QUEUE_MAX_BATCH', 100),
+            max_wait=app.config.get('WRITE_QUEUE_MAX_WAIT_MS', 5) / 1000,
+            timeout=app.config.get('WRITE_QUEUE_TIMEOUT', 30)
+        )
+        atexit.register(write_queue.close)
+
+        # Registered on the app so they win over blueprint-wide Exception handlers
+        @app.errorhandler(WriteNotApplied)
+        def handle_write_not_applied(error):
+            return jsonify({'error': error.description}), 503, {'Retry-After': '1'}
+
+        @app.errorhandler(WriteOutcomeUnknown)
+        def handle_write_outcome_unknown(error):
+            return jsonify({'error': error.description, 'outcome': 'unknown'}), 504
+    app.extensions['write_queue'] = write_queue
+    return write_queue
+
+
+def execute_write(operation, *args):
+    """Run a write through the app's queue, or commit it right here when there is none"""
+    write_queue = current_app.extensions.get('write_queue')
+    if write_queue is not None:
+        return write_queue.submit(operation, *args)
+    result = operation(*args)
+    db.session.commit()
+    return result
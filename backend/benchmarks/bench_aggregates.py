@@ -0,0 +1,81 @@
+"""Latency of statistics/report aggregation as one user's history grows.
+
+Compares the SQL GROUP BY layer in ``app.aggregates`` (and the rollup-backed
+whole-history path) against the old approach of loading every row into Python.
+
+    python -m benchmarks.bench_aggregates [--sizes 1000,10000,100000,1000000]
+"""
+import argparse
+from datetime import datetime
+
+from app import aggregates, rollups
+from app.models import Transaction
+from .common import make_app, create_user, insert_transactions, measure, report
+
+WINDOW = (datetime(2021, 1, 1), datetime(2021, 12, 31))
+
+
+def legacy_report(user_id, start_date, end_date):
+    """The row-by-row implementation the routes used before"""
+    transactions = Transaction.query.filter(
+        Transaction.user_id == user_id,
+        Transaction.date >= start_date,
+        Transaction.date <= end_date
+    ).all()
+    categories, months = {}, {}
+    for t in transactions:
+        categories[t.category] = categories.get(t.category, 0) + t.amount
+    for t in transactions:
+        key = t.date.strftime('%Y-%m')
+        months[key] = months.get(key, 0) + t.amount
+    max(set(t.category for t in transactions),
+        key=lambda x: sum(1 for t in transactions if t.category == x))
+    return categories, months
+
+
+def sql_report(user_id, start_date, end_date):
+    aggregates.summarize(user_id, start_date, end_date)
+    aggregates.statistics(user_id, start_date, end_date)
+    aggregates.category_totals(user_id, start_date, end_date)
+    aggregates.monthly_totals(user_id, start_date, end_date)
+
+
+def rollup_report(user_id):
+    rollups.totals_by_type(user_id)
+    rollups.totals_by_category(user_id)
+    rollups.totals_by_month(user_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='1000,10000,100000,1000000')
+    parser.add_argument('--legacy-limit', type=int, default=100000,
+                        help='Skip the row-by-row baseline above this many rows.')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    app = make_app()
+    rows = []
+    with app.app_context():
+        user_id = create_user().id
+        loaded = 0
+        for size in sizes:
+            insert_transactions(user_id, size - loaded, seed=size)
+            loaded = size
+            rollups.rebuild_rollups(user_id)
+
+            sql_ms, sql_p95 = measure(lambda: sql_report(user_id, *WINDOW), args.repeat)
+            rollup_ms, _ = measure(lambda: rollup_report(user_id), args.repeat)
+            if size <= args.legacy_limit:
+                legacy_ms, _ = measure(lambda: legacy_report(user_id, *WINDOW), args.repeat)
+                legacy = f'{legacy_ms:.2f}'
+            else:
+                legacy = 'skipped'
+            rows.append((size, legacy, f'{sql_ms:.2f}', f'{sql_p95:.2f}', f'{rollup_ms:.2f}'))
+
+    report(rows, ('rows', 'legacy ms', 'group-by ms', 'group-by p95', 'rollup ms'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Analytics engine: vectorized NumPy figures against the pure-Python loop, and batch precompute.
+
+Loads each user's history once, then times ``compute_analytics`` with each
+engine over the same arrays and checks both give the same document. Then
+times ``precompute_all`` in-process and across a process pool. Without
+NumPy installed, only the pure-Python engine is timed.
+
+    python -m benchmarks.bench_analytics [--users 200] [--transactions 2000] [--workers 4]
+"""
+import argparse
+import math
+import time
+from datetime import date
+
+from app import analytics
+from app.models import db
+from .common import make_app, create_user, insert_transactions, measure, report
+
+
+def same_document(left, right, tolerance=0.011):
+    """Equal up to rounding of the last cent; summation order differs between engines"""
+    if isinstance(left, dict):
+        return left.keys() == right.keys() and all(same_document(left[k], right[k]) for k in left)
+    if isinstance(left, list):
+        return len(left) == len(right) and all(same_document(a, b) for a, b in zip(left, right))
+    if isinstance(left, float) and isinstance(right, float):
+        return math.isclose(left, right, abs_tol=tolerance)
+    return left == right
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--transactions', type=int, default=2000, help='Transactions per user.')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--chunk-size', type=int, default=25)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    as_of = date(2022, 12, 31)
+    app = make_app()
+    rows = []
+    with app.app_context():
+        user_ids = [create_user(f'bench{n}').id for n in range(args.users)]
+        for user_id in user_ids:
+            insert_transactions(user_id, args.transactions, seed=user_id)
+
+        began = time.perf_counter()
+        histories = analytics.load_histories(db.session.connection(), user_ids, as_of)
+        rows.append(('load histories', args.users, f'{time.perf_counter() - began:.3f}', '-'))
+
+        timings = {}
+        for engine in analytics.ENGINES:
+            ms, _ = measure(lambda: [analytics.compute_analytics(h, as_of, engine) for h in histories.values()],
+                            repeat=args.repeat)
+            timings[engine] = ms
+        for engine, ms in timings.items():
+            speedup = f'{timings["python"] / ms:.1f}x' if ms else '-'
+            rows.append((f'compute ({engine})', args.users, f'{ms / 1000:.3f}', speedup))
+
+        if 'numpy' in analytics.ENGINES:
+            mismatched = [
+                user_id for user_id, history in histories.items()
+                if not same_document(analytics.compute_analytics(history, as_of, 'python'),
+                                     analytics.compute_analytics(history, as_of, 'numpy'))
+            ]
+            assert not mismatched, f'engines disagree for users {mismatched[:10]}'
+        else:
+            print('NumPy is not installed; timing the pure-Python engine only')
+
+        for workers in (1, args.workers):
+            began = time.perf_counter()
+            processed = analytics.precompute_all(as_of, workers=workers, chunk_size=args.chunk_size)
+            rows.append((f'precompute_all (workers={workers})', processed,
+                         f'{time.perf_counter() - began:.3f}', '-'))
+
+        read_ms, read_p95 = measure(lambda: analytics.stored_analytics(user_ids[0], as_of))
+
+    report(rows, ('run', 'users', 'seconds', 'vs python'))
+    print(f'stored read: median {read_ms:.3f} ms, p95 {read_p95:.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""100 transaction writes as one POST /api/batch vs. 100 separate requests.
+
+The mix replays what an offline client sends on reconnect: creates, then
+updates and deletes of some of the new rows. Each mode gets a fresh SQLite
+file with the production pragmas.
+
+    python -m benchmarks.bench_batch [--operations 100] [--repeat 10]
+"""
+import argparse
+import time
+
+from app.database import install_engine_events
+from app.migrations import upgrade
+from app.models import db
+from app.routes.batch import batch_bp
+from app.routes.transactions import transaction_bp
+from .common import make_app, create_user, auth_headers, report
+
+PAYLOAD = {'amount': 12.5, 'description': 'coffee shop', 'category': 'food', 'transaction_type': 'expense'}
+
+
+def setup():
+    app = make_app(blueprints=[(transaction_bp, '/api/transactions'), (batch_bp, '/api/batch')])
+    install_engine_events(app, db)
+    with app.app_context():
+        db.engine.dispose()
+        upgrade(db.engine)
+        headers = auth_headers(create_user().id)
+    return app.test_client(), headers
+
+
+def seed_ids(client, headers, count):
+    """Create ``count`` rows for the updates and deletes to target"""
+    operations = [{'method': 'POST', 'resource': 'transactions', 'body': PAYLOAD}] * count
+    response = client.post('/api/batch', json={'operations': operations}, headers=headers)
+    return [result['body']['id'] for result in response.get_json()['results']]
+
+
+def operations_for(ids, count):
+    """Half creates, a quarter updates, a quarter deletes"""
+    creates = count - 2 * (count // 4)
+    operations = [{'method': 'POST', 'resource': 'transactions', 'body': PAYLOAD}] * creates
+    targets = iter(ids)
+    operations += [{'method': 'PUT', 'resource': 'transactions', 'id': next(targets), 'body': {'amount': 20}}
+                   for _ in range(count // 4)]
+    operations += [{'method': 'DELETE', 'resource': 'transactions', 'id': next(targets)}
+                   for _ in range(count // 4)]
+    return operations
+
+
+def separate(client, headers, operations):
+    for operation in operations:
+        if operation['method'] == 'POST':
+            response = client.post('/api/transactions/', json=operation['body'], headers=headers)
+        elif operation['method'] == 'PUT':
+            response = client.put(f'/api/transactions/{operation["id"]}', json=operation['body'], headers=headers)
+        else:
+            response = client.delete(f'/api/transactions/{operation["id"]}', headers=headers)
+        assert response.status_code in (200, 201), response.get_data(as_text=True)
+
+
+def batched(atomic):
+    def run(client, headers, operations):
+        response = client.post('/api/batch', json={'atomic': atomic, 'operations': operations}, headers=headers)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--operations', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    modes = [('separate requests', separate), ('batch (atomic)', batched(True)),
+             ('batch (savepoints)', batched(False))]
+    rows = []
+    baseline = None
+    for name, fn in modes:
+        client, headers = setup()
+        samples = []
+        for _ in range(args.repeat):
+            operations = operations_for(seed_ids(client, headers, args.operations), args.operations)
+            began = time.perf_counter()
+            fn(client, headers, operations)
+            samples.append((time.perf_counter() - began) * 1000)
+        samples.sort()
+        median = samples[len(samples) // 2]
+        baseline = baseline or median
+        rows.append((name, args.operations, f'{median:.1f}', f'{median / args.operations:.2f}',
+                     f'{baseline / median:.1f}x'))
+
+    report(rows, ('mode', 'operations', 'median ms', 'ms/op', 'speedup'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Nightly budget evaluation and per-user status reads over many goals.
+
+Compares ``evaluate_all`` (temp-table grouped query per chunk) with the old
+one-query-per-goal loop, then times a single user's status read from the
+running counters.
+
+    python -m benchmarks.bench_budgets [--goals 100000] [--transactions 200000]
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+
+from app.budgets import current_window, evaluate_all, user_budget_status
+from app.models import db, BudgetGoal, Transaction
+from .common import CATEGORIES, make_app, create_user, insert_transactions, measure, report
+
+
+def insert_goals(user_ids, count, seed=0):
+    rng = random.Random(seed)
+    table = BudgetGoal.__table__
+    rows = []
+    for _ in range(count):
+        rows.append({
+            'user_id': rng.choice(user_ids),
+            'category': rng.choice(CATEGORIES + [None]),
+            'amount': round(rng.uniform(50, 2000), 2),
+            'period': rng.choice(['monthly', 'yearly']),
+            'start_date': datetime(2020, rng.randrange(1, 13), rng.randrange(1, 29))
+        })
+        if len(rows) == 10000:
+            db.session.execute(table.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(table.insert(), rows)
+    db.session.commit()
+
+
+def legacy_evaluate(as_of, limit):
+    """One SUM query per goal, as a loop over BudgetGoal would do it"""
+    for goal in BudgetGoal.query.order_by(BudgetGoal.id).limit(limit):
+        window_start, window_end = current_window(goal.start_date, goal.period, as_of)
+        query = db.session.query(db.func.sum(Transaction.amount)).filter(
+            Transaction.user_id == goal.user_id,
+            Transaction.transaction_type == 'expense',
+            Transaction.date >= window_start,
+            Transaction.date < window_end
+        )
+        if goal.category:
+            query = query.filter(Transaction.category == goal.category)
+        goal.check_alert(query.scalar() or 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--goals', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--transactions', type=int, default=200000)
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--legacy-limit', type=int, default=10000,
+                        help='Goals to time with the per-goal loop (extrapolated).')
+    args = parser.parse_args()
+
+    as_of = datetime(2022, 6, 15)
+    app = make_app()
+    rows = []
+    with app.app_context():
+        user_ids = [create_user(f'bench{n}').id for n in range(args.users)]
+        per_user = max(1, args.transactions // args.users)
+        for user_id in user_ids:
+            insert_transactions(user_id, per_user, seed=user_id)
+        insert_goals(user_ids, args.goals)
+
+        limit = min(args.legacy_limit, args.goals)
+        began = time.perf_counter()
+        legacy_evaluate(as_of, limit)
+        elapsed = (time.perf_counter() - began) * args.goals / limit
+        rows.append(('per-goal queries (est.)', args.goals, f'{elapsed:.2f}'))
+
+        began = time.perf_counter()
+        evaluated, alerts = evaluate_all(as_of, args.chunk_size)
+        rows.append(('evaluate_all', evaluated, f'{time.perf_counter() - began:.2f}'))
+
+        status_ms, status_p95 = measure(lambda: user_budget_status(user_ids[0], as_of))
+        rows.append(('user status (counters)', '-', f'{status_ms / 1000:.4f}'))
+
+    report(rows, ('run', 'goals', 'seconds'))
+    print(f'{alerts} goals in warning or exceeded; user status p95 {status_p95:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
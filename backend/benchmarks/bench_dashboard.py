@@ -0,0 +1,59 @@
+"""Latency of GET /api/dashboard/ against the five calls it replaces.
+
+    python -m benchmarks.bench_dashboard [--sizes 1000,10000,100000]
+"""
+import argparse
+from datetime import datetime
+
+from app.migrations import upgrade
+from app.models import db
+from app.rollups import rebuild_rollups
+from app.routes.dashboard import dashboard_bp
+from app.routes.transactions import transaction_bp
+from .common import make_app, create_user, auth_headers, insert_transactions, measure, report
+
+SEPARATE_CALLS = [
+    '/api/transactions/summary',
+    '/api/transactions/category-summary',
+    '/api/transactions/categories',
+    '/api/transactions/statistics?period=year',
+    '/api/transactions/?mode=cursor&limit=10',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    app = make_app(blueprints=[(transaction_bp, '/api/transactions'), (dashboard_bp, '/api/dashboard')])
+    client = app.test_client()
+    rows = []
+    with app.app_context():
+        upgrade(db.engine)
+        user_id = create_user().id
+        headers = auth_headers(user_id)
+        loaded = 0
+        start = datetime(datetime.now().year - 2, 1, 1)
+        for size in sizes:
+            insert_transactions(user_id, size - loaded, start=start, days=2 * 365, seed=size)
+            loaded = size
+            rebuild_rollups(user_id)
+
+            def get(url):
+                response = client.get(url, headers=headers)
+                assert response.status_code == 200, response.get_data(as_text=True)
+
+            separate_ms, separate_p95 = measure(lambda: [get(url) for url in SEPARATE_CALLS], args.repeat)
+            dashboard_ms, dashboard_p95 = measure(lambda: get('/api/dashboard/?period=year'), args.repeat)
+            rows.append((size, f'{separate_ms:.2f}', f'{separate_p95:.2f}',
+                         f'{dashboard_ms:.2f}', f'{dashboard_p95:.2f}',
+                         f'{separate_ms / dashboard_ms:.1f}x'))
+
+    report(rows, ('rows', '5 calls ms', '5 calls p95', 'dashboard ms', 'dashboard p95', 'speedup'))
+
+
+if __name__ == '__main__':
+    main()
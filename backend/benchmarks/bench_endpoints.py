@@ -0,0 +1,248 @@
+"""Load benchmark for the HTTP API: latency percentiles, throughput and SQL per request.
+
+Seeds a throwaway database with ``seed.seed_database``, then drives each
+route through the Flask test client from ``--concurrency`` threads, one
+seeded user per thread. Results are printed and saved as JSON, stamped
+with the current git commit, so runs can be diffed. ``--baseline``
+prints p95 changes against an earlier results file.
+
+    python -m benchmarks.bench_endpoints [--users 20] [--transactions 5000]
+        [--requests 200] [--concurrency 4] [--output FILE] [--baseline FILE]
+"""
+import argparse
+import itertools
+import json
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app.cache import init_cache
+from app.migrations import upgrade
+from app.models import db, User, Transaction
+from app.routes.auth import auth_bp
+from app.routes.budget_goals import budget_bp
+from app.routes.transactions import transaction_bp
+from seed import PASSWORD, seed_database
+from .common import make_app, auth_headers, percentile, report
+
+BLUEPRINTS = [
+    (auth_bp, '/api/auth'),
+    (transaction_bp, '/api/transactions'),
+    (budget_bp, '/api/budget-goals'),
+]
+
+_local = threading.local()
+_signups = itertools.count()
+
+
+def _count_query(*args):
+    _local.queries = getattr(_local, 'queries', 0) + 1
+
+
+class Session:
+    """One simulated client: a test client logged in as a seeded user"""
+
+    def __init__(self, app, user):
+        self.client = app.test_client()
+        self.headers = auth_headers(user.id)
+        self.email = user.email
+        self.sample_ids = [
+            id for id, in db.session.query(Transaction.id)
+            .filter(Transaction.user_id == user.id).limit(100)
+        ]
+        self.created = []
+
+    def get(self, url):
+        return self.client.get(url, headers=self.headers)
+
+    def sample_id(self):
+        self.sample_ids.append(self.sample_ids.pop(0))
+        return self.sample_ids[0]
+
+    def create(self):
+        response = self.client.post('/api/transactions/', headers=self.headers, json={
+            'amount': 12.5, 'description': 'coffee shop', 'category': 'food',
+            'transaction_type': 'expense'
+        })
+        if response.status_code == 201:
+            self.created.append(response.get_json()['id'])
+        return response
+
+    def update(self):
+        if not self.created:
+            self.create()
+        return self.client.put(f'/api/transactions/{self.created[-1]}', headers=self.headers,
+                               json={'amount': 14.0, 'category': 'shopping'})
+
+    def delete(self):
+        if not self.created:
+            self.create()
+        return self.client.delete(f'/api/transactions/{self.created.pop()}', headers=self.headers)
+
+
+def _signup(session):
+    n = next(_signups)
+    return session.client.post('/api/auth/signup', json={
+        'username': f'loadtest{n}', 'email': f'loadtest{n}@example.com', 'password': PASSWORD
+    })
+
+
+def _bulk(session):
+    return session.client.post('/api/transactions/bulk', headers=session.headers, json=[
+        {'amount': 3.5 + n, 'description': 'bus ticket', 'category': 'transport',
+         'transaction_type': 'expense'}
+        for n in range(100)
+    ])
+
+
+ROUTES = [
+    ('POST /api/auth/signup', _signup),
+    ('POST /api/auth/login', lambda s: s.client.post(
+        '/api/auth/login', json={'email': s.email, 'password': PASSWORD})),
+    ('GET /api/transactions/', lambda s: s.get('/api/transactions/')),
+    ('GET /api/transactions/?page=20', lambda s: s.get('/api/transactions/?page=20&per_page=50')),
+    ('GET /api/transactions/?mode=cursor', lambda s: s.get('/api/transactions/?mode=cursor&limit=50')),
+    ('GET /api/transactions/<id>', lambda s: s.get(f'/api/transactions/{s.sample_id()}')),
+    ('POST /api/transactions/', lambda s: s.create()),
+    ('PUT /api/transactions/<id>', lambda s: s.update()),
+    ('DELETE /api/transactions/<id>', lambda s: s.delete()),
+    ('POST /api/transactions/bulk', _bulk),
+    ('GET /api/transactions/summary', lambda s: s.get('/api/transactions/summary')),
+    ('GET /api/transactions/category-summary', lambda s: s.get('/api/transactions/category-summary')),
+    ('GET /api/transactions/statistics', lambda s: s.get('/api/transactions/statistics?period=year')),
+    ('GET /api/transactions/report', lambda s: s.get('/api/transactions/report')),
+    ('GET /api/transactions/report?range', lambda s: s.get(
+        '/api/transactions/report?start_date=2020-01-01&end_date=2030-12-31')),
+    ('GET /api/transactions/categories', lambda s: s.get('/api/transactions/categories')),
+    ('GET /api/transactions/search?q=coffee', lambda s: s.get('/api/transactions/search?q=coffee')),
+    ('GET /api/transactions/search', lambda s: s.get('/api/transactions/search?limit=100')),
+    ('GET /api/transactions/timeseries', lambda s: s.get(
+        '/api/transactions/timeseries?start_date=2020-01-01&series=income,expense,balance')),
+    ('GET /api/transactions/changes', lambda s: s.get('/api/transactions/changes?limit=500')),
+    ('GET /api/budget-goals/', lambda s: s.get('/api/budget-goals/')),
+    ('GET /api/budget-goals/alerts', lambda s: s.get('/api/budget-goals/alerts')),
+]
+
+
+def run_route(sessions, call, requests):
+    """Issue ``requests`` calls spread over one thread per session"""
+    results = [[] for _ in sessions]
+
+    def worker(session, share, out):
+        for _ in range(share):
+            _local.queries = 0
+            began = time.perf_counter()
+            response = call(session)
+            out.append(((time.perf_counter() - began) * 1000, _local.queries, response.status_code))
+
+    shares = [requests // len(sessions) + (n < requests % len(sessions)) for n in range(len(sessions))]
+    threads = [
+        threading.Thread(target=worker, args=(session, share, out))
+        for session, share, out in zip(sessions, shares, results)
+    ]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - began
+
+    samples = [sample for out in results for sample in out]
+    latencies = sorted(ms for ms, _, _ in samples)
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, _, status in samples if status >= 400),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'throughput_rps': round(len(samples) / wall, 1) if wall else 0.0,
+        'queries_per_request': round(sum(q for _, q, _ in samples) / max(1, len(samples)), 2)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as handle:
+        baseline = json.load(handle)
+    rows = []
+    for name, stats in results['routes'].items():
+        before = baseline.get('routes', {}).get(name)
+        if not before:
+            continue
+        change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0.0
+        rows.append((name, before['p95_ms'], stats['p95_ms'], f'{change:+.1f}%',
+                     before['queries_per_request'], stats['queries_per_request']))
+    print(f'\nagainst {baseline_path} ({(baseline.get("commit") or "unknown")[:10]})')
+    report(rows, ('route', 'p95 before', 'p95 now', 'change', 'queries before', 'queries now'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--transactions', type=int, default=5000, help='Seeded one-off transactions per user.')
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per route.')
+    parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per route and client.')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--cache', default='memory', choices=['memory', 'sqlite', 'none'])
+    parser.add_argument('--routes', default=None, help='Only routes whose name contains this text.')
+    parser.add_argument('--database-uri', default=None)
+    parser.add_argument('--output', default=None, help='Results file (default endpoints-<commit>.json).')
+    parser.add_argument('--baseline', default=None, help='Earlier results file to compare against.')
+    args = parser.parse_args()
+
+    app = make_app(args.database_uri, BLUEPRINTS)
+    app.config['CACHE_BACKEND'] = None if args.cache == 'none' else args.cache
+    init_cache(app)
+
+    with app.app_context():
+        upgrade(db.engine)
+        began = time.perf_counter()
+        counts = seed_database(args.users, args.transactions)
+        print(f'seeded {counts} in {time.perf_counter() - began:.1f}s')
+
+        event.listen(db.engine, 'before_cursor_execute', _count_query)
+        users = User.query.order_by(User.id).limit(args.concurrency).all()
+        sessions = [Session(app, user) for user in users]
+        db.session.remove()
+
+    routes = [(name, call) for name, call in ROUTES if not args.routes or args.routes in name]
+    results = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'params': vars(args),
+        'seeded': counts,
+        'routes': {}
+    }
+    for name, call in routes:
+        if args.warmup:
+            run_route(sessions, call, args.warmup * len(sessions))
+        results['routes'][name] = run_route(sessions, call, args.requests)
+
+    report(
+        [(name, s['requests'], s['errors'], s['p50_ms'], s['p95_ms'], s['p99_ms'],
+          s['throughput_rps'], s['queries_per_request'])
+         for name, s in results['routes'].items()],
+        ('route', 'requests', 'errors', 'p50 ms', 'p95 ms', 'p99 ms', 'req/s', 'queries/req')
+    )
+
+    output = args.output or f'endpoints-{(results["commit"] or "local")[:10]}.json'
+    with open(output, 'w') as handle:
+        json.dump(results, handle, indent=2)
+    print(f'\nresults written to {output}')
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    main()
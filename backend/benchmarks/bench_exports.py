@@ -0,0 +1,50 @@
+"""Peak Python memory and throughput of streaming exports as history grows.
+
+    python -m benchmarks.bench_exports [--sizes 1000,100000,1000000,10000000]
+"""
+import argparse
+import time
+import tracemalloc
+
+from app.exports import stream_export
+from .common import make_app, create_user, insert_transactions, report
+
+
+def drain(user_id, export_format, batch_size):
+    """Consume an export the way a response or file writer would"""
+    written = 0
+    for chunk in stream_export(user_id, export_format, batch_size):
+        written += len(chunk)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='1000,100000,1000000,10000000')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    app = make_app()
+    rows = []
+    with app.app_context():
+        user_id = create_user().id
+        loaded = 0
+        for size in sizes:
+            insert_transactions(user_id, size - loaded, seed=size)
+            loaded = size
+            for export_format in ('csv', 'ndjson'):
+                tracemalloc.start()
+                began = time.perf_counter()
+                written = drain(user_id, export_format, args.batch_size)
+                elapsed = time.perf_counter() - began
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                rows.append((size, export_format, f'{peak / 1024:.0f}',
+                             f'{size / elapsed:,.0f}', f'{written / 1048576:.1f}'))
+
+    report(rows, ('rows', 'format', 'peak KiB', 'rows/sec', 'MiB written'))
+
+
+if __name__ == '__main__':
+    main()
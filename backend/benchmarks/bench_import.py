@@ -0,0 +1,85 @@
+"""Rows/sec of the streaming import pipeline vs. the previous /bulk implementation.
+
+    python -m benchmarks.bench_import [--rows 100000] [--chunk-size 1000]
+"""
+import argparse
+import json
+import random
+import time
+
+from app.models import db, Transaction, VALID_CATEGORIES
+from app.routes.transactions import transaction_bp, transaction_schema
+from .common import make_app, create_user, auth_headers, report
+
+
+def make_records(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            'amount': round(rng.uniform(1, 500), 2),
+            'description': f'import {n}',
+            'category': rng.choice(VALID_CATEGORIES),
+            'transaction_type': rng.choice(['income', 'expense'])
+        }
+        for n in range(count)
+    ]
+
+
+def legacy_bulk(user_id, records):
+    """The per-row marshmallow + bulk_save_objects path /bulk used before"""
+    created = []
+    for data in records:
+        if transaction_schema.validate(data):
+            raise ValueError('invalid row')
+        created.append(Transaction(
+            user_id=user_id,
+            amount=data['amount'],
+            description=data.get('description'),
+            category=data.get('category'),
+            transaction_type=data['transaction_type']
+        ))
+    db.session.bulk_save_objects(created)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    records = make_records(args.rows)
+    json_body = json.dumps(records)
+    ndjson_body = ''.join(json.dumps(record) + '\n' for record in records)
+    csv_body = 'amount,description,category,transaction_type\n' + ''.join(
+        f'{r["amount"]},{r["description"]},{r["category"]},{r["transaction_type"]}\n' for r in records
+    )
+
+    app = make_app(blueprints=[(transaction_bp, '/api/transactions')])
+    client = app.test_client()
+    rows = []
+    with app.app_context():
+        user_id = create_user().id
+        headers = auth_headers(user_id)
+
+        began = time.perf_counter()
+        legacy_bulk(user_id, records)
+        rows.append(('legacy /bulk (json)', f'{args.rows / (time.perf_counter() - began):,.0f}'))
+
+        for label, body, content_type in (
+            ('pipeline json', json_body, 'application/json'),
+            ('pipeline ndjson', ndjson_body, 'application/x-ndjson'),
+            ('pipeline csv', csv_body, 'text/csv'),
+        ):
+            began = time.perf_counter()
+            response = client.post(f'/api/transactions/bulk?chunk_size={args.chunk_size}',
+                                   data=body, content_type=content_type, headers=headers)
+            elapsed = time.perf_counter() - began
+            assert response.status_code == 201, response.get_data(as_text=True)
+            rows.append((label, f'{args.rows / elapsed:,.0f}'))
+
+    report(rows, ('path', 'rows/sec'))
+
+
+if __name__ == '__main__':
+    main()
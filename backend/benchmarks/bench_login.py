@@ -0,0 +1,116 @@
+"""Login throughput and latency next to mixed read traffic.
+
+Login threads sign in as users whose hashes were made with old, cheaper
+parameters, so the first pass also measures rehash-on-login. Reader
+threads call GET /api/transactions/ at the same time. Each mode runs with
+a fresh app:
+
+- ``unbounded`` gives the KDF pool one worker per login thread, which is
+  like hashing inline in every request thread.
+- ``bounded`` uses ``--workers``. Logins beyond the queue get 503.
+
+    python -m benchmarks.bench_login [--users 200] [--login-threads 8] [--reader-threads 4] [--seconds 10]
+"""
+import argparse
+import threading
+import time
+
+from werkzeug.security import generate_password_hash
+
+from app.migrations import upgrade
+from app.models import db, User
+from app.passwords import init_password_hasher
+from app.routes.auth import auth_bp
+from app.routes.transactions import transaction_bp
+from .common import make_app, create_user, auth_headers, insert_transactions, percentile, report
+
+PASSWORD = 'correct horse battery staple'
+
+
+def run(mode, args):
+    app = make_app(blueprints=[(auth_bp, '/api/auth'), (transaction_bp, '/api/transactions')])
+    app.config['PASSWORD_HASH_METHOD'] = args.method
+    app.config['PASSWORD_HASH_WORKERS'] = args.login_threads if mode == 'unbounded' else args.workers
+    app.config['PASSWORD_HASH_QUEUE'] = args.login_threads if mode == 'unbounded' else args.queue
+    hasher = init_password_hasher(app)
+
+    with app.app_context():
+        upgrade(db.engine)
+        reader_id = create_user().id
+        headers = auth_headers(reader_id)
+        insert_transactions(reader_id, 5000)
+        old_hash = generate_password_hash(PASSWORD, args.old_method)
+        db.session.execute(User.__table__.insert(), [
+            {'username': f'login{index}', 'email': f'login{index}@example.com', 'password_hash': old_hash}
+            for index in range(args.users)
+        ])
+        db.session.commit()
+
+    stop = threading.Event()
+    logins, rejected, reads = [], [], []
+
+    def login_worker(offset):
+        client = app.test_client()
+        index = offset
+        while not stop.is_set():
+            began = time.perf_counter()
+            response = client.post('/api/auth/login', json={
+                'email': f'login{index % args.users}@example.com', 'password': PASSWORD
+            })
+            elapsed = (time.perf_counter() - began) * 1000
+            if response.status_code == 200:
+                logins.append(elapsed)
+            elif response.status_code == 503:
+                rejected.append(elapsed)
+                time.sleep(0.01)
+            else:
+                raise AssertionError(response.get_data(as_text=True))
+            index += args.login_threads
+
+    def reader_worker():
+        client = app.test_client()
+        while not stop.is_set():
+            began = time.perf_counter()
+            response = client.get('/api/transactions/?per_page=20', headers=headers)
+            assert response.status_code == 200, response.get_data(as_text=True)
+            reads.append((time.perf_counter() - began) * 1000)
+
+    threads = [threading.Thread(target=login_worker, args=(offset,)) for offset in range(args.login_threads)]
+    threads += [threading.Thread(target=reader_worker) for _ in range(args.reader_threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    hasher.close()
+
+    with app.app_context():
+        upgraded = db.session.query(User).filter(User.password_hash != old_hash).count() - 1
+    logins.sort()
+    reads.sort()
+    return (mode, len(logins), f'{len(logins) / args.seconds:.1f}', len(rejected),
+            f'{percentile(logins, 50):.1f}', f'{percentile(logins, 95):.1f}',
+            f'{len(reads) / args.seconds:.0f}', f'{percentile(reads, 50):.2f}', f'{percentile(reads, 95):.2f}',
+            upgraded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--login-threads', type=int, default=8)
+    parser.add_argument('--reader-threads', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--queue', type=int, default=4)
+    parser.add_argument('--method', default='scrypt')
+    parser.add_argument('--old-method', default='pbkdf2:sha256:100000')
+    args = parser.parse_args()
+
+    rows = [run(mode, args) for mode in ('unbounded', 'bounded')]
+    report(rows, ('mode', 'logins', 'logins/sec', '503s', 'login p50 ms', 'login p95 ms',
+                  'reads/sec', 'read p50 ms', 'read p95 ms', 'rehashed'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Page 1 vs. a deep page for offset and cursor pagination of GET /api/transactions.
+
+    python -m benchmarks.bench_pagination [--rows 250000] [--deep-page 10000]
+"""
+import argparse
+
+from app.models import Transaction
+from app.routes.transactions import encode_cursor, transaction_bp
+from .common import make_app, create_user, auth_headers, insert_transactions, measure, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=250000)
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--deep-page', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = make_app(blueprints=[(transaction_bp, '/api/transactions')])
+    client = app.test_client()
+    with app.app_context():
+        user_id = create_user().id
+        insert_transactions(user_id, args.rows)
+        headers = auth_headers(user_id)
+
+        # The row just before the deep page, to seed an equivalent cursor
+        anchor = Transaction.query.filter_by(user_id=user_id)\
+            .order_by(Transaction.date.desc(), Transaction.id.desc())\
+            .offset((args.deep_page - 1) * args.per_page - 1)\
+            .first()
+        deep_cursor = encode_cursor(anchor, 'next')
+
+    def get(query):
+        response = client.get(f'/api/transactions/?{query}', headers=headers)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    cases = [
+        ('offset', 1, f'page=1&per_page={args.per_page}'),
+        ('offset', args.deep_page, f'page={args.deep_page}&per_page={args.per_page}'),
+        ('cursor', 1, f'mode=cursor&limit={args.per_page}'),
+        ('cursor', args.deep_page, f'cursor={deep_cursor}&limit={args.per_page}'),
+        ('cursor+total', args.deep_page, f'cursor={deep_cursor}&limit={args.per_page}&include_total=1'),
+    ]
+    rows = []
+    for mode, page, query in cases:
+        median, p95 = measure(lambda: get(query), args.repeat)
+        rows.append((mode, page, f'{median:.2f}', f'{p95:.2f}'))
+
+    report(rows, ('mode', 'page', 'median ms', 'p95 ms'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Throughput of the recurrence scheduler over many rules.
+
+    python -m benchmarks.bench_recurrence [--rules 1000000] [--days 30]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.models import db, RecurrenceRule, RECURRING_INTERVALS
+from app.recurrence import materialize_due, occurrence_date
+from .common import make_app, create_user, report
+
+
+def insert_rules(user_ids, count, start, seed=0):
+    rng = random.Random(seed)
+    intervals = list(RECURRING_INTERVALS)
+    table = RecurrenceRule.__table__
+    rows = []
+    for _ in range(count):
+        interval = rng.choice(intervals)
+        anchor = start - timedelta(days=rng.randrange(60))
+        rows.append({
+            'user_id': rng.choice(user_ids),
+            'amount': round(rng.uniform(5, 200), 2),
+            'description': 'subscription',
+            'category': 'utilities',
+            'transaction_type': 'expense',
+            'interval': interval,
+            'anchor_date': anchor,
+            'next_index': 1,
+            'next_date': occurrence_date(anchor, interval, 1),
+            'active': True
+        })
+        if len(rows) == 10000:
+            db.session.execute(table.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(table.insert(), rows)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rules', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=30, help='Horizon past the newest anchor.')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    start = datetime(2024, 1, 1)
+    app = make_app()
+    rows = []
+    with app.app_context():
+        user_ids = [create_user(f'bench{n}').id for n in range(args.users)]
+        insert_rules(user_ids, args.rules, start)
+        horizon = start + timedelta(days=args.days)
+
+        for label in ('first run', 're-run'):
+            began = time.perf_counter()
+            processed, created = materialize_due(horizon, args.batch_size)
+            elapsed = time.perf_counter() - began
+            rows.append((label, processed, created, f'{elapsed:.2f}',
+                         f'{created / elapsed:,.0f}' if created else '-'))
+
+    report(rows, ('run', 'rules', 'created', 'seconds', 'rows/sec'))
+
+
+if __name__ == '__main__':
+    main()
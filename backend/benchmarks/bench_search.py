@@ -0,0 +1,57 @@
+"""Latency of GET /api/transactions/search on a large shared table.
+
+Rows are spread over many users; the measured user owns ``--user-rows`` of
+them. The legacy ILIKE scan is timed alongside for comparison.
+
+    python -m benchmarks.bench_search [--rows 5000000] [--users 1000]
+"""
+import argparse
+
+from app.migrations import upgrade
+from app.models import db, Transaction
+from app.routes.transactions import transaction_bp
+from .common import make_app, create_user, auth_headers, insert_transactions, measure, report
+
+TERMS = ['txn', 'txn 42', 'tx', 'food', 'nothing-matches']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=5000000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = make_app(blueprints=[(transaction_bp, '/api/transactions')])
+    client = app.test_client()
+    with app.app_context():
+        upgrade(db.engine)
+        per_user = args.rows // args.users
+        user_ids = [create_user(f'bench{n}').id for n in range(args.users)]
+        for n, user_id in enumerate(user_ids):
+            insert_transactions(user_id, per_user, seed=n)
+        user_id = user_ids[0]
+        headers = auth_headers(user_id)
+
+        def legacy(term):
+            Transaction.query.filter_by(user_id=user_id).filter(db.or_(
+                Transaction.description.ilike(f'%{term}%'),
+                Transaction.category.ilike(f'%{term}%')
+            )).all()
+
+        rows = []
+        for term in TERMS:
+            def indexed():
+                response = client.get('/api/transactions/search', query_string={'q': term, 'limit': 50},
+                                      headers=headers)
+                assert response.status_code == 200, response.get_data(as_text=True)
+
+            median, p95 = measure(indexed, args.repeat)
+            legacy_ms, _ = measure(lambda: legacy(term), max(1, args.repeat // 4))
+            rows.append((repr(term), f'{median:.2f}', f'{p95:.2f}', f'{legacy_ms:.2f}'))
+
+    report(rows, ('term', 'fts median ms', 'fts p95 ms', 'ilike ms'))
+
+
+if __name__ == '__main__':
+    main()
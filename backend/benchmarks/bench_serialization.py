@@ -0,0 +1,60 @@
+"""Objects/sec of transaction list serialization, ORM + jsonify vs. projection fast path.
+
+Each size loads that many of one user's transactions and encodes them as a
+list response. Both paths' bodies are checked to be byte-identical first.
+
+    python -m benchmarks.bench_serialization [--sizes 100,1000,10000,100000]
+"""
+import argparse
+
+from flask import jsonify
+
+from app.models import Transaction
+from app.serialization import transaction_dict, transaction_rows, transactions_response
+from .common import make_app, create_user, insert_transactions, measure, report
+
+
+def legacy_list(user_id, limit):
+    """Hydrate ORM objects, build dicts, jsonify"""
+    transactions = Transaction.query.filter_by(user_id=user_id)\
+        .order_by(Transaction.date.desc(), Transaction.id.desc())\
+        .limit(limit).all()
+    return jsonify([transaction_dict(t) for t in transactions])
+
+
+def fast_list(user_id, limit):
+    rows = transaction_rows().filter(Transaction.user_id == user_id)\
+        .order_by(Transaction.date.desc(), Transaction.id.desc())\
+        .limit(limit).all()
+    return transactions_response(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='100,1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    app = make_app()
+    rows = []
+    with app.app_context(), app.test_request_context():
+        user_id = create_user().id
+        insert_transactions(user_id, max(sizes))
+
+        for size in sizes:
+            assert legacy_list(user_id, size).get_data() == fast_list(user_id, size).get_data()
+            legacy_ms, _ = measure(lambda: legacy_list(user_id, size), args.repeat)
+            fast_ms, fast_p95 = measure(lambda: fast_list(user_id, size), args.repeat)
+            rows.append((
+                size,
+                f'{legacy_ms:.2f}', f'{size / legacy_ms * 1000:,.0f}',
+                f'{fast_ms:.2f}', f'{size / fast_ms * 1000:,.0f}',
+                f'{legacy_ms / fast_ms:.1f}x'
+            ))
+
+    report(rows, ('rows', 'orm ms', 'orm obj/s', 'fast ms', 'fast obj/s', 'speedup'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Concurrent write throughput of POST /api/transactions/ by shard count.
+
+Each run gets fresh SQLite files: the main database plus ``shards - 1``
+shard files (see app/shards.py). Every writer thread signs in as its own
+user, so writers spread over the shards the way jump hashing places real
+users. With one file every commit waits for the single writer lock;
+with more files, commits on different shards proceed in parallel.
+``--synchronous FULL`` (the default here) makes every commit fsync, which
+is where SQLite writers spend their time.
+
+    python -m benchmarks.bench_shards [--shards 1,2,4] [--requests 2000] [--concurrency 16] [--synchronous FULL]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import func, select
+
+from app.config import Config
+from app.database import install_engine_events
+from app.migrations import upgrade_all
+from app.models import db, Transaction
+from app.routes.transactions import transaction_bp
+from app.shards import assign_shard, engines, init_sharding
+from .common import make_app, create_user, auth_headers, report
+
+PAYLOAD = {'amount': 12.5, 'description': 'coffee shop', 'category': 'food', 'transaction_type': 'expense'}
+
+
+def temp_uri(name):
+    fd, path = tempfile.mkstemp(suffix='.db', prefix=f'bench-{name}-')
+    os.close(fd)
+    return f'sqlite:///{path}'
+
+
+def run(shards, args):
+    app = make_app(blueprints=[(transaction_bp, '/api/transactions')], config={
+        'SHARD_URIS': [temp_uri(f'shard{number}') for number in range(1, shards)],
+        'SQLITE_PRAGMAS': {**Config.SQLITE_PRAGMAS, 'synchronous': args.synchronous},
+    })
+    init_sharding(app, app.extensions['flask-jwt-extended'])
+    install_engine_events(app, db)
+
+    with app.app_context():
+        for _, engine in engines():
+            engine.dispose()
+        upgrade_all()
+        users = []
+        for index in range(args.concurrency):
+            user = create_user(f'writer{index}')
+            assign_shard(user)
+            db.session.commit()
+            users.append((user.shard or 0, auth_headers(user.id)))
+
+    errors = []
+    written = []
+
+    def worker(headers, count):
+        client = app.test_client()
+        for _ in range(count):
+            response = client.post('/api/transactions/', json=PAYLOAD, headers=headers)
+            if response.status_code == 201:
+                written.append(1)
+            else:
+                errors.append(response.status_code)
+
+    share = args.requests // args.concurrency
+    threads = [threading.Thread(target=worker, args=(headers, share)) for _, headers in users]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    with app.app_context():
+        stored = 0
+        for _, engine in engines():
+            with engine.connect() as connection:
+                stored += connection.execute(select(func.count()).select_from(Transaction.__table__)).scalar()
+            engine.dispose()
+    assert len(written) == stored, (len(written), stored)
+    spread = '/'.join(str(sum(1 for shard, _ in users if shard == number)) for number in range(shards))
+    return (shards, spread, len(written), len(errors), f'{elapsed:.2f}', f'{len(written) / elapsed:,.0f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--shards', default='1,2,4', help='Comma-separated shard counts to compare.')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--synchronous', default='FULL', choices=['OFF', 'NORMAL', 'FULL'])
+    args = parser.parse_args()
+
+    rows = [run(int(count), args) for count in args.shards.split(',')]
+    report(rows, ('shards', 'writers per shard', 'written', 'errors', 'seconds', 'writes/sec'))
+
+
+if __name__ == '__main__':
+    main()
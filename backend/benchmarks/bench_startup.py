@@ -0,0 +1,82 @@
+"""Worker startup time: cold import, create_app and the first request.
+
+Every sample runs in a fresh interpreter against an already migrated
+SQLite file. The ``boot-time`` mode turns the old behaviour back on: eager
+blueprint imports and a migration check on every boot. ``default`` is the
+shipped configuration. Timings are medians in milliseconds. The process
+exits non-zero if the default total exceeds ``--budget-ms``, so CI can
+track it.
+
+    python -m benchmarks.bench_startup [--runs 10] [--budget-ms 0]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from .common import report
+
+CHILD = '''
+import json, sys, time
+began = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+# Only the route modules may load these; with lazy blueprints that is the first request
+boot = [name for name in ('dateutil', 'marshmallow') if name in sys.modules]
+# Routed through a blueprint without running a password KDF
+status = app.test_client().get('/api/auth/login').status_code
+first = time.perf_counter()
+print(json.dumps({'import': imported - began, 'create_app': created - imported,
+                  'first request': first - created, 'status': status, 'boot': boot}))
+'''
+
+MODES = {
+    'boot-time': {'LAZY_BLUEPRINTS': 'false', 'AUTO_MIGRATE': 'true'},
+    'default': {},
+}
+PHASES = ('import', 'create_app', 'first request')
+
+
+def sample(env):
+    output = subprocess.run([sys.executable, '-c', CHILD], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=0, help='Fail above this total (0: never).')
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db', prefix='bench-')
+    os.close(fd)
+    base = {**os.environ, 'DATABASE_URL': f'sqlite:///{path}'}
+    subprocess.run([sys.executable, '-c', 'from app import create_app; create_app()'],
+                   env={**base, 'AUTO_MIGRATE': 'true'}, check=True, capture_output=True)
+
+    rows = []
+    totals = {}
+    for mode, overrides in MODES.items():
+        env = {**base, **overrides}
+        samples = [sample(env) for _ in range(args.runs)]
+        assert all(result['status'] == 405 for result in samples), samples
+        if mode == 'default':
+            assert not any(result['boot'] for result in samples), samples[0]['boot']
+        medians = [statistics.median(result[phase] for result in samples) * 1000 for phase in PHASES]
+        totals[mode] = sum(medians)
+        rows.append((mode, *(f'{value:.1f}' for value in medians), f'{totals[mode]:.1f}'))
+    os.unlink(path)
+
+    report(rows, ('mode', *(f'{phase} ms' for phase in PHASES), 'total ms'))
+    if args.budget_ms and totals['default'] > args.budget_ms:
+        raise SystemExit(f'Startup took {totals["default"]:.1f} ms, budget is {args.budget_ms:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Write throughput of POST /api/transactions/, per-request commit vs. the group-commit queue.
+
+Each mode gets a fresh SQLite file with the production pragmas.
+``--synchronous FULL`` makes every commit fsync, like the rollback journal
+the app used to run on.
+
+    python -m benchmarks.bench_writes [--requests 2000] [--concurrency 16] [--synchronous NORMAL]
+"""
+import argparse
+import threading
+import time
+
+from app.config import Config
+from app.database import install_engine_events
+from app.migrations import upgrade
+from app.models import db, Transaction
+from app.routes.transactions import transaction_bp
+from app.write_queue import init_write_queue
+from .common import make_app, create_user, auth_headers, report
+
+PAYLOAD = {'amount': 12.5, 'description': 'coffee shop', 'category': 'food', 'transaction_type': 'expense'}
+
+
+def run(mode, args):
+    app = make_app(blueprints=[(transaction_bp, '/api/transactions')])
+    app.config['SQLITE_PRAGMAS'] = {**Config.SQLITE_PRAGMAS, 'synchronous': args.synchronous}
+    app.config['WRITE_QUEUE_ENABLED'] = mode == 'group commit'
+    app.config['WRITE_QUEUE_MAX_BATCH'] = args.max_batch
+    app.config['WRITE_QUEUE_MAX_WAIT_MS'] = args.max_wait_ms
+    install_engine_events(app, db)
+    write_queue = init_write_queue(app)
+
+    with app.app_context():
+        db.engine.dispose()
+        upgrade(db.engine)
+        headers = auth_headers(create_user().id)
+
+    errors = []
+    ids = []
+
+    def worker(count):
+        client = app.test_client()
+        for _ in range(count):
+            response = client.post('/api/transactions/', json=PAYLOAD, headers=headers)
+            if response.status_code == 201:
+                ids.append(response.get_json()['id'])
+            else:
+                errors.append(response.status_code)
+
+    share = args.requests // args.concurrency
+    threads = [threading.Thread(target=worker, args=(share,)) for _ in range(args.concurrency)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    with app.app_context():
+        stored = Transaction.query.count()
+    batches = '-'
+    if write_queue is not None:
+        write_queue.close()
+        batches = f'{write_queue.operations / max(1, write_queue.batches):.1f}'
+    assert len(set(ids)) == len(ids) == stored, (len(ids), stored)
+    return (mode, len(ids), len(errors), f'{elapsed:.2f}', f'{len(ids) / elapsed:,.0f}', batches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--synchronous', default='NORMAL', choices=['OFF', 'NORMAL', 'FULL'])
+    parser.add_argument('--max-batch', type=int, default=100)
+    parser.add_argument('--max-wait-ms', type=float, default=5)
+    args = parser.parse_args()
+
+    rows = [run(mode, args) for mode in ('per-request commit', 'group commit')]
+    report(rows, ('mode', 'written', 'errors', 'seconds', 'writes/sec', 'ops/batch'))
+
+
+if __name__ == '__main__':
+    main()
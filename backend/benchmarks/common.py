@@ -0,0 +1,110 @@
+"""Shared helpers for the benchmark scripts.
+
+Run benchmarks from the backend directory, e.g. ``python -m benchmarks.bench_aggregates``.
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+from app.database import configure_database
+from app.models import db, User, Transaction
+
+CATEGORIES = [
+    'food', 'transport', 'utilities', 'entertainment',
+    'healthcare', 'shopping', 'housing', 'other'
+]
+
+
+def make_app(database_uri=None, blueprints=(), config=None):
+    """Minimal app bound to a throwaway SQLite file unless a URI is given
+
+    ``config`` is applied before the engines are created, e.g. SHARD_URIS.
+    """
+    if database_uri is None:
+        fd, path = tempfile.mkstemp(suffix='.db', prefix='bench-')
+        os.close(fd)
+        database_uri = f'sqlite:///{path}'
+
+    app = Flask('benchmarks')
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['JWT_SECRET_KEY'] = 'benchmark-secret-key-of-at-least-32-bytes'
+    app.config.update(config or {})
+    configure_database(app)
+    db.init_app(app)
+    JWTManager(app)
+
+    for blueprint, prefix in blueprints:
+        app.register_blueprint(blueprint, url_prefix=prefix)
+
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def create_user(name='bench'):
+    user = User(username=name, email=f'{name}@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def auth_headers(user_id):
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+
+def insert_transactions(user_id, count, chunk_size=10000, start=None, days=3 * 365, seed=0):
+    """Insert ``count`` random transactions through Core executemany"""
+    rng = random.Random(seed)
+    start = start or datetime(2020, 1, 1)
+    table = Transaction.__table__
+    rows = []
+    for _ in range(count):
+        rows.append({
+            'user_id': user_id,
+            'amount': round(rng.uniform(1, 500), 2),
+            'description': f'txn {rng.randrange(1000)}',
+            'category': rng.choice(CATEGORIES),
+            'transaction_type': 'income' if rng.random() < 0.2 else 'expense',
+            'date': start + timedelta(seconds=rng.randrange(days * 86400)),
+            'is_recurring': False,
+            'recurring_interval': None
+        })
+        if len(rows) == chunk_size:
+            db.session.execute(table.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(table.insert(), rows)
+    db.session.commit()
+
+
+def measure(fn, repeat=20):
+    """Run ``fn`` ``repeat`` times and return (median_ms, p95_ms)"""
+    samples = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - began) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not samples:
+        return 0.0
+    return samples[max(0, min(len(samples) - 1, int(round(pct / 100 * len(samples))) - 1))]
+
+
+def report(rows, headers):
+    """Print rows as a fixed-width table"""
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print('  '.join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print('  '.join(str(c).ljust(w) for c, w in zip(row, widths)))
@@ -0,0 +1,214 @@
+"""Generate synthetic users, transactions, recurring rules and budget goals.
+
+    python seed.py [--users 100] [--transactions 10000] [--days 730] [--seed 0]
+
+``--transactions`` is one-off transactions per user. Each user also gets a
+few recurring templates (salary, rent, bills, subscriptions) whose history
+is materialized by the normal recurrence scheduler. Rows are written
+with Core executemany in chunks, and rollups are rebuilt once at the end.
+Every seeded user's password is ``password``.
+"""
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from werkzeug.security import generate_password_hash
+
+from app.models import db, User, Transaction, BudgetGoal
+from app.recurrence import create_rules, materialize_due
+from app.rollups import rebuild_rollups
+
+PASSWORD = 'password'
+
+# category: (weight, median amount, log-normal sigma, descriptions)
+SPENDING = {
+    'food': (35, 18, 0.6, ['grocery store', 'coffee shop', 'restaurant', 'bakery', 'takeaway']),
+    'transport': (15, 12, 0.7, ['bus ticket', 'train fare', 'taxi', 'fuel', 'parking']),
+    'shopping': (15, 45, 0.9, ['clothing', 'electronics', 'bookshop', 'online order', 'home goods']),
+    'entertainment': (12, 25, 0.8, ['cinema', 'concert', 'bar', 'video game', 'museum']),
+    'utilities': (5, 80, 0.4, ['water bill', 'internet', 'gas bill']),
+    'healthcare': (4, 60, 1.0, ['pharmacy', 'dentist', 'doctor visit', 'optician']),
+    'housing': (2, 300, 0.8, ['furniture', 'repairs', 'cleaning']),
+    'other': (12, 30, 1.0, ['gift', 'donation', 'haircut', 'bank fee', 'misc']),
+}
+CATEGORY_WEIGHTS = [weight for weight, _, _, _ in SPENDING.values()]
+INCOME_SHARE = 0.08
+
+# (probability, description, category, type, interval, low, high)
+RECURRING = [
+    (0.95, 'salary', 'other', 'income', 'monthly', 1800, 6500),
+    (0.70, 'rent', 'housing', 'expense', 'monthly', 600, 2200),
+    (0.90, 'electricity', 'utilities', 'expense', 'monthly', 40, 160),
+    (0.80, 'phone plan', 'utilities', 'expense', 'monthly', 10, 60),
+    (0.60, 'streaming subscription', 'entertainment', 'expense', 'monthly', 8, 20),
+    (0.35, 'gym membership', 'healthcare', 'expense', 'monthly', 20, 70),
+    (0.25, 'grocery delivery', 'food', 'expense', 'weekly', 40, 120),
+    (0.30, 'insurance', 'other', 'expense', 'yearly', 200, 900),
+]
+
+BUDGET_CATEGORIES = ['food', 'shopping', 'entertainment', 'transport', None]
+
+
+def _amount(rng, median, sigma):
+    return max(0.01, round(median * math.exp(rng.gauss(0, sigma)), 2))
+
+
+def _date(rng, start, days):
+    """Random moment in the window, busier on weekends and in the evening"""
+    day = start + timedelta(days=rng.randrange(days))
+    if day.weekday() < 5 and rng.random() < 0.3:
+        day = start + timedelta(days=rng.randrange(days))
+    hour = min(23, max(6, int(rng.gauss(15, 4))))
+    return day.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60))
+
+
+def _flush(table, rows):
+    if rows:
+        db.session.execute(table.insert(), rows)
+    return []
+
+
+def create_users(count, prefix='seed'):
+    """Insert ``count`` users sharing one password hash; returns their ids"""
+    offset = db.session.query(func.max(User.id)).scalar() or 0
+    password_hash = generate_password_hash(PASSWORD)
+    now = datetime.utcnow()
+    table = User.__table__
+    rows = [
+        {
+            'username': f'{prefix}{offset + n}',
+            'email': f'{prefix}{offset + n}@example.com',
+            'password_hash': password_hash,
+            'created_at': now
+        }
+        for n in range(1, count + 1)
+    ]
+    return db.session.execute(
+        table.insert().returning(table.c.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+
+
+def one_off_transactions(rng, user_id, count, start, days):
+    """Yield one user's non-recurring transaction rows"""
+    categories = list(SPENDING)
+    for _ in range(count):
+        if rng.random() < INCOME_SHARE:
+            category, transaction_type = 'other', 'income'
+            amount = _amount(rng, 200, 1.0)
+            description = rng.choice(['refund', 'freelance', 'sold item', 'bonus'])
+        else:
+            category = rng.choices(categories, CATEGORY_WEIGHTS)[0]
+            _, median, sigma, descriptions = SPENDING[category]
+            transaction_type = 'expense'
+            amount = _amount(rng, median, sigma)
+            description = rng.choice(descriptions)
+        yield {
+            'user_id': user_id,
+            'amount': amount,
+            'description': description,
+            'category': category,
+            'transaction_type': transaction_type,
+            'date': _date(rng, start, days),
+            'is_recurring': False,
+            'recurring_interval': None
+        }
+
+
+def recurring_seeds(rng, user_id, start):
+    """First occurrence of each recurring template this user has"""
+    seeds = []
+    for probability, description, category, transaction_type, interval, low, high in RECURRING:
+        if rng.random() >= probability:
+            continue
+        anchor = start + timedelta(days=rng.randrange(28 if interval != 'weekly' else 7))
+        seeds.append({
+            'user_id': user_id,
+            'amount': round(rng.uniform(low, high), 2),
+            'description': description,
+            'category': category,
+            'transaction_type': transaction_type,
+            'date': anchor.replace(hour=9),
+            'is_recurring': True,
+            'recurring_interval': interval
+        })
+    return seeds
+
+
+def budget_goals(rng, user_id, start):
+    return [
+        {
+            'user_id': user_id,
+            'category': category,
+            'amount': round(rng.uniform(100, 800) if category else rng.uniform(1500, 4000), 2),
+            'period': 'monthly',
+            'start_date': start
+        }
+        for category in rng.sample(BUDGET_CATEGORIES, rng.randint(1, 3))
+    ]
+
+
+def seed_database(users=100, transactions=10000, days=730, seed=0, chunk_size=10000, end=None):
+    """Populate the bound database; returns a dict of row counts"""
+    rng = random.Random(seed)
+    end = end or datetime.utcnow().replace(microsecond=0)
+    start = (end - timedelta(days=days)).replace(hour=0, minute=0, second=0)
+    table = Transaction.__table__
+
+    user_ids = create_users(users)
+    db.session.commit()
+
+    rows, goals, seeds = [], [], []
+    for user_id in user_ids:
+        for row in one_off_transactions(rng, user_id, transactions, start, days):
+            rows.append(row)
+            if len(rows) == chunk_size:
+                rows = _flush(table, rows)
+                db.session.commit()
+        seeds.extend(recurring_seeds(rng, user_id, start))
+        goals.extend(budget_goals(rng, user_id, start))
+    _flush(table, rows)
+    _flush(BudgetGoal.__table__, goals)
+
+    seed_ids = db.session.execute(
+        table.insert().returning(table.c.id, sort_by_parameter_order=True), seeds
+    ).scalars().all() if seeds else []
+    for row, id in zip(seeds, seed_ids):
+        row['id'] = id
+    create_rules(seeds)
+    db.session.commit()
+
+    _, occurrences = materialize_due(end)
+    rebuild_rollups()
+    return {
+        'users': len(user_ids),
+        'transactions': len(user_ids) * transactions + len(seeds) + occurrences,
+        'recurring_rules': len(seeds),
+        'budget_goals': len(goals)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--transactions', type=int, default=10000, help='One-off transactions per user.')
+    parser.add_argument('--days', type=int, default=730, help='History length ending today.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed, for reproducible data.')
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.migrations import upgrade
+    app = create_app()
+    with app.app_context():
+        upgrade(db.engine)
+        began = time.perf_counter()
+        counts = seed_database(args.users, args.transactions, args.days, args.seed, args.chunk_size)
+        elapsed = time.perf_counter() - began
+    print(', '.join(f'{count} {name}' for name, count in counts.items()) + f' in {elapsed:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
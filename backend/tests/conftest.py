@@ -0,0 +1,59 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.config import TestingConfig
+from app.models import db, User
+
+PAYLOAD = {'amount': 10, 'description': 'lunch', 'category': 'food', 'transaction_type': 'expense'}
+
+
+@pytest.fixture
+def make_app(monkeypatch, tmp_path):
+    """create_app('testing') on a fresh SQLite file, with TestingConfig settings overridden"""
+    def factory(**settings):
+        settings.setdefault('SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path / "app.db"}')
+        settings.setdefault('JWT_SECRET_KEY', 'test-secret-key-of-at-least-32-bytes')
+        for name, value in settings.items():
+            monkeypatch.setattr(TestingConfig, name, value, raising=False)
+        return create_app('testing')
+    return factory
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def create_user(app, name='alice'):
+    with app.app_context():
+        user = User(username=name, email=f'{name}@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def auth_headers(app, user_id):
+    with app.app_context():
+        return {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+
+def add(client, headers, **fields):
+    """POST PAYLOAD with ``fields`` overridden and return the new transaction's id"""
+    response = client.post('/api/transactions/', json={**PAYLOAD, **fields}, headers=headers)
+    assert response.status_code == 201, response.get_data(as_text=True)
+    return response.get_json()['id']
+
+
+@pytest.fixture
+def user_id(app):
+    return create_user(app)
+
+
+@pytest.fixture
+def headers(app, user_id):
+    return auth_headers(app, user_id)
@@ -0,0 +1,54 @@
+import random
+from datetime import date, timedelta
+import pytest
+from app.analytics import History, _numpy_figures, _python_figures, compute_analytics
+from app.models import VALID_CATEGORIES
+
+AS_OF = date(2024, 5, 17)
+
+
+def make_history(seed, count=2000):
+    rng = random.Random(seed)
+    rows = []
+    for id in range(1, count + 1):
+        # A few rows in the future or outside every look-back, and some unknown categories
+        when = AS_OF - timedelta(days=rng.randint(-5, 420))
+        amount = round(rng.lognormvariate(3, 0.6), 2)
+        if rng.random() < 0.01:
+            amount *= 40
+        category = rng.choice(VALID_CATEGORIES + ['unlisted'])
+        rows.append((id, when, amount, category, rng.choice(['income', 'expense', 'expense', 'transfer'])))
+    rows.sort(key=lambda row: (row[1], row[0]))
+    return History(rows)
+
+
+def assert_same_figures(expected, actual):
+    assert actual['rolling'] == pytest.approx(expected['rolling'])
+    assert actual['average_30d'] == pytest.approx(expected['average_30d'])
+    assert actual['income'] == pytest.approx(expected['income'])
+    assert actual['expense'] == pytest.approx(expected['expense'])
+    assert sorted(actual['percentiles']) == sorted(expected['percentiles'])
+    for category, figures in expected['percentiles'].items():
+        assert actual['percentiles'][category] == pytest.approx(figures)
+    assert sorted(actual['anomalies']) == pytest.approx(sorted(expected['anomalies']))
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_numpy_engine_matches_python_engine(seed):
+    pytest.importorskip('numpy')
+    history = make_history(seed)
+    python = _python_figures(history, AS_OF)
+    assert python['anomalies'] and python['percentiles']
+    assert_same_figures(python, _numpy_figures(history, AS_OF))
+
+
+def test_engines_agree_on_an_empty_history():
+    pytest.importorskip('numpy')
+    assert_same_figures(_python_figures(History(), AS_OF), _numpy_figures(History(), AS_OF))
+
+
+def test_python_engine_builds_the_document():
+    document = compute_analytics(make_history(1), AS_OF, engine='python')
+    assert len(document['monthly']) == 12
+    assert len(document['rolling_average']['daily_spend']) == 90
+    assert document['anomalies'] and all(item['score'] > 3.5 for item in document['anomalies'])
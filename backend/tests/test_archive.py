@@ -0,0 +1,67 @@
+from datetime import datetime
+from app.archive import archive_transactions
+from app.models import db, Transaction, TransactionArchive
+from tests.conftest import add
+
+
+def backdate(app, *ids):
+    with app.app_context():
+        db.session.execute(
+            Transaction.__table__.update().where(Transaction.id.in_(ids)).values(date=datetime(2015, 3, 1))
+        )
+        db.session.commit()
+
+
+def test_archived_ids_are_not_reused(app, client, headers):
+    old = [add(client, headers), add(client, headers)]
+    newest = add(client, headers)
+    backdate(app, *old)
+    with app.app_context():
+        assert archive_transactions(keep_years=2) == 2
+
+    assert client.delete(f'/api/transactions/{newest}', headers=headers).status_code == 200
+    fresh = add(client, headers)
+    assert fresh not in old + [newest]
+
+    ids = [row['id'] for row in client.get('/api/transactions/?per_page=50', headers=headers).get_json()['transactions']]
+    assert sorted(ids) == sorted(old + [fresh])
+
+    response = client.put(f'/api/transactions/{old[0]}', json={'amount': 25}, headers=headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    with app.app_context():
+        assert db.session.get(TransactionArchive, old[0]) is None
+        assert db.session.get(Transaction, old[0]).amount == 25
+
+
+def test_archive_moves_every_old_row(app, client, headers):
+    ids = [add(client, headers) for _ in range(3)]
+    backdate(app, *ids)
+    with app.app_context():
+        assert archive_transactions(keep_years=2) == 3
+        assert db.session.query(Transaction).count() == 0
+    listed = client.get('/api/transactions/?per_page=50', headers=headers).get_json()['transactions']
+    assert sorted(row['id'] for row in listed) == ids
+
+
+def search_ids(client, headers, query=''):
+    response = client.get(f'/api/transactions/search?q=rent{query}', headers=headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return sorted(row['id'] for row in response.get_json())
+
+
+def test_search_covers_archived_transactions(app, client, headers):
+    archived = add(client, headers, description='rent march')
+    hot = add(client, headers, description='rent october')
+    add(client, headers, description='groceries')
+    backdate(app, archived)
+    with app.app_context():
+        assert archive_transactions(keep_years=2) == 1
+
+    assert search_ids(client, headers) == [archived, hot]
+    assert search_ids(client, headers, '&start_date=2010-01-01') == [archived, hot]
+    this_year = datetime.utcnow().strftime('%Y-01-01')
+    assert search_ids(client, headers, f'&start_date={this_year}') == [hot]
+
+    # Restoring moves the row between tables without duplicating it in the index
+    assert client.put(f'/api/transactions/{archived}', json={'amount': 11}, headers=headers).status_code == 200
+    assert search_ids(client, headers) == [archived, hot]
@@ -0,0 +1,50 @@
+import logging
+import pytest
+from app.models import db, Transaction
+from app.routes import batch as batch_route
+from tests.conftest import PAYLOAD
+
+CREATE = {'method': 'POST', 'resource': 'transactions', 'body': PAYLOAD}
+
+
+def transaction_count(app):
+    with app.app_context():
+        return db.session.query(Transaction).count()
+
+
+@pytest.fixture
+def failing_update(monkeypatch):
+    def update(user_id, id, data):
+        raise RuntimeError('connection to 10.0.0.5 refused')
+    schema, partial, _, status, message = batch_route.OPERATIONS[('transactions', 'PUT')]
+    monkeypatch.setitem(batch_route.OPERATIONS, ('transactions', 'PUT'), (schema, partial, update, status, message))
+
+
+@pytest.mark.parametrize('atomic', ['false', 0, 1, None, []])
+def test_atomic_must_be_a_boolean(app, client, headers, atomic):
+    response = client.post('/api/batch', json={'atomic': atomic, 'operations': [CREATE]}, headers=headers)
+    assert response.status_code == 400
+    assert transaction_count(app) == 0
+
+
+def test_unexpected_errors_are_logged_not_returned(app, client, headers, failing_update, caplog):
+    operations = [CREATE, {'method': 'PUT', 'resource': 'transactions', 'id': 1, 'body': {'amount': 5}}, CREATE]
+    with caplog.at_level(logging.ERROR, logger=batch_route.logger.name):
+        response = client.post('/api/batch', json={'atomic': False, 'operations': operations}, headers=headers)
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['status'] for result in results] == [201, 500, 201]
+    assert results[1]['body'] == {'error': 'Internal Server Error'}
+    assert '10.0.0.5' not in response.get_data(as_text=True)
+    assert '10.0.0.5' in caplog.text
+    assert transaction_count(app) == 2
+
+
+def test_unexpected_error_rolls_back_an_atomic_batch(app, client, headers, failing_update):
+    operations = [CREATE, {'method': 'PUT', 'resource': 'transactions', 'id': 1, 'body': {'amount': 5}}]
+    response = client.post('/api/batch', json={'atomic': True, 'operations': operations}, headers=headers)
+
+    assert response.status_code == 409
+    assert [result['status'] for result in response.get_json()['results']] == [201, 500]
+    assert transaction_count(app) == 0
@@ -0,0 +1,113 @@
+import sqlite3
+from datetime import datetime
+import pytest
+from sqlalchemy import event
+from app.archive import archive_transactions
+from app.budgets import current_spend, evaluate_goals
+from app.models import db, BudgetGoal, BudgetSpend, Transaction
+
+EXPENSE = {'amount': 30, 'description': 'groceries', 'category': 'food', 'transaction_type': 'expense'}
+WRITES = ('INSERT', 'UPDATE', 'DELETE', 'CREATE', 'DROP')
+
+
+@pytest.fixture
+def app(make_app):
+    # A write waiting on the lock below would fail fast instead of hanging the test
+    return make_app(SQLITE_PRAGMAS={'journal_mode': 'WAL', 'busy_timeout': 100})
+
+
+def add_goal(client, headers, **fields):
+    goal = {'amount': 50, 'category': 'food', 'start_date': datetime.utcnow().strftime('%Y-%m-01'), **fields}
+    response = client.post('/api/budget-goals/', json=goal, headers=headers)
+    assert response.status_code == 201, response.get_data(as_text=True)
+    return response.get_json()['id']
+
+
+def expire_counters(app):
+    """Move every stored counter into a window that has already ended"""
+    with app.app_context():
+        BudgetSpend.query.update({'window_start': datetime(2000, 1, 1), 'window_end': datetime(2000, 2, 1),
+                                  'spent': 999.0})
+        db.session.commit()
+
+
+def goals(client, headers):
+    response = client.get('/api/budget-goals/', headers=headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return {goal['id']: goal for goal in response.get_json()['budget_goals']}
+
+
+def test_goal_writes_store_counters(app, client, headers):
+    assert client.post('/api/transactions/', json=EXPENSE, headers=headers).status_code == 201
+    goal_id = add_goal(client, headers)
+    with app.app_context():
+        assert db.session.get(BudgetSpend, goal_id).spent == 30
+
+    assert client.put(f'/api/budget-goals/{goal_id}', json={'category': 'transport'}, headers=headers).status_code == 200
+    with app.app_context():
+        assert db.session.get(BudgetSpend, goal_id).spent == 0
+
+
+def test_stale_counters_are_recomputed_without_writing(app, client, headers):
+    assert client.post('/api/transactions/', json=EXPENSE, headers=headers).status_code == 201
+    food = add_goal(client, headers, amount=35)
+    everything = add_goal(client, headers, category=None, period='yearly',
+                          start_date=datetime.utcnow().strftime('%Y-01-01'))
+    expire_counters(app)
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        listed = goals(client, headers)
+        alerts = client.get('/api/budget-goals/alerts', headers=headers).get_json()['alerts']
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+    assert listed[food]['spent'] == 30 and listed[everything]['spent'] == 30
+    assert [alert['id'] for alert in alerts] == [food]
+    assert not [statement for statement in statements if statement.lstrip().upper().startswith(WRITES)]
+    with app.app_context():
+        assert db.session.get(BudgetSpend, food).spent == 999
+
+
+def test_budget_reads_succeed_while_another_writer_holds_the_lock(app, client, headers, tmp_path):
+    add_goal(client, headers)
+    expire_counters(app)
+
+    writer = sqlite3.connect(tmp_path / 'app.db')
+    writer.execute('BEGIN IMMEDIATE')
+    try:
+        for url in ('/api/budget-goals/', '/api/budget-goals/alerts'):
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, (url, response.get_data(as_text=True))
+    finally:
+        writer.rollback()
+        writer.close()
+
+
+def test_counters_follow_transaction_writes(app, client, headers):
+    goal_id = add_goal(client, headers)
+    response = client.post('/api/transactions/', json=EXPENSE, headers=headers)
+    assert goals(client, headers)[goal_id]['spent'] == 30
+
+    assert client.delete(f'/api/transactions/{response.get_json()["id"]}', headers=headers).status_code == 200
+    assert goals(client, headers)[goal_id]['spent'] == 0
+
+
+def test_spend_includes_archived_transactions(app, client, headers):
+    as_of = datetime(2025, 3, 15)
+    goal_id = add_goal(client, headers, category=None, period='yearly', start_date='2024-07-01')
+    ids = [client.post('/api/transactions/', json=EXPENSE, headers=headers).get_json()['id'] for _ in range(3)]
+    with app.app_context():
+        for id, date in zip(ids, (datetime(2024, 6, 1), datetime(2024, 9, 1), datetime(2025, 2, 1))):
+            db.session.execute(Transaction.__table__.update().where(Transaction.id == id).values(date=date))
+        db.session.commit()
+        # ARCHIVE_KEEP_YEARS=0 archives 2024, half of this yearly window
+        assert archive_transactions(keep_years=0, now=as_of) == 2
+
+        goal = db.session.get(BudgetGoal, goal_id)
+        assert current_spend([goal], as_of) == {goal_id: 60}
+        assert evaluate_goals([goal], as_of) == {goal_id: 60}
@@ -0,0 +1,112 @@
+import json
+from datetime import datetime, timedelta
+import pytest
+from app.archive import archive_transactions
+from app.models import db, Transaction
+from app.recurrence import materialize_due
+from tests.conftest import PAYLOAD, add
+
+CACHED_VIEWS = [
+    '/api/transactions/summary',
+    '/api/transactions/category-summary',
+    '/api/transactions/statistics?period=year',
+    '/api/transactions/timeseries',
+    '/api/transactions/categories',
+    '/api/transactions/report',
+    '/api/dashboard/',
+]
+
+
+def warm(client, headers):
+    """{url: ETag} for every cached view, after reading each one twice"""
+    etags = {}
+    for url in CACHED_VIEWS:
+        first = client.get(url, headers=headers)
+        assert first.status_code == 200, (url, first.get_data(as_text=True))
+        second = client.get(url, headers=headers)
+        assert second.get_data() == first.get_data() and second.get_etag() == first.get_etag()
+        etags[url] = first.get_etag()[0]
+    return etags
+
+
+def transaction_count(client, headers):
+    return client.get('/api/transactions/report', headers=headers).get_json()['summary']['transaction_count']
+
+
+def create(app, client, headers):
+    yield
+    add(client, headers)
+
+
+def update(app, client, headers):
+    id = add(client, headers)
+    yield
+    assert client.put(f'/api/transactions/{id}', json={'category': 'transport'}, headers=headers).status_code == 200
+
+
+def delete(app, client, headers):
+    id = add(client, headers)
+    yield
+    assert client.delete(f'/api/transactions/{id}', headers=headers).status_code == 200
+
+
+def bulk_import(app, client, headers):
+    yield
+    response = client.post('/api/transactions/bulk', data=json.dumps([PAYLOAD, PAYLOAD]),
+                           content_type='application/json', headers=headers)
+    assert response.status_code == 201, response.get_data(as_text=True)
+
+
+def batch(app, client, headers):
+    yield
+    operations = [{'method': 'POST', 'resource': 'transactions', 'body': PAYLOAD}]
+    response = client.post('/api/batch', json={'operations': operations}, headers=headers)
+    assert response.status_code == 200 and response.get_json()['committed']
+
+
+def recurrence(app, client, headers):
+    add(client, headers, is_recurring=True, recurring_interval='daily')
+    yield
+    with app.app_context():
+        assert materialize_due(horizon=datetime.utcnow() + timedelta(days=3))[1] > 0
+
+
+def archive(app, client, headers):
+    id = add(client, headers)
+    with app.app_context():
+        db.session.get(Transaction, id).date = datetime(2015, 3, 1)
+        db.session.commit()
+    yield
+    with app.app_context():
+        assert archive_transactions(keep_years=2) == 1
+
+
+# Each write does its setup, yields, then makes the write under test
+@pytest.mark.parametrize('write', [create, update, delete, bulk_import, batch, recurrence, archive])
+def test_writes_invalidate_every_cached_view(app, client, headers, write):
+    steps = write(app, client, headers)
+    next(steps)
+    before = warm(client, headers)
+    count = transaction_count(client, headers)
+
+    next(steps, None)
+    for url, etag in before.items():
+        response = client.get(url, headers={**headers, 'If-None-Match': etag})
+        assert response.status_code == 200, url
+        assert response.get_etag()[0] != etag, url
+
+    if write is delete:
+        assert transaction_count(client, headers) == count - 1
+    elif write is update:
+        summary = client.get('/api/transactions/category-summary', headers=headers).get_json()
+        assert summary.get('transport') == PAYLOAD['amount']
+    elif write is archive:
+        assert transaction_count(client, headers) == count
+    else:
+        assert transaction_count(client, headers) > count
+
+
+def test_unchanged_data_answers_not_modified(client, headers):
+    add(client, headers)
+    for url, etag in warm(client, headers).items():
+        assert client.get(url, headers={**headers, 'If-None-Match': etag}).status_code == 304, url
@@ -0,0 +1,71 @@
+from app.changes import prune_tombstones
+from tests.conftest import add
+
+
+def changes(client, headers, since=None, limit=None):
+    query = '&'.join(f'{name}={value}' for name, value in (('since', since), ('limit', limit)) if value)
+    response = client.get(f'/api/transactions/changes?{query}', headers=headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def ids(body):
+    return [row['id'] for row in body['transactions']]
+
+
+def test_deltas_carry_upserts_and_tombstones(client, headers):
+    kept, edited, removed = add(client, headers), add(client, headers), add(client, headers)
+    full = changes(client, headers)
+    assert ids(full) == [kept, edited, removed]
+    assert (full['deleted'], full['has_more'], full['reset']) == ([], False, False)
+
+    assert client.put(f'/api/transactions/{edited}', json={'amount': 99}, headers=headers).status_code == 200
+    assert client.delete(f'/api/transactions/{removed}', headers=headers).status_code == 200
+    added = add(client, headers)
+
+    delta = changes(client, headers, full['next'])
+    assert ids(delta) == [edited, added]
+    assert delta['transactions'][0]['amount'] == 99
+    assert delta['deleted'] == [removed]
+    assert not delta['reset']
+
+    caught_up = changes(client, headers, delta['next'])
+    assert (ids(caught_up), caught_up['deleted']) == ([], [])
+
+    # A full sync starts from nothing, so it has no tombstones to report
+    assert changes(client, headers)['deleted'] == []
+
+
+def test_small_pages_cover_every_change_once(client, headers):
+    created = [add(client, headers) for _ in range(5)]
+    cursor = changes(client, headers)['next']
+    for id in created[:3]:
+        assert client.delete(f'/api/transactions/{id}', headers=headers).status_code == 200
+    fresh = add(client, headers)
+
+    upserts, deleted, more = [], [], True
+    while more:
+        body = changes(client, headers, cursor, limit=2)
+        upserts += ids(body)
+        deleted += body['deleted']
+        cursor, more = body['next'], body['has_more']
+    assert (upserts, deleted) == ([fresh], created[:3])
+
+
+def test_cursor_older_than_pruned_tombstones_gets_a_reset(app, client, headers):
+    kept, removed = add(client, headers), add(client, headers)
+    stale = changes(client, headers)['next']
+    assert client.delete(f'/api/transactions/{removed}', headers=headers).status_code == 200
+    with app.app_context():
+        assert prune_tombstones(older_than_days=-1) == 1
+
+    body = changes(client, headers, stale)
+    assert body['reset']
+    assert (ids(body), body['deleted']) == ([kept], [])
+
+    # The full resync's cursor is past the pruned deletes
+    assert not changes(client, headers, body['next'])['reset']
+
+
+def test_malformed_cursor_is_rejected(client, headers):
+    assert client.get('/api/transactions/changes?since=nope', headers=headers).status_code == 400
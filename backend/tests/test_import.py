@@ -0,0 +1,80 @@
+import io
+import json
+from datetime import datetime
+import pytest
+from app.importer import ImportFormatError, iter_json_records, validate_batch
+from app.models import db, Transaction
+
+ROW = {'amount': 12.5, 'description': 'taxi', 'category': 'transport', 'transaction_type': 'expense'}
+
+
+def bulk(client, headers, body, content_type='application/json'):
+    return client.post('/api/transactions/bulk', data=body, content_type=content_type, headers=headers)
+
+
+def test_offset_dates_are_stored_as_naive_utc(app, client, headers):
+    goal = {'amount': 100, 'category': 'transport', 'period': 'monthly'}
+    assert client.post('/api/budget-goals/', json=goal, headers=headers).status_code == 201
+    this_month = datetime.utcnow().strftime('%Y-%m-05')
+
+    rows = [{**ROW, 'date': f'{this_month}T23:30:00-02:00'}, {**ROW, 'date': f'{this_month}T08:00:00Z'}]
+    response = bulk(client, headers, json.dumps(rows))
+    assert response.status_code == 201, response.get_data(as_text=True)
+
+    with app.app_context():
+        dates = sorted(date for (date,) in db.session.query(Transaction.date))
+    day = datetime.fromisoformat(this_month)
+    assert dates == [day.replace(hour=8), day.replace(day=6, hour=1, minute=30)]
+
+    response = client.get('/api/budget-goals/', headers=headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+
+@pytest.mark.parametrize('read_size', [1, 3, 7, 65536])
+def test_json_array_is_read_incrementally(read_size):
+    records = [{**ROW, 'amount': 0.125 * n, 'description': f'"[{n}]", ok'} for n in range(20)] + [12345, None]
+    for body in (json.dumps(records), json.dumps(records, indent=2)):
+        assert list(iter_json_records(io.BytesIO(body.encode()), read_size)) == records
+
+
+def test_json_array_yields_records_before_the_end_of_the_body():
+    records = iter_json_records(io.BytesIO(b'[{"amount": 1}, {"amount": 2}, oops'), read_size=4)
+    assert next(records) == {'amount': 1}
+    assert next(records) == {'amount': 2}
+    with pytest.raises(ImportFormatError):
+        next(records)
+
+
+@pytest.mark.parametrize('body, message', [
+    ('', 'Invalid JSON'),
+    ('{"amount": 1}', 'Expected a list of transactions'),
+    ('[1 2]', 'Invalid JSON'),
+    ('[{"amount": 1},', 'Invalid JSON'),
+    ('[] []', 'Invalid JSON'),
+])
+def test_malformed_json_bodies_are_rejected(app, client, headers, body, message):
+    response = bulk(client, headers, body)
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith(message)
+    with app.app_context():
+        assert db.session.query(Transaction).count() == 0
+
+
+@pytest.mark.parametrize('amount, message', [
+    (True, 'Not a valid number.'),
+    ('Infinity', 'Special numeric values (nan or infinity) are not permitted.'),
+    (float('nan'), 'Special numeric values (nan or infinity) are not permitted.'),
+    ('1e400', 'Special numeric values (nan or infinity) are not permitted.'),
+])
+def test_amounts_are_checked_like_the_transaction_schema(amount, message):
+    rows, errors = validate_batch([{**ROW, 'amount': amount}, ROW], user_id=1, now=datetime.utcnow())
+    assert errors == {0: {'amount': [message]}}
+    assert len(rows) == 1
+
+
+def test_non_finite_csv_amounts_are_rejected(app, client, headers):
+    body = 'amount,description,category,transaction_type\ninf,taxi,transport,expense\n'
+    response = bulk(client, headers, body, content_type='text/csv')
+    assert response.status_code == 400, response.get_data(as_text=True)
+    with app.app_context():
+        assert db.session.query(Transaction).count() == 0
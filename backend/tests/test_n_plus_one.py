@@ -0,0 +1,60 @@
+import json
+import logging
+import pytest
+from app.metrics import NPlusOneError
+from app.models import db, User
+from tests.conftest import auth_headers, create_user
+
+READ_ROUTES = [
+    '/api/transactions/?per_page=50',
+    '/api/transactions/?mode=cursor&limit=50',
+    '/api/transactions/search?q=lunch',
+    '/api/transactions/changes',
+    '/api/transactions/report?start_date=2020-01-01&end_date=2030-12-31',
+    '/api/transactions/timeseries',
+    '/api/budget-goals/',
+    '/api/budget-goals/alerts',
+    '/api/dashboard/',
+]
+
+
+def repeated_reads():
+    for _ in range(5):
+        db.session.execute(db.select(User.id)).all()
+    return 'ok'
+
+
+@pytest.fixture
+def strict_app(make_app):
+    app = make_app(N_PLUS_ONE_DETECTION='raise', N_PLUS_ONE_THRESHOLD=5)
+    app.add_url_rule('/repeated', 'repeated', repeated_reads)
+    return app
+
+
+def test_repeated_statements_raise(strict_app):
+    with pytest.raises(NPlusOneError):
+        strict_app.test_client().get('/repeated')
+
+
+def test_suite_default_only_logs(make_app, caplog):
+    app = make_app(N_PLUS_ONE_THRESHOLD=5)
+    app.add_url_rule('/repeated', 'repeated', repeated_reads)
+    with caplog.at_level(logging.WARNING, logger='app.metrics'):
+        assert app.test_client().get('/repeated').status_code == 200
+    assert 'Possible N+1 query' in caplog.text
+
+
+def test_read_routes_do_not_repeat_statements(strict_app):
+    client = strict_app.test_client()
+    headers = auth_headers(strict_app, create_user(strict_app))
+    rows = [{'amount': 5 + n, 'description': f'lunch {n}', 'category': 'food', 'transaction_type': 'expense'}
+            for n in range(40)]
+    response = client.post('/api/transactions/bulk', data=json.dumps(rows),
+                           content_type='application/json', headers=headers)
+    assert response.status_code == 201, response.get_data(as_text=True)
+    for category in ('food', 'transport', None):
+        goal = {'amount': 100, 'category': category, 'period': 'monthly'}
+        assert client.post('/api/budget-goals/', json=goal, headers=headers).status_code == 201
+
+    for url in READ_ROUTES:
+        assert client.get(url, headers=headers).status_code == 200, url
@@ -0,0 +1,74 @@
+from datetime import datetime
+import pytest
+from app.models import db, Transaction
+from tests.conftest import add
+
+
+@pytest.fixture
+def ids(app, client, headers):
+    """Ids of seven transactions, newest first; two pairs share a date so the id breaks the tie"""
+    ids = [add(client, headers, category='food' if n % 2 else 'transport') for n in range(7)]
+    dates = [datetime(2024, 1, 1), datetime(2024, 3, 1), datetime(2024, 3, 1), datetime(2024, 2, 1),
+             datetime(2024, 5, 1), datetime(2024, 5, 1), datetime(2024, 4, 1)]
+    with app.app_context():
+        for id, date in zip(ids, dates):
+            db.session.execute(Transaction.__table__.update().where(Transaction.id == id).values(date=date))
+        db.session.commit()
+    return [id for _, id in sorted(zip(dates, ids), reverse=True)]
+
+
+def page(client, headers, url):
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    body = response.get_json()
+    return [row['id'] for row in body['transactions']], body
+
+
+def test_next_cursors_walk_every_row_once(client, headers, ids):
+    seen, pages = [], []
+    url = '/api/transactions/?mode=cursor&limit=3'
+    while url:
+        rows, body = page(client, headers, url)
+        seen.extend(rows)
+        pages.append(body)
+        url = body['next'] and f'/api/transactions/?mode=cursor&limit=3&cursor={body["next"]}'
+
+    assert seen == ids
+    assert [len(body['transactions']) for body in pages] == [3, 3, 1]
+    assert pages[0]['prev'] is None
+    assert 'total' not in pages[0]
+
+
+def test_prev_cursor_returns_the_page_before(client, headers, ids):
+    _, first = page(client, headers, '/api/transactions/?mode=cursor&limit=3')
+    second, body = page(client, headers, f'/api/transactions/?mode=cursor&limit=3&cursor={first["next"]}')
+    assert second == ids[3:6]
+
+    back, body = page(client, headers, f'/api/transactions/?mode=cursor&limit=3&cursor={body["prev"]}')
+    assert back == ids[:3]
+    assert body['prev'] is None
+    assert body['next'] == first['next']
+
+
+def test_cursor_mode_keeps_filters_and_counts_on_request(app, client, headers, ids):
+    rows, body = page(client, headers, '/api/transactions/?mode=cursor&limit=2&category=food&include_total=1')
+    with app.app_context():
+        food = {id for id, in db.session.query(Transaction.id).filter_by(category='food')}
+    assert rows == [id for id in ids if id in food][:2]
+    assert body['total'] == len(food)
+
+
+def test_page_and_per_page_still_work(client, headers, ids):
+    rows, body = page(client, headers, '/api/transactions/?page=2&per_page=3')
+    assert rows == ids[3:6]
+    assert (body['total'], body['pages'], body['current_page']) == (7, 3, 2)
+    assert 'next' not in body
+
+    # A cursor parameter switches to keyset paging, with per_page as the page size
+    rows, body = page(client, headers, '/api/transactions/?cursor=&per_page=3')
+    assert rows == ids[:3] and body['next']
+
+
+def test_malformed_cursor_is_rejected(client, headers, ids):
+    response = client.get('/api/transactions/?cursor=not-a-cursor', headers=headers)
+    assert response.status_code == 400
@@ -0,0 +1,155 @@
+"""Every read a route issues must seek an index rather than scan a whole table.
+
+Statements are captured from the engine while the test client calls each
+route, then explained on the same database with the same parameters.
+That is SQLite by default, or PostgreSQL when TEST_DATABASE_URL points
+at one (the tables are dropped again afterwards).
+"""
+import json
+import os
+import re
+from contextlib import contextmanager
+from datetime import datetime
+import pytest
+from sqlalchemy import event
+from app.archive import archive_transactions
+from app.models import db, Transaction
+
+# SQLite's EXPLAIN QUERY PLAN and PostgreSQL's EXPLAIN, respectively
+TABLE_SCAN = re.compile(r'^(?:SCAN|Seq Scan on) "?(\w+)"?')
+
+ROUTES = [
+    '/api/transactions/',
+    '/api/transactions/?category=food&transaction_type=expense&start_date=2024-01-01',
+    '/api/transactions/?start_date=2010-01-01',
+    '/api/transactions/?mode=cursor&limit=5&include_total=1',
+    '/api/transactions/?mode=cursor&limit=5&start_date=2010-01-01',
+    '/api/transactions/search?q=lunch',
+    '/api/transactions/search?q=lunch&start_date=2010-01-01',
+    '/api/transactions/search?limit=5',
+    '/api/transactions/changes',
+    '/api/transactions/summary',
+    '/api/transactions/category-summary',
+    '/api/transactions/statistics?period=year',
+    '/api/transactions/timeseries?start_date=2024-01-01&end_date=2024-12-31',
+    '/api/transactions/categories',
+    '/api/transactions/report',
+    '/api/transactions/report?start_date=2010-01-01&end_date=2030-12-31',
+    '/api/budget-goals/',
+    '/api/budget-goals/alerts',
+    '/api/dashboard/',
+]
+
+
+def seed(client, headers):
+    rows = [
+        {'amount': 5 + n, 'description': f'lunch {n}' if n % 2 else f'rent {n}',
+         'category': 'food' if n % 2 else 'housing', 'transaction_type': 'expense' if n % 3 else 'income',
+         'date': datetime(2015 + n % 11, 1 + n % 12, 1 + n % 28).isoformat()}
+        for n in range(40)
+    ]
+    response = client.post('/api/transactions/bulk', data=json.dumps(rows),
+                           content_type='application/json', headers=headers)
+    assert response.status_code == 201, response.get_data(as_text=True)
+    for goal in ({'amount': 100, 'category': 'food', 'period': 'monthly'}, {'amount': 900, 'period': 'yearly'}):
+        assert client.post('/api/budget-goals/', json=goal, headers=headers).status_code == 201
+
+
+@contextmanager
+def captured_reads(app):
+    """Collect (statement, parameters) for every SELECT run while the block is active"""
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def explain(app, statement, parameters):
+    with app.app_context():
+        with db.engine.connect() as connection:
+            if connection.dialect.name == 'postgresql':
+                # The seeded tables are tiny, so the planner would seq-scan them even
+                # with a usable index; this way a Seq Scan means there was none
+                connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+                rows = connection.exec_driver_sql(f'EXPLAIN {statement}', parameters).all()
+                return [row[0].strip().removeprefix('->').strip() for row in rows]
+            rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+    return [row[-1] for row in rows]
+
+
+def table_scans(plan):
+    """Plan lines scanning a whole model table
+
+    Scans of subquery output, per-request temp tables and the FTS index
+    (which answers MATCH through its own index) are not table scans.
+    """
+    return [line for line in plan
+            if (match := TABLE_SCAN.match(line)) and match.group(1) in db.metadata.tables]
+
+
+@pytest.fixture
+def app(make_app):
+    url = os.environ.get('TEST_DATABASE_URL', '')
+    if not url.startswith(('postgres://', 'postgresql')):
+        yield make_app()
+        return
+
+    app = make_app(SQLALCHEMY_DATABASE_URI=url)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('DROP SCHEMA public CASCADE')
+            connection.exec_driver_sql('CREATE SCHEMA public')
+
+
+@pytest.fixture
+def seeded(app, client, headers):
+    seed(client, headers)
+    with app.app_context():
+        assert archive_transactions(keep_years=2) > 0
+    return client
+
+
+@pytest.mark.parametrize('url', ROUTES)
+def test_route_reads_use_indexes(app, seeded, headers, url):
+    with captured_reads(app) as statements:
+        response = seeded.get(url, headers=headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert statements, 'the route issued no reads'
+
+    failures = {}
+    for statement, parameters in statements:
+        scans = table_scans(explain(app, statement, parameters))
+        if scans:
+            failures[statement] = scans
+    assert not failures
+
+
+def test_follow_up_pages_use_indexes(app, seeded, headers):
+    urls = []
+    for url in ('/api/transactions/?mode=cursor&limit=5', '/api/transactions/changes?limit=5'):
+        body = seeded.get(url, headers=headers).get_json()
+        urls.append(f'{url}&cursor={body["next"]}' if 'mode=cursor' in url else f'{url}&since={body["next"]}')
+    response = seeded.get('/api/transactions/search?q=lunch&limit=2', headers=headers)
+    urls.append(f'/api/transactions/search?q=lunch&limit=2&cursor={response.headers["X-Next-Cursor"]}')
+    with seeded.application.app_context():
+        newest = db.session.query(db.func.max(Transaction.id)).scalar()
+    urls.append(f'/api/transactions/{newest}')
+    urls.append('/api/transactions/1')
+
+    for url in urls:
+        with captured_reads(app) as statements:
+            response = seeded.get(url, headers=headers)
+        assert response.status_code == 200, (url, response.get_data(as_text=True))
+        for statement, parameters in statements:
+            assert not table_scans(explain(app, statement, parameters)), (url, statement)
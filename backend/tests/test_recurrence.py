@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+from app.models import db, RecurrenceRule, Transaction
+from app.recurrence import materialize_due
+from tests.conftest import add
+
+
+def rules(app):
+    with app.app_context():
+        return [(rule.source_transaction_id, rule.interval) for rule in RecurrenceRule.query.order_by(RecurrenceRule.id)]
+
+
+def materialize(app, days):
+    with app.app_context():
+        return materialize_due(datetime.utcnow() + timedelta(days=days))[1]
+
+
+def put(client, headers, id, **fields):
+    response = client.put(f'/api/transactions/{id}', json=fields, headers=headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+
+def test_update_that_makes_a_transaction_recurring_adds_a_rule(app, client, headers):
+    weekly, daily = add(client, headers), add(client, headers)
+    put(client, headers, weekly, is_recurring=True, recurring_interval='weekly')
+    # An interval alone is enough
+    put(client, headers, daily, recurring_interval='daily')
+
+    assert rules(app) == [(weekly, 'weekly'), (daily, 'daily')]
+    assert materialize(app, 14) == 2 + 14
+    assert client.get(f'/api/transactions/{daily}', headers=headers).get_json()['is_recurring'] is True
+
+
+def test_turning_recurrence_off_removes_the_rule(app, client, headers):
+    id = add(client, headers, is_recurring=True, recurring_interval='daily')
+    assert materialize(app, 3) == 3
+
+    put(client, headers, id, is_recurring=False)
+    assert rules(app) == []
+    assert materialize(app, 10) == 0
+    with app.app_context():
+        # Occurrences already created stay, without their rule
+        assert db.session.query(Transaction).count() == 4
+        assert db.session.query(Transaction).filter(Transaction.recurrence_rule_id.isnot(None)).count() == 0
+
+
+def test_changing_the_interval_replaces_the_rule(app, client, headers):
+    id = add(client, headers, is_recurring=True, recurring_interval='monthly')
+    put(client, headers, id, recurring_interval='daily')
+    assert rules(app) == [(id, 'daily')]
+    assert materialize(app, 5) == 5
+
+
+def test_updating_an_occurrence_does_not_seed_a_rule(app, client, headers):
+    seed = add(client, headers, is_recurring=True, recurring_interval='daily')
+    assert materialize(app, 1) == 1
+    with app.app_context():
+        occurrence = db.session.query(Transaction.id).filter(Transaction.id != seed).scalar()
+
+    put(client, headers, occurrence, amount=12, is_recurring=True)
+    assert rules(app) == [(seed, 'daily')]
@@ -0,0 +1,93 @@
+import sqlite3
+from contextlib import contextmanager
+import pytest
+from flask import g
+from sqlalchemy import event, select, update
+from app.database import REPLICA_BIND
+from app.models import db, BudgetGoal, Transaction, User
+from tests.conftest import PAYLOAD, add, auth_headers, create_user
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    return make_app(READ_REPLICA_URI=f'sqlite:///{tmp_path / "replica.db"}')
+
+
+def replicate(tmp_path):
+    """Bring the replica file up to date with the primary"""
+    primary = sqlite3.connect(tmp_path / 'app.db')
+    replica = sqlite3.connect(tmp_path / 'replica.db')
+    with replica:
+        primary.backup(replica)
+    primary.close()
+    replica.close()
+
+
+@contextmanager
+def statements_by_engine(app):
+    """{'primary': [...], 'replica': [...]} of the SQL run while the block is active"""
+    with app.app_context():
+        engines = {'primary': db.engine, 'replica': db.engines[REPLICA_BIND]}
+    seen = {name: [] for name in engines}
+    listeners = {}
+    for name, engine in engines.items():
+        listeners[name] = lambda *args, name=name: seen[name].append(args[2])
+        event.listen(engine, 'before_cursor_execute', listeners[name])
+    try:
+        yield seen
+    finally:
+        for name, engine in engines.items():
+            event.remove(engine, 'before_cursor_execute', listeners[name])
+
+
+@pytest.fixture
+def headers(app, client, tmp_path):
+    headers = auth_headers(app, create_user(app))
+    add(client, headers)
+    replicate(tmp_path)
+    return headers
+
+
+def test_get_reads_go_to_the_replica(app, client, headers):
+    # Only the primary has this row until the next replication
+    add(client, headers)
+
+    with statements_by_engine(app) as seen:
+        response = client.get('/api/transactions/', headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_json()['transactions']) == 1
+    assert seen['replica'] and not seen['primary']
+
+
+def test_writes_go_to_the_primary(app, client, headers):
+    with statements_by_engine(app) as seen:
+        response = client.post('/api/transactions/', json=PAYLOAD, headers=headers)
+    assert response.status_code == 201
+    assert seen['primary'] and not seen['replica']
+
+
+def test_reads_after_a_write_in_the_same_request_go_to_the_primary(app, headers):
+    with app.test_request_context('/api/transactions/', method='GET'):
+        user_id = db.session.execute(select(User.id)).scalar()
+        with statements_by_engine(app) as seen:
+            db.session.execute(update(User).where(User.id == user_id).values(email='new@example.com'))
+            email = db.session.execute(select(User.email).where(User.id == user_id)).scalar()
+            count = db.session.query(Transaction).count()
+        db.session.rollback()
+    assert email == 'new@example.com' and count == 1
+    assert len(seen['primary']) == 3 and not seen['replica']
+
+
+def test_use_primary_views_never_touch_the_replica(app, client, headers):
+    response = client.post('/api/budget-goals/', json={'amount': 50, 'category': 'food'}, headers=headers)
+    goal_id = response.get_json()['id']
+
+    for url in ('/api/budget-goals/', f'/api/budget-goals/{goal_id}', '/api/budget-goals/alerts'):
+        with statements_by_engine(app) as seen:
+            response = client.get(url, headers=headers)
+        assert response.status_code == 200, url
+        assert seen['primary'] and not seen['replica'], url
+
+    with app.test_request_context('/api/budget-goals/', method='GET'):
+        g.use_primary = True
+        assert db.session.get_bind(clause=select(BudgetGoal)) is db.engine
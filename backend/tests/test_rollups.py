@@ -0,0 +1,44 @@
+from app.models import db, MonthlyRollup
+from app.rollups import verify_rollups
+from tests.conftest import add
+
+
+def assert_consistent(app):
+    with app.app_context():
+        assert verify_rollups() == []
+
+
+def totals(client, headers):
+    by_category = client.get('/api/transactions/category-summary', headers=headers).get_json()
+    month = client.get('/api/transactions/summary', headers=headers).get_json()
+    return by_category, (month['total_income'], month['total_expenses'])
+
+
+def test_rollups_follow_creates_updates_and_deletes(app, client, headers):
+    food = add(client, headers, amount=10)
+    transport = add(client, headers, amount=25, category='transport')
+    add(client, headers, amount=100, category='other', transaction_type='income')
+    assert totals(client, headers) == ({'food': 10, 'transport': 25, 'other': 100}, (100, 35))
+    assert_consistent(app)
+
+    # Moves the row to another category and type, so two buckets change at once
+    response = client.put(f'/api/transactions/{food}', json={'amount': 40, 'category': 'shopping',
+                                                             'transaction_type': 'income'}, headers=headers)
+    assert response.status_code == 200
+    assert totals(client, headers) == ({'transport': 25, 'other': 100, 'shopping': 40}, (140, 25))
+    assert_consistent(app)
+
+    assert client.delete(f'/api/transactions/{transport}', headers=headers).status_code == 200
+    assert totals(client, headers) == ({'other': 100, 'shopping': 40}, (140, 0))
+    assert_consistent(app)
+
+
+def test_emptied_buckets_are_kept_at_zero(app, client, headers):
+    id = add(client, headers)
+    assert client.delete(f'/api/transactions/{id}', headers=headers).status_code == 200
+
+    with app.app_context():
+        bucket = db.session.query(MonthlyRollup).one()
+        assert (bucket.category, bucket.count, bucket.total) == ('food', 0, 0)
+    assert client.get('/api/transactions/category-summary', headers=headers).get_json() == {}
+    assert_consistent(app)
@@ -0,0 +1,63 @@
+from app.models import db
+from app.search import rebuild_search_index
+from tests.conftest import add, auth_headers, create_user
+
+
+def search(client, headers, query):
+    response = client.get(f'/api/transactions/search?{query}', headers=headers)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return [row['id'] for row in response.get_json()], response.headers.get('X-Next-Cursor')
+
+
+def test_index_follows_writes(client, headers):
+    id = add(client, headers, description='coffee beans')
+    assert search(client, headers, 'q=coffee')[0] == [id]
+
+    assert client.put(f'/api/transactions/{id}', json={'description': 'green tea'}, headers=headers).status_code == 200
+    assert search(client, headers, 'q=coffee')[0] == []
+    assert search(client, headers, 'q=tea')[0] == [id]
+
+    assert client.delete(f'/api/transactions/{id}', headers=headers).status_code == 200
+    assert search(client, headers, 'q=tea')[0] == []
+
+
+def test_terms_match_as_prefixes_of_description_or_category(client, headers):
+    beans = add(client, headers, description='coffee beans')
+    cup = add(client, headers, description='coffee to go', category='other')
+    bus = add(client, headers, description='bus ticket', category='transport')
+
+    assert sorted(search(client, headers, 'q=cof')[0]) == [beans, cup]
+    assert search(client, headers, 'q=cof+bea')[0] == [beans]
+    assert search(client, headers, 'q=transp')[0] == [bus]
+    assert search(client, headers, 'q=offee')[0] == []
+
+
+def test_other_users_matches_are_not_returned(app, client, headers):
+    mine = add(client, headers, description='coffee')
+    add(client, auth_headers(app, create_user(app, 'bob')), description='coffee')
+    assert search(client, headers, 'q=coffee')[0] == [mine]
+
+
+def test_ranked_pages_match_a_single_page(client, headers):
+    ids = {}
+    for description in ('rent', 'lunch', 'lunch lunch', 'team lunch at the office', 'lunch with a client'):
+        ids[description] = [add(client, headers, description=description) for _ in range(2)]
+    everything, cursor = search(client, headers, 'q=lunch&limit=100')
+    assert len(everything) == 8 and cursor is None
+    # Better matches first, ties in id order
+    assert everything[:2] == ids['lunch lunch']
+    assert everything[-2:] == ids['team lunch at the office']
+
+    paged, cursor = search(client, headers, 'q=lunch&limit=3')
+    while cursor:
+        rows, cursor = search(client, headers, f'q=lunch&limit=3&cursor={cursor}')
+        paged.extend(rows)
+    assert paged == everything
+
+
+def test_rebuild_keeps_results(app, client, headers):
+    id = add(client, headers, description='coffee')
+    with app.app_context():
+        with db.engine.begin() as connection:
+            rebuild_search_index(connection)
+    assert search(client, headers, 'q=coffee')[0] == [id]
@@ -0,0 +1,25 @@
+import importlib
+import pkgutil
+import pytest
+import benchmarks
+from app.models import db, BudgetGoal, RecurrenceRule, Transaction, User
+from app.rollups import verify_rollups
+from seed import seed_database
+
+BENCHMARKS = sorted(module.name for module in pkgutil.iter_modules(benchmarks.__path__))
+
+
+def test_seed_database(app):
+    with app.app_context():
+        counts = seed_database(users=3, transactions=50, days=120)
+        assert counts['users'] == db.session.query(User).count() == 3
+        assert counts['transactions'] == db.session.query(Transaction).count()
+        assert counts['recurring_rules'] == db.session.query(RecurrenceRule).count() > 0
+        assert counts['budget_goals'] == db.session.query(BudgetGoal).count() > 0
+        assert verify_rollups() == []
+
+
+@pytest.mark.parametrize('name', BENCHMARKS)
+def test_benchmark_imports(name):
+    # The benchmarks are only run by hand, so this is what notices an import they lost
+    importlib.import_module(f'benchmarks.{name}')
@@ -0,0 +1,116 @@
+import pytest
+from sqlalchemy import func, select
+from app.models import db, BudgetGoal, Transaction, User
+from app.shards import _set_moving, jump_hash, misplaced_users, move_user, rebalance, shard_engine
+from tests.conftest import add, auth_headers
+
+
+def sharded_app(make_app, tmp_path, shards):
+    return make_app(SHARD_URIS=[f'sqlite:///{tmp_path / f"shard{number}.db"}' for number in range(1, shards + 1)])
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    return sharded_app(make_app, tmp_path, 2)
+
+
+def signup(app, client, name):
+    """Sign a user up through the route, which picks the shard; returns (id, headers)"""
+    account = {'username': name, 'email': f'{name}@example.com', 'password': 'secret'}
+    assert client.post('/api/auth/signup', json=account).status_code == 201
+    with app.app_context():
+        id = db.session.execute(select(User.id).where(User.username == name)).scalar_one()
+    return id, auth_headers(app, id)
+
+
+def rows_on(app, number, model, user_id):
+    with app.app_context(), shard_engine(number).connect() as connection:
+        return connection.execute(
+            select(func.count()).select_from(model.__table__).where(model.user_id == user_id)
+        ).scalar()
+
+
+def listing(client, headers):
+    rows = client.get('/api/transactions/?per_page=100', headers=headers).get_json()['transactions']
+    return sorted((row['description'], row['amount']) for row in rows)
+
+
+@pytest.mark.parametrize('buckets', [2, 3, 5, 8])
+def test_jump_hash_only_moves_keys_to_the_new_bucket(buckets):
+    ids = range(1, 5001)
+    before = {id: jump_hash(id, buckets - 1) for id in ids}
+    after = {id: jump_hash(id, buckets) for id in ids}
+    moved = [id for id in ids if before[id] != after[id]]
+
+    assert all(0 <= bucket < buckets for bucket in after.values())
+    assert all(after[id] == buckets - 1 for id in moved)
+    assert len(moved) / len(ids) == pytest.approx(1 / buckets, abs=0.03)
+
+
+def test_users_and_their_rows_live_on_the_hashed_shard(app, client):
+    users = [signup(app, client, f'user{n}') for n in range(8)]
+    for id, headers in users:
+        add(client, headers, description=f'lunch {id}')
+
+    with app.app_context():
+        shards = dict(db.session.execute(select(User.id, User.shard)).all())
+    assert set(shards.values()) == {0, 1, 2}
+    for id, headers in users:
+        assert shards[id] == jump_hash(id, 3)
+        assert [rows_on(app, number, Transaction, id) for number in range(3)] == \
+            [int(number == shards[id]) for number in range(3)]
+        assert listing(client, headers) == [(f'lunch {id}', 10)]
+
+
+def test_moved_user_keeps_their_data(app, client):
+    id, headers = signup(app, client, 'alice')
+    for amount in (5, 7, 9):
+        add(client, headers, amount=amount)
+    assert client.post('/api/budget-goals/', json={'amount': 100, 'period': 'monthly'},
+                       headers=headers).status_code == 201
+    before = listing(client, headers)
+    cursor = client.get('/api/transactions/changes', headers=headers).get_json()['next']
+
+    with app.app_context():
+        source = db.session.get(User, id).shard
+        target = (source + 1) % 3
+        # Three transactions, the goal, its spend counter and one rollup bucket
+        assert move_user(id, target, grace_seconds=0) == 6
+        assert db.session.get(User, id).shard == target
+
+    assert listing(client, headers) == before
+    assert [rows_on(app, number, Transaction, id) for number in range(3)] == \
+        [3 if number == target else 0 for number in range(3)]
+    assert rows_on(app, target, BudgetGoal, id) == 1
+    # Ids changed with the move, so an old sync cursor starts over
+    assert client.get(f'/api/transactions/changes?since={cursor}', headers=headers).get_json()['reset']
+
+
+def test_moving_user_gets_503(app, client):
+    id, headers = signup(app, client, 'alice')
+    with app.app_context():
+        _set_moving(id, True)
+    response = client.get('/api/transactions/', headers=headers)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_rebalance_after_adding_a_shard(make_app, tmp_path):
+    app = sharded_app(make_app, tmp_path, 1)
+    client = app.test_client()
+    users = [signup(app, client, f'user{n}') for n in range(12)]
+    for id, headers in users:
+        add(client, headers, description=f'rent {id}')
+
+    app = sharded_app(make_app, tmp_path, 2)
+    client = app.test_client()
+    with app.app_context():
+        misplaced = misplaced_users()
+        assert misplaced and all(target == 2 for _, _, target in misplaced)
+        assert rebalance(grace_seconds=0) == len(misplaced)
+        assert misplaced_users() == []
+
+    for id, _ in users:
+        assert rows_on(app, jump_hash(id, 3), Transaction, id) == 1
+    for id, headers in users:
+        assert listing(client, headers) == [(f'rent {id}', 10)]
@@ -0,0 +1,31 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from app.timeseries import MAX_BUCKETS, bucket_count, bucket_keys
+
+
+@pytest.mark.parametrize('unit', ['day', 'week', 'month'])
+def test_bucket_count_matches_bucket_keys(unit):
+    rng = random.Random(unit)
+    for _ in range(200):
+        start = datetime(2020, 1, 1) + timedelta(days=rng.randint(0, 900), hours=rng.randint(0, 23))
+        end = start + timedelta(days=rng.randint(-3, 400), minutes=rng.randint(0, 1440))
+        assert bucket_count(start, end, unit) == len(bucket_keys(start, end, unit))
+
+
+def test_windows_beyond_the_bucket_cap_are_rejected(client, headers):
+    response = client.get('/api/transactions/timeseries?start_date=1900-01-01&end_date=2099-12-31',
+                          headers=headers)
+    assert response.status_code == 400
+    assert str(MAX_BUCKETS) in response.get_json()['error']
+
+    response = client.get('/api/transactions/timeseries?start_date=1900-01-01&end_date=2099-12-31&interval=month',
+                          headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['buckets'] == 200 * 12
+
+
+@pytest.mark.parametrize('query', ['end_date=9999-12-31', 'start_date=9999-12-31&end_date=9999-12-31',
+                                   'end_date=0001-01-01'])
+def test_dates_at_the_calendar_edges_are_rejected(client, headers, query):
+    assert client.get(f'/api/transactions/timeseries?{query}', headers=headers).status_code == 400
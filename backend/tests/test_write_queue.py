@@ -0,0 +1,71 @@
+import threading
+import pytest
+from app import transaction_writes
+from app.models import db, Transaction
+from tests.conftest import PAYLOAD, add
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(WRITE_QUEUE_ENABLED=True, WRITE_QUEUE_TIMEOUT=0.3)
+    yield app
+    app.extensions['write_queue'].close()
+
+
+@pytest.fixture
+def slow_writes(monkeypatch):
+    """(started, release): creates block in the writer until ``release`` is set"""
+    started, release = threading.Event(), threading.Event()
+    create = transaction_writes.create_transaction
+
+    def slow_create(*args):
+        started.set()
+        release.wait(5)
+        return create(*args)
+
+    monkeypatch.setattr(transaction_writes, 'create_transaction', slow_create)
+    yield started, release
+    release.set()
+
+
+def drain(app):
+    app.extensions['write_queue'].close()
+    with app.app_context():
+        return db.session.query(Transaction).count()
+
+
+def test_writes_commit_through_the_queue(app, client, headers):
+    ids = [add(client, headers) for _ in range(3)]
+    assert len(set(ids)) == 3
+    assert drain(app) == 3
+
+
+def test_started_write_that_times_out_reports_an_unknown_outcome(app, client, headers, slow_writes):
+    started, release = slow_writes
+    response = client.post('/api/transactions/', json=PAYLOAD, headers=headers)
+    assert started.is_set()
+    assert response.status_code == 504
+    assert response.get_json()['outcome'] == 'unknown'
+
+    # The write still lands, which is why the client has to re-read before retrying
+    release.set()
+    assert drain(app) == 1
+
+
+def test_queued_write_that_times_out_is_withdrawn(app, client, headers, slow_writes):
+    started, release = slow_writes
+    first = {}
+    blocker = threading.Thread(
+        target=lambda: first.setdefault('response', client.post('/api/transactions/', json=PAYLOAD, headers=headers))
+    )
+    blocker.start()
+    assert started.wait(5)
+
+    response = client.post('/api/transactions/', json=PAYLOAD, headers=headers)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+    release.set()
+    blocker.join()
+    assert first['response'].status_code == 504
+    assert drain(app) == 1